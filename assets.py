@@ -0,0 +1,190 @@
+import json
+import os
+from collections import Counter
+
+from kivy.atlas import Atlas
+from kivy.core.image import Image as CoreImage
+from kivy.core.image import ImageLoader
+from kivy.uix.image import Image
+
+from profiling import log, span
+
+# ASSETS: Shared Sprites, Texture Cache & Background Variants
+# - tools/build_assets.py packs the small sprites (badges, scrolls, markers, ...) into one
+#   texture atlas and writes pre-scaled JPEG variants of large backgrounds, listed in
+#   ASSET_MANIFEST.
+# - `texture(name)` returns one shared texture per sprite for the whole process: a region
+#   of the atlas when it has been built, otherwise the loose PNG decoded once. Kivy's own
+#   image cache drops unused textures after a timeout, so screens revisited later would
+#   decode and upload the same PNGs again; this cache keeps sprites resident.
+# - Large images also get a tiny preview (`preview_source`) for async_image.ProgressiveImage.
+# - `install_decode_audit()` counts every image decode in the process, so duplicate
+#   decodes of the same file can be found with `decode_report()`.
+# Everything falls back to the loose files when the build step has not been run.
+
+ASSET_DIR = 'assets'
+ATLAS_FILE = os.path.join(ASSET_DIR, 'sprites.atlas')
+ASSET_MANIFEST = os.path.join(ASSET_DIR, 'manifest.json')
+
+SPRITES = ( # Packed into the atlas by tools/build_assets.py
+    'badge_placeholder.png',
+    'scroll_placeholder.png',
+    'artifact_placeholder.png',
+    'goal_marker.png',
+    'player_marker.png',
+    'character_placeholder.png',
+    'character_sheet.png', # sprite_anim.SHEETS; skipped by the build until it exists
+)
+FOREST_BACKGROUND = 'A_digital_painting_depicts_an_enchanting_forest_ba.png.png'
+
+
+def sprite_id(name):
+    # Atlas ids are file names without directory and extension (kivy.atlas convention).
+    return os.path.splitext(os.path.basename(name))[0]
+
+
+class TextureCache(object):
+    def __init__(self, atlas_file=ATLAS_FILE):
+        self.atlas_file = atlas_file
+        self._atlas = None # Loaded on first use; False if there is no atlas
+        self._textures = {}
+        self._failed = set() # Names that could not be decoded; not retried until release()
+        self.decodes = Counter() # name -> number of times this cache decoded it
+        self.resolve = None # callable(name) -> file to decode, e.g. extracted from the content pack
+
+    @property
+    def atlas(self):
+        if self._atlas is None:
+            self._atlas = False
+            if os.path.exists(self.atlas_file):
+                try:
+                    self._atlas = Atlas(self.atlas_file)
+                except Exception as e:
+                    log.error("Error loading texture atlas %s: %s", self.atlas_file, e)
+        return self._atlas or None
+
+    def in_atlas(self, name):
+        atlas = self.atlas
+        return atlas is not None and sprite_id(name) in atlas.textures
+
+    def source(self, name):
+        # Value for a widget's `source`: an atlas:// URI for packed sprites, else the file itself.
+        if self.in_atlas(name):
+            return f'atlas://{os.path.splitext(self.atlas_file)[0]}/{sprite_id(name)}'
+        return name
+
+    def peek(self, name):
+        # The shared texture if it is already available without decoding anything, else None.
+        texture = self._textures.get(name)
+        if texture is None and self.in_atlas(name):
+            texture = self._textures[name] = self.atlas[sprite_id(name)]
+        return texture
+
+    def path(self, name):
+        # The file to decode for `name`.
+        return self.resolve(name) if self.resolve else name
+
+    def get(self, name):
+        texture = self.peek(name)
+        if texture is None:
+            if name in self._failed:
+                return None
+            try:
+                with span('load_image', 'assets', source=name):
+                    texture = CoreImage(self.path(name), nocache=True).texture
+            except Exception as e:
+                log.error("Error loading image %s: %s", name, e)
+                self._failed.add(name)
+                return None
+            self.decodes[name] += 1
+            self._textures[name] = texture
+        return texture
+
+    def release(self, name=None):
+        # Drop one texture (or all of them), e.g. when the app is paused.
+        if name is None:
+            self._textures.clear()
+            self._failed.clear()
+        else:
+            self._textures.pop(name, None)
+            self._failed.discard(name)
+
+    def stats(self):
+        return {'textures': len(self._textures), 'atlas': self.atlas is not None,
+                'decodes': sum(self.decodes.values())}
+
+
+shared_textures = TextureCache() # Process-wide instance used by every screen
+
+
+def source(name):
+    return shared_textures.source(name)
+
+
+def texture(name):
+    return shared_textures.get(name)
+
+
+def image(name, **kwargs):
+    # An Image widget showing the shared texture for `name` (no per-widget decode or upload).
+    shared = shared_textures.get(name)
+    if shared is None:
+        try:
+            path = shared_textures.path(name)
+        except Exception: # Already logged by get()
+            path = name
+        return Image(source=path, **kwargs)
+    return Image(texture=shared, **kwargs)
+
+
+def background_source(name, window_size, fallback=None):
+    # Smallest pre-scaled variant of a background that still covers `window_size`; the largest
+    # variant on bigger screens. `fallback` (or `name`) when no variants have been built.
+    variants = _manifest().get('backgrounds', {}).get(name)
+    if not variants:
+        return fallback or name
+    needed = max(window_size)
+    variants = sorted(variants, key=lambda v: v['size']) # 'size': longest side in pixels
+    for variant in variants:
+        if variant['size'] >= needed:
+            return variant['path']
+    return variants[-1]['path']
+
+
+def preview_source(name):
+    # Tiny (~32px) preview of a large image, shown blurred while the real one loads; None if not built.
+    return _manifest().get('previews', {}).get(name)
+
+
+_manifest_cache = None
+
+def _manifest():
+    global _manifest_cache
+    if _manifest_cache is None:
+        _manifest_cache = {}
+        if os.path.exists(ASSET_MANIFEST):
+            with open(ASSET_MANIFEST, 'r', encoding='utf-8') as f:
+                _manifest_cache = json.load(f)
+    return _manifest_cache
+
+
+# --- Duplicate decode audit ---
+decode_counts = Counter() # filename -> decodes seen since install_decode_audit()
+_original_load = None
+
+def install_decode_audit():
+    # Count every file decoded through Kivy's ImageLoader (Image widgets, CoreImage, ...).
+    global _original_load
+    if _original_load is not None:
+        return
+    _original_load = ImageLoader.load
+
+    def counting_load(filename, **kwargs):
+        decode_counts[filename] += 1
+        return _original_load(filename, **kwargs)
+    ImageLoader.load = staticmethod(counting_load)
+
+
+def decode_report():
+    # (filename, decodes) for every file decoded more than once, most duplicated first.
+    return [(name, count) for name, count in decode_counts.most_common() if count > 1]
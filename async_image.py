@@ -0,0 +1,204 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from kivy.animation import Animation
+from kivy.clock import Clock
+from kivy.core.image import Image as CoreImage
+from kivy.core.image import ImageLoader
+from kivy.graphics import Color, Rectangle
+from kivy.properties import BooleanProperty, ListProperty, NumericProperty, ObjectProperty, StringProperty
+from kivy.uix.widget import Widget
+
+import assets
+from profiling import log, traced
+
+# ASSETS: Asynchronous, Progressive Images
+# Decoding a large PNG on the main thread blocks the frame that creates the widget.
+# ProgressiveImage draws something immediately (a tiny blurred preview built by
+# tools/build_assets.py, or a solid colour), decodes the real file on a worker thread and
+# fades the full texture in once it has been uploaded on the main thread. A missing or
+# broken file simply leaves the placeholder in place, so screens no longer need their own
+# try/except fallbacks around Image(...).
+# Decoded textures are kept per source, so returning to a screen does not decode again.
+# Sources (and previews) are looked up through `resolve` first, on the main thread, so
+# images shipped in the content pack are decoded from there rather than from loose files.
+
+DECODE_WORKERS = 2
+FADE_DURATION = 0.2
+
+_executor = None
+_textures = {} # source -> uploaded full-size texture
+_pending = {} # source -> widgets waiting for that source
+resolve = None # callable(name) -> file to decode, e.g. main.content_file; main thread only
+
+
+def resolve_path(source):
+    if resolve is None:
+        return source
+    return resolve(source)
+
+
+def decode_image(data, ext):
+    # Decode encoded image bytes into Kivy ImageData without creating a texture, so it can
+    # run on a worker thread. Accessing `.texture` on the result (main thread) uploads it.
+    for loader in ImageLoader.loaders:
+        if loader.can_load_memory() and ext in loader.extensions():
+            return loader('__inline__', ext=ext, rawdata=BytesIO(data), inline=True,
+                          nocache=True, mipmap=False, keep_data=False)
+    raise ValueError(f'No image loader can decode "{ext}" data from memory.')
+
+
+@traced('decode_image', 'assets')
+def _decode_file(source):
+    with open(source, 'rb') as f:
+        data = f.read()
+    return decode_image(data, os.path.splitext(source)[1][1:].lower())
+
+
+def load_texture_async(source, callback):
+    # callback(texture or None) on the main thread; concurrent requests share one decode.
+    global _executor
+    if source in _textures:
+        callback(_textures[source])
+        return
+    if source in _pending:
+        _pending[source].append(callback)
+        return
+    _pending[source] = [callback]
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=DECODE_WORKERS, thread_name_prefix='image-decode')
+    try:
+        path = resolve_path(source) # Here, not on the worker: resolving may need the running App
+    except Exception as e:
+        log.error("Error loading image %s: %s", source, e)
+        _finish(source, None)
+        return
+
+    def work():
+        try:
+            decoded = _decode_file(path)
+        except Exception as e:
+            log.error("Error loading image %s: %s", source, e)
+            decoded = None
+        Clock.schedule_once(lambda dt: _finish(source, decoded))
+    _executor.submit(work)
+
+
+def _finish(source, decoded):
+    texture = None
+    if decoded is not None:
+        try:
+            texture = decoded.texture
+            _textures[source] = texture
+        except Exception as e:
+            log.error("Error uploading image %s: %s", source, e)
+    for callback in _pending.pop(source, ()):
+        callback(texture)
+
+
+def release_textures(source=None):
+    # Forget decoded textures (all of them, or one source), e.g. when the app is paused.
+    if source is None:
+        _textures.clear()
+    else:
+        _textures.pop(source, None)
+
+
+class ProgressiveImage(Widget):
+    source = StringProperty('')
+    texture = ObjectProperty(None, allownone=True) # Full texture once loaded
+    placeholder_color = ListProperty([0.1, 0.1, 0.1, 1])
+    keep_ratio = BooleanProperty(False) # False: stretch over the whole widget
+    loaded = BooleanProperty(False)
+    fade = NumericProperty(FADE_DURATION)
+    image_alpha = NumericProperty(0) # Opacity of the full image over the placeholder
+
+    def __init__(self, **kwargs):
+        self._released = False
+        super(ProgressiveImage, self).__init__(**kwargs)
+        with self.canvas:
+            self._placeholder_color = Color(*self.placeholder_color)
+            self._placeholder = Rectangle()
+            self._image_color = Color(1, 1, 1, 0)
+            self._image = Rectangle()
+        self.bind(pos=self._update_rects, size=self._update_rects,
+                  placeholder_color=self._update_placeholder_color,
+                  image_alpha=self._update_image_alpha)
+        if self.source:
+            self._load(self.source)
+
+    def on_source(self, instance, value):
+        self._load(value)
+
+    def _load(self, source):
+        self._released = False
+        self.loaded = False
+        Animation.cancel_all(self, 'image_alpha')
+        self.image_alpha = 0
+        self._show_preview(source)
+        if source:
+            load_texture_async(source, lambda texture, source=source: self._on_texture(source, texture))
+
+    def _show_preview(self, source):
+        preview = assets.preview_source(source)
+        self._placeholder.texture = None
+        self._placeholder_color.rgba = self.placeholder_color
+        if preview:
+            try:
+                texture = CoreImage(resolve_path(preview)).texture
+                texture.mag_filter = 'linear' # Upscaling a ~32px image is what blurs it
+                self._placeholder.texture = texture
+                self._placeholder_color.rgba = (1, 1, 1, 1)
+            except Exception as e:
+                log.error("Error loading preview %s: %s", preview, e)
+        self._update_rects()
+
+    def release(self):
+        # Drop the full and preview textures (e.g. while the app is paused); restore() reloads them.
+        Animation.cancel_all(self, 'image_alpha')
+        self.image_alpha = 0
+        self.loaded = False
+        self.texture = None
+        self._image.texture = None
+        self._placeholder.texture = None
+        self._placeholder_color.rgba = self.placeholder_color
+        self._released = True
+
+    def restore(self):
+        if self._released:
+            self._load(self.source)
+
+    def _on_texture(self, source, texture):
+        if self._released:
+            return # Finished decoding after release()
+        if source != self.source or texture is None:
+            return # Source changed meanwhile, or the image is unavailable: keep the placeholder
+        self.texture = texture
+        self._image.texture = texture
+        self._update_rects()
+        self.loaded = True
+        if self.fade > 0:
+            Animation(image_alpha=1, d=self.fade).start(self)
+        else:
+            self.image_alpha = 1
+
+    def _update_image_alpha(self, instance, value):
+        self._image_color.a = value
+
+    def _update_placeholder_color(self, *args):
+        if self._placeholder.texture is None:
+            self._placeholder_color.rgba = self.placeholder_color
+
+    def _update_rects(self, *args):
+        self._placeholder.pos = self.pos
+        self._placeholder.size = self.size
+        pos, size = self.pos, self.size
+        if self.keep_ratio and self.texture is not None and self.texture.height:
+            ratio = self.texture.width / self.texture.height
+            width = min(self.width, self.height * ratio)
+            height = width / ratio
+            pos = (self.center_x - width / 2, self.center_y - height / 2)
+            size = (width, height)
+        self._image.pos = pos
+        self._image.size = size
@@ -0,0 +1,32 @@
+# Benchmarks for the Time Traveler app.
+# Run them from the repository root so the game modules are importable, e.g.:
+#     python -m benchmarks.startup
+# Kivy reads its own command line options unless told not to, and console logging
+# would end up in the timings, so both are switched off before Kivy is imported.
+# On machines without a display, run the Kivy-based benchmarks under xvfb-run.
+import os
+
+os.environ.setdefault('KIVY_NO_ARGS', '1')
+os.environ.setdefault('KIVY_NO_CONSOLELOG', '1')
+os.environ.setdefault('KIVY_NO_FILELOG', '1')
+
+
+def ensure_window(size=(720, 1280)):
+    # Create (or reuse) the Kivy window the benchmarks draw into.
+    from kivy.base import EventLoop
+    from kivy.core.window import Window
+    EventLoop.ensure_window()
+    Window.size = size
+    return Window
+
+
+def run_frames(count=1):
+    # Advance `count` frames: clock callbacks, layout and drawing. Returns seconds per frame.
+    import time
+    from kivy.base import EventLoop
+    times = []
+    for _ in range(count):
+        start = time.perf_counter()
+        EventLoop.idle()
+        times.append(time.perf_counter() - start)
+    return times
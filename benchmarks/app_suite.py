@@ -0,0 +1,268 @@
+# Whole-app benchmark suite: builds TimeTravelerApp in a (headless) window, times the
+# construction of every screen in main.SCREENS, plays the main navigation flow
+# (start -> ar_camera_view -> map_view -> story_screen -> rewards_screen) and records
+# frame times and allocations. This is repeated with scaled inputs: the number of goals,
+# the inventory size and the story length (paragraphs of the current goal's story),
+# generated into a scratch directory. Each axis is scaled on its own, the others staying
+# at their smallest value.
+# Results are written to a JSON report ({"results": {scale: {metric: value}}}, every metric
+# lower-is-better). With --baseline the run is compared against an earlier report and the
+# exit status is 1 if any metric got worse by more than --threshold (a fraction).
+# --headless uses Kivy's mock GL backend and SDL's dummy video driver, so no display or GPU
+# is needed (frame times then leave out GPU work); otherwise run it under xvfb-run on
+# machines without a display, like the other Kivy benchmarks.
+#     python -m benchmarks.app_suite --headless --report baseline.json
+#     python -m benchmarks.app_suite --headless --baseline baseline.json --threshold 0.15
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import benchmarks
+
+FLOW = ('start', 'ar_camera_view', 'map_view', 'story_screen', 'rewards_screen')
+SETTLE_FRAMES = 30 # Frames recorded after each navigation once its transition has finished
+MAX_TRANSITION_FRAMES = 600
+IMAGES = ('badge_placeholder.png', 'scroll_placeholder.png', 'artifact_placeholder.png')
+PARAGRAPH = ('The clock tower bell rang out over the square as the traveller stepped through '
+             'the shimmering doorway, and the smell of bread and smoke drifted from the market stalls. ')
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+# --- Scaled inputs ---
+def write_inputs(folder, goals, items, paragraphs):
+    # Goals file, stories and a prefilled user data directory for one scale.
+    from goal_index import GoalStore
+    import main
+    bounds = GoalStore.load(main.GOALS_FILE).map_bounds
+    goal_entries = []
+    for i in range(goals):
+        fraction = (i * 0.618034) % 1.0, (i * 0.414214) % 1.0 # Evenly scattered, reproducible
+        goal_entries.append({'id': f'goal{i}', 'name': f'Echo {i}',
+                             'lat': bounds.south + fraction[0] * (bounds.north - bounds.south),
+                             'lon': bounds.west + fraction[1] * (bounds.east - bounds.west),
+                             'reward': {'id': f'reward{i}', 'name': f'Treasure {i}', 'image': IMAGES[i % 3]}})
+    goals_file = os.path.join(folder, 'goals.json')
+    with open(goals_file, 'w', encoding='utf-8') as f:
+        json.dump({'map_bounds': bounds.to_dict(), 'check_in_radius_m': 20, 'goals': goal_entries}, f)
+
+    story_dir = os.path.join(folder, 'stories')
+    os.makedirs(story_dir)
+    story = '\n\n'.join(f'{PARAGRAPH * (1 + i % 4)}({i + 1})' for i in range(paragraphs))
+    for name in ('intro', 'goal0'):
+        with open(os.path.join(story_dir, f'{name}.txt'), 'w', encoding='utf-8') as f:
+            f.write(f'# Benchmark story\n\n{story}\n')
+
+    # The player has checked in at goal0, so the story screen shows the scaled story.
+    user_data_dir = os.path.join(folder, 'user')
+    os.makedirs(os.path.join(user_data_dir, main.STATE_DIR))
+    with open(os.path.join(user_data_dir, main.STATE_DIR, 'progress.json'), 'w', encoding='utf-8') as f:
+        json.dump({'current_goal': 'goal0', 'checked_in': ['goal0']}, f)
+    from inventory import InventoryStore
+    store = InventoryStore(os.path.join(user_data_dir, main.INVENTORY_FILE))
+    store.grant_many([(f'item{i}', f'Treasure {i}', IMAGES[i % 3], f'goal{i}', 1700000000.0 + i)
+                      for i in range(items)])
+    store.close()
+    return goals_file, story_dir, user_data_dir
+
+
+def create_app(goals_file, story_dir, user_data_dir):
+    import main
+
+    class BenchmarkApp(main.TimeTravelerApp):
+        @property
+        def user_data_dir(self):
+            return user_data_dir
+
+    main.GOALS_FILE = goals_file
+    main.STORY_DIR = story_dir
+    main.PACK_FILE = os.path.join(user_data_dir, 'no.pack') # The generated loose files, not a built pack
+    main._goal_store = None # Shared by the map screens; reloaded from the new goals file
+    return BenchmarkApp()
+
+
+# --- Measurements ---
+def measure_app_build(window, app):
+    gc.collect()
+    start = time.perf_counter()
+    app.root = app.build()
+    window.add_widget(app.root)
+    benchmarks.run_frames(1)
+    return {'app.build_ms': (time.perf_counter() - start) * 1000}
+
+
+def measure_screens(rounds):
+    # Construction time of every screen class (median of `rounds`), then what one
+    # construction allocates (retained and peak) with tracemalloc on.
+    import main
+    metrics = {}
+    for name, screen_class in main.SCREENS:
+        times = []
+        for _ in range(rounds):
+            gc.collect()
+            start = time.perf_counter()
+            screen_class(name=name)
+            times.append((time.perf_counter() - start) * 1000)
+        metrics[f'build.{name}.ms'] = statistics.median(times)
+        gc.collect()
+        tracemalloc.start()
+        screen = screen_class(name=name)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del screen
+        metrics[f'build.{name}.alloc_kb'] = current / 1024
+        metrics[f'build.{name}.peak_kb'] = peak / 1024
+    return metrics
+
+
+def navigate(sm, name):
+    # Switch screens and run frames until the transition is over plus SETTLE_FRAMES.
+    start = time.perf_counter()
+    sm.current = name
+    switch_ms = (time.perf_counter() - start) * 1000
+    frame_times = []
+    while sm.transition.is_active and len(frame_times) < MAX_TRANSITION_FRAMES:
+        frame_times.extend(benchmarks.run_frames(1))
+    frame_times.extend(benchmarks.run_frames(SETTLE_FRAMES))
+    return switch_ms, [t * 1000 for t in frame_times]
+
+
+def measure_flow(sm):
+    # First pass: frame times, with the screens built on first visit (or by preloading).
+    # Second pass over the same flow: what navigating allocates once everything is built.
+    metrics = {}
+    collections = sum(stat['collections'] for stat in gc.get_stats())
+    for name in FLOW[1:]:
+        switch_ms, frame_ms = navigate(sm, name)
+        metrics[f'flow.{name}.switch_ms'] = switch_ms
+        metrics[f'flow.{name}.frame_p50_ms'] = percentile(frame_ms, 0.5)
+        metrics[f'flow.{name}.frame_p95_ms'] = percentile(frame_ms, 0.95)
+        metrics[f'flow.{name}.frame_max_ms'] = max(frame_ms)
+    metrics['flow.gc_collections'] = sum(stat['collections'] for stat in gc.get_stats()) - collections
+
+    navigate(sm, FLOW[0])
+    for name in FLOW[1:]:
+        gc.collect()
+        tracemalloc.start()
+        navigate(sm, name)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        metrics[f'flow.{name}.alloc_kb'] = current / 1024
+        metrics[f'flow.{name}.peak_kb'] = peak / 1024
+    return metrics
+
+
+def run_scale(window, folder, goals, items, paragraphs, rounds):
+    goals_file, story_dir, user_data_dir = write_inputs(folder, goals, items, paragraphs)
+    app = create_app(goals_file, story_dir, user_data_dir)
+    metrics = measure_app_build(window, app)
+    benchmarks.run_frames(SETTLE_FRAMES)
+    metrics.update(measure_flow(app.root))
+    metrics.update(measure_screens(rounds))
+    window.remove_widget(app.root)
+    app.resources.release() # Camera and GPS threads; the stores stay open for pending Clock events
+    app.game_state.save()
+    return metrics
+
+
+def scales(args):
+    # The smallest value of every axis, then each axis scaled on its own.
+    base = {'goals': min(args.goals), 'items': min(args.items), 'paragraphs': min(args.paragraphs)}
+    yield dict(base)
+    for axis in ('goals', 'items', 'paragraphs'):
+        for value in sorted(set(getattr(args, axis))):
+            if value != base[axis]:
+                yield dict(base, **{axis: value})
+
+
+def scale_key(scale):
+    return ','.join(f'{axis}={scale[axis]}' for axis in ('goals', 'items', 'paragraphs'))
+
+
+# --- Reports ---
+def compare(report, baseline, threshold, min_delta):
+    # Metrics worse than the baseline by more than `threshold` (fraction) and `min_delta`
+    # (absolute, in the metric's unit): [(scale, metric, baseline value, value)].
+    regressions = []
+    for key, metrics in report['results'].items():
+        previous = baseline.get('results', {}).get(key, {})
+        for metric, value in sorted(metrics.items()):
+            if metric not in previous:
+                continue
+            old = previous[metric]
+            if value - old > min_delta and value > old * (1 + threshold):
+                regressions.append((key, metric, old, value))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark every screen and the main navigation flow.')
+    parser.add_argument('--goals', type=int, nargs='+', default=[10, 1000, 10000])
+    parser.add_argument('--items', type=int, nargs='+', default=[10, 1000, 10000])
+    parser.add_argument('--paragraphs', type=int, nargs='+', default=[10, 500])
+    parser.add_argument('--rounds', type=int, default=5, help='constructions timed per screen')
+    parser.add_argument('--headless', action='store_true', help="Kivy's mock GL backend and no display")
+    parser.add_argument('--camera', default='synthetic', help='TIME_TRAVELER_CAMERA for the AR screen')
+    parser.add_argument('--report', default='benchmark_report.json')
+    parser.add_argument('--baseline', help='earlier report to compare against')
+    parser.add_argument('--threshold', type=float, default=0.10, help='allowed relative slowdown (0.10 = 10%%)')
+    parser.add_argument('--min-delta', type=float, default=0.5,
+                        help='ignore changes smaller than this (ms or KB)')
+    args = parser.parse_args()
+
+    # Before Kivy or the game modules are imported.
+    if args.headless:
+        os.environ.setdefault('KIVY_GL_BACKEND', 'mock')
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('TIME_TRAVELER_CAMERA', args.camera)
+    import kivy
+
+    window = benchmarks.ensure_window()
+    report = {
+        'version': 1,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'environment': {'python': platform.python_version(), 'platform': sys.platform,
+                        'machine': platform.machine(), 'kivy': kivy.__version__, 'headless': args.headless},
+        'settings': {'rounds': args.rounds, 'settle_frames': SETTLE_FRAMES, 'flow': list(FLOW)},
+        'results': {},
+    }
+    with tempfile.TemporaryDirectory() as scratch:
+        print(f"{'scale':<36}{'app build ms':>14}{'screens ms':>12}{'flow frame p95':>16}{'flow alloc KB':>15}")
+        for i, scale in enumerate(scales(args)):
+            folder = os.path.join(scratch, str(i))
+            os.makedirs(folder)
+            metrics = run_scale(window, folder, scale['goals'], scale['items'], scale['paragraphs'], args.rounds)
+            key = scale_key(scale)
+            report['results'][key] = metrics
+            screens_ms = sum(v for k, v in metrics.items() if k.startswith('build.') and k.endswith('.ms'))
+            frame_p95 = max(v for k, v in metrics.items() if k.endswith('.frame_p95_ms'))
+            alloc_kb = sum(v for k, v in metrics.items() if k.startswith('flow.') and k.endswith('.alloc_kb'))
+            print(f"{key:<36}{metrics['app.build_ms']:>14.1f}{screens_ms:>12.1f}{frame_p95:>16.2f}{alloc_kb:>15.0f}")
+
+    with open(args.report, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=1, sort_keys=True)
+    print(f"Report written to {args.report}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold, args.min_delta)
+        for key, metric, old, value in regressions:
+            print(f"REGRESSION {key} {metric}: {old:.2f} -> {value:.2f} (+{(value / old - 1) * 100 if old else 0:.0f}%)")
+        print(f"{len(regressions)} regressions over {args.threshold:.0%} against {args.baseline}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+# AR camera feed benchmark: frames per second shown, frames dropped and per-frame upload
+# latency of FrameView, fed by a recorded video (needs OpenCV) or the synthetic source.
+# No camera is needed; the feed is drawn into a normal Kivy window for --seconds.
+#     python -m benchmarks.camera_frames --video clip.mp4
+#     python -m benchmarks.camera_frames --size 1280 720 --fps 30
+import argparse
+import statistics
+import time
+
+import benchmarks
+
+from frame_source import SyntheticFrameSource, VideoFrameSource
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the camera frame upload path.')
+    parser.add_argument('--video', help='recorded clip to play (default: synthetic frames)')
+    parser.add_argument('--size', type=int, nargs=2, default=[1280, 720], metavar=('W', 'H'),
+                        help='synthetic frame size')
+    parser.add_argument('--fps', type=float, default=30, help='synthetic frame rate')
+    parser.add_argument('--fast', action='store_true', help='produce frames as fast as possible')
+    parser.add_argument('--seconds', type=float, default=10)
+    args = parser.parse_args()
+
+    window = benchmarks.ensure_window()
+    from frame_view import FrameView
+    if args.video:
+        source = VideoFrameSource(args.video, loop=True, realtime=not args.fast)
+    else:
+        source = SyntheticFrameSource(args.size[0], args.size[1], args.fps, realtime=not args.fast)
+    view = FrameView(source=source, size=window.size)
+    window.add_widget(view)
+    view.start()
+    frame_times = []
+    start = time.perf_counter()
+    while time.perf_counter() - start < args.seconds:
+        frame_times.extend(benchmarks.run_frames(1))
+    elapsed = time.perf_counter() - start
+    view.stop()
+    window.remove_widget(view)
+
+    stats = view.stats()
+    upload_ms = [t * 1000 for t in view.upload_times]
+    latency_ms = [t * 1000 for t in view.frame_latencies]
+    print(f"source: {args.video or 'synthetic'} {source.width}x{source.height} @ {source.fps:.0f} fps"
+          f"{' (fast)' if args.fast else ''}")
+    print(f"frames produced: {stats['published']} ({stats['published'] / elapsed:.1f}/s), "
+          f"shown: {stats['uploads']} ({stats['uploads'] / elapsed:.1f}/s), dropped: {stats['dropped']}")
+    print(f"UI frame ms: p50 {statistics.median(frame_times) * 1000:.2f}, "
+          f"p95 {percentile(frame_times, 0.95) * 1000:.2f}")
+    print(f"upload ms: p50 {percentile(upload_ms, 0.5):.2f}, p95 {percentile(upload_ms, 0.95):.2f}, "
+          f"max {max(upload_ms, default=0):.2f}")
+    print(f"capture -> screen ms: p50 {percentile(latency_ms, 0.5):.2f}, p95 {percentile(latency_ms, 0.95):.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+# Content pack benchmark: builds a pack of N synthetic historic sites (goal, story and
+# image each), then measures the pack against loose files (size, time to open, random
+# access reads of single entries) and a weekly update: a few new sites, edited stories and
+# a moved goal, shipped as a delta. Reports the delta size next to the full new pack, the
+# time to apply it on the device, and how many extracted images the update could skip.
+# Runs without Kivy.
+#     python -m benchmarks.content_pack --sites 100 1000 --new-sites 10 --edited 5
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+
+import benchmarks  # noqa: F401
+
+from content_pack import ContentPack, apply_delta, build_pack, make_delta
+
+IMAGE_BYTES = 40 * 1024 # Incompressible, like a PNG
+WORDS = ('the', 'old', 'bridge', 'was', 'built', 'in', 'stone', 'by', 'guild', 'masons', 'after', 'great',
+         'fire', 'river', 'market', 'king', 'tower', 'bells', 'rang', 'for', 'travelers', 'every', 'day')
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+def story(rng, paragraphs=6):
+    return '\n\n'.join(' '.join(rng.choice(WORDS) for _ in range(80)).capitalize() + '.'
+                       for _ in range(paragraphs))
+
+
+def content(sites, rng):
+    # {entry name: bytes} of a pack with `sites` sites.
+    goals = [{'id': f'site{i}', 'name': f'Site {i}', 'lat': 51.5 + rng.random() / 100,
+              'lon': -0.13 + rng.random() / 100} for i in range(sites)]
+    files = {}
+    for goal in goals:
+        files[f"stories/{goal['id']}.txt"] = f"# {goal['name']}\n{story(rng)}\n".encode('utf-8')
+        files[f"images/{goal['id']}.png"] = os.urandom(IMAGE_BYTES)
+    files['goals.json'] = json.dumps({'goals': goals}, indent=1).encode('utf-8')
+    return files
+
+
+def weekly_update(files, sites, new_sites, edited, rng):
+    # The files of the next version: new sites, edited stories and one goal moved.
+    files = dict(files)
+    data = json.loads(files['goals.json'])
+    for i in range(sites, sites + new_sites):
+        data['goals'].append({'id': f'site{i}', 'name': f'Site {i}', 'lat': 51.5, 'lon': -0.13})
+        files[f'stories/site{i}.txt'] = f"# Site {i}\n{story(rng)}\n".encode('utf-8')
+        files[f'images/site{i}.png'] = os.urandom(IMAGE_BYTES)
+    for i in rng.sample(range(sites), min(edited, sites)):
+        text = files[f'stories/site{i}.txt'].decode('utf-8')
+        position = rng.randrange(len(text))
+        files[f'stories/site{i}.txt'] = (text[:position] + ' A newly found letter tells more. '
+                                         + text[position:]).encode('utf-8')
+    data['goals'][0]['lat'] += 0.0001
+    files['goals.json'] = json.dumps(data, indent=1).encode('utf-8')
+    return files
+
+
+def run(directory, sites, args, rng):
+    files = content(sites, rng)
+    loose_dir = os.path.join(directory, 'loose')
+    for name, data in files.items():
+        path = os.path.join(loose_dir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+    old_path = os.path.join(directory, 'v1.pack')
+    build_pack(old_path, '1', files)
+
+    start = time.perf_counter()
+    pack = ContentPack(old_path)
+    open_ms = (time.perf_counter() - start) * 1000
+    names = pack.names('stories/')
+    pack_reads = []
+    loose_reads = []
+    for name in rng.sample(names, min(args.reads, len(names))):
+        start = time.perf_counter()
+        pack.read(name)
+        pack_reads.append((time.perf_counter() - start) * 1000)
+        start = time.perf_counter()
+        with open(os.path.join(loose_dir, name), 'rb') as f:
+            f.read()
+        loose_reads.append((time.perf_counter() - start) * 1000)
+    cache_dir = os.path.join(directory, 'extracted')
+    for name in pack.names('images/'):
+        pack.extract(name, cache_dir)
+    pack.close()
+    loose_bytes = sum(len(data) for data in files.values())
+    print(f"{sites} sites: {len(files)} entries, pack {os.path.getsize(old_path) / 1024:.0f} KB "
+          f"(loose {loose_bytes / 1024:.0f} KB), open {open_ms:.2f} ms")
+    print(f"  story read ms  pack p50 {percentile(pack_reads, 0.5):.3f} p95 {percentile(pack_reads, 0.95):.3f}"
+          f"   loose p50 {percentile(loose_reads, 0.5):.3f} p95 {percentile(loose_reads, 0.95):.3f}")
+
+    new_path = os.path.join(directory, 'v2.pack')
+    build_pack(new_path, '2', weekly_update(files, sites, args.new_sites, args.edited, rng))
+    delta_path = os.path.join(directory, 'v2.delta')
+    start = time.perf_counter()
+    index = make_delta(old_path, new_path, delta_path)
+    make_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    apply_delta(old_path, delta_path)
+    apply_ms = (time.perf_counter() - start) * 1000
+    with ContentPack(old_path) as updated:
+        for name in updated.names('images/'):
+            updated.extract(name, cache_dir)
+        stats = updated.stats()
+    kinds = list(index['entries'].values())
+    print(f"  update: delta {os.path.getsize(delta_path) / 1024:.1f} KB vs full pack "
+          f"{os.path.getsize(new_path) / 1024:.0f} KB ({kinds.count('patch')} patched, "
+          f"{kinds.count('full')} new/replaced), make {make_ms:.0f} ms, apply {apply_ms:.0f} ms")
+    print(f"  images after update: {stats['extracted']} extracted, {stats['extract_skipped']} unchanged skipped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark content packs and delta updates.')
+    parser.add_argument('--sites', type=int, nargs='+', default=[100, 1000])
+    parser.add_argument('--new-sites', type=int, default=10)
+    parser.add_argument('--edited', type=int, default=5, help='stories edited per update')
+    parser.add_argument('--reads', type=int, default=200, help='random story reads')
+    args = parser.parse_args()
+    rng = random.Random(1)
+    for sites in args.sites:
+        directory = tempfile.mkdtemp()
+        try:
+            run(directory, sites, args, rng)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
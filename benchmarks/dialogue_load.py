@@ -0,0 +1,90 @@
+# Dialogue script benchmark: opening a large site script and playing a short conversation,
+# parsing the JSON authoring file every time vs memory-mapping the compiled .dlg file.
+# Scripts with 1k-100k nodes are generated into a temporary directory.
+#     python -m benchmarks.dialogue_load --nodes 1000 10000 100000
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+import benchmarks
+
+from dialogue import DialogueRunner, DialogueScript, compile_script
+
+SPEAKERS = ('Alistair', 'Mayor Hollis', 'Fire Captain', 'Market Trader')
+CONVERSATION_LINES = 20
+
+
+def make_script(count, rng):
+    nodes = {}
+    for i in range(count):
+        node = {'speaker': SPEAKERS[i % len(SPEAKERS)],
+                'text': f"Line {i}: the Echo of this place remembers {rng.choice(('fire', 'clocks', 'wells', 'oaks'))}."}
+        if i % 5 == 4:
+            node['choices'] = [{'text': 'Tell me more.', 'next': f'n{rng.randrange(count)}'},
+                               {'text': 'Goodbye.'}]
+        elif i + 1 < count:
+            node['next'] = f'n{i + 1}'
+        nodes[f'n{i}'] = node
+    return {'start': 'n0', 'nodes': nodes}
+
+
+def play_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        script = json.load(f)
+    node_id = script['start']
+    for _ in range(CONVERSATION_LINES):
+        node = script['nodes'][node_id]
+        node_id = node['choices'][0]['next'] if 'choices' in node else node.get('next')
+        if node_id is None:
+            break
+
+
+def play_compiled(path):
+    script = DialogueScript(path)
+    runner = DialogueRunner(script)
+    for _ in range(CONVERSATION_LINES):
+        if runner.finished:
+            break
+        runner.advance(0 if runner.line.choices else None)
+    script.close()
+
+
+def measure(function, path, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(path)
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    function(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(times), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark JSON vs compiled dialogue scripts.')
+    parser.add_argument('--nodes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    print(f"{'nodes':>8}{'JSON KB':>9}{'.dlg KB':>9}{'JSON ms':>9}{'.dlg ms':>9}{'JSON peak MB':>14}{'.dlg peak KB':>14}")
+    with tempfile.TemporaryDirectory() as directory:
+        for count in args.nodes:
+            source = os.path.join(directory, f'site{count}.json')
+            with open(source, 'w', encoding='utf-8') as f:
+                json.dump(make_script(count, rng), f)
+            compiled = compile_script(source)
+            json_s, json_peak = measure(play_json, source, args.repeat)
+            dlg_s, dlg_peak = measure(play_compiled, compiled, args.repeat)
+            print(f"{count:>8}{os.path.getsize(source) / 1024:>9.0f}{os.path.getsize(compiled) / 1024:>9.0f}"
+                  f"{json_s * 1000:>9.2f}{dlg_s * 1000:>9.3f}{json_peak / 1048576:>14.1f}{dlg_peak / 1024:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+# Goal index benchmark: nearest-goal and viewport queries against 10k-1M synthetic goals.
+# Goals are scattered uniformly over a ~20 km square city; queries are random player
+# positions inside it. A linear scan is timed alongside for comparison (on a subset of
+# the queries for the larger sizes, as it gets very slow).
+#     python -m benchmarks.goal_queries --sizes 10000 100000 1000000
+import argparse
+import random
+import time
+
+import benchmarks  # noqa: F401
+
+from geo import MapBounds, haversine_m
+from goal_index import Goal, GoalStore
+
+CITY = MapBounds(51.40, -0.25, 51.58, 0.05) # ~20 km x 20 km
+VIEWPORT_SIZE_DEG = 0.006 # Roughly one phone screen of map at street level
+CHECK_IN_RADIUS_M = 20.0
+
+
+def synthetic_goals(count, rng):
+    for i in range(count):
+        yield Goal(f'goal{i}',
+                   rng.uniform(CITY.south, CITY.north),
+                   rng.uniform(CITY.west, CITY.east))
+
+
+def random_point(rng):
+    return rng.uniform(CITY.south, CITY.north), rng.uniform(CITY.west, CITY.east)
+
+
+def linear_nearest(goals, lat, lon, radius_m):
+    best = None
+    for goal in goals:
+        distance = haversine_m(lat, lon, goal.lat, goal.lon)
+        if distance <= radius_m and (best is None or distance < best[1]):
+            best = (goal, distance)
+    return best
+
+
+def per_query_us(fn, points):
+    start = time.perf_counter()
+    for lat, lon in points:
+        fn(lat, lon)
+    return (time.perf_counter() - start) / len(points) * 1e6
+
+
+def run(size, queries, linear_queries, rng):
+    goals = list(synthetic_goals(size, rng))
+    start = time.perf_counter()
+    store = GoalStore(goals, map_bounds=CITY, check_in_radius_m=CHECK_IN_RADIUS_M)
+    build_s = time.perf_counter() - start
+
+    points = [random_point(rng) for _ in range(queries)]
+    check_in_us = per_query_us(store.check_in, points)
+    nearest_us = per_query_us(lambda lat, lon: store.nearest(lat, lon, 500.0), points)
+
+    def viewport(lat, lon):
+        half = VIEWPORT_SIZE_DEG / 2
+        return store.in_viewport(MapBounds(lat - half, lon - half, lat + half, lon + half))
+    viewport_us = per_query_us(viewport, points)
+
+    linear_points = points[:linear_queries]
+    linear_us = per_query_us(lambda lat, lon: linear_nearest(goals, lat, lon, CHECK_IN_RADIUS_M),
+                             linear_points)
+
+    # Sanity check: the index must agree with the linear scan.
+    for lat, lon in linear_points:
+        expected = linear_nearest(goals, lat, lon, CHECK_IN_RADIUS_M)
+        actual = store.check_in(lat, lon)
+        assert (expected is None) == (actual is None), (lat, lon, expected, actual)
+        if expected is not None:
+            assert abs(expected[1] - actual[1]) < 1e-6, (lat, lon, expected, actual)
+
+    print(f"{size:>9}{build_s * 1000:>12.1f}{check_in_us:>14.1f}{nearest_us:>16.1f}"
+          f"{viewport_us:>15.1f}{linear_us:>15.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the goal spatial index.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--linear-queries', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'goals':>9}{'build ms':>12}{'check-in us':>14}{'nearest500 us':>16}"
+          f"{'viewport us':>15}{'linear us':>15}")
+    for size in args.sizes:
+        run(size, args.queries, args.linear_queries, rng)
+
+
+if __name__ == '__main__':
+    main()
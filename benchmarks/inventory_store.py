@@ -0,0 +1,90 @@
+# Inventory store benchmark: grant (save) latency, startup load latency and compaction
+# time for inventories of 10k+ items, with a rewrite-the-whole-JSON-file store as the
+# baseline the REWARD_SYSTEM notes originally suggested.
+#     python -m benchmarks.inventory_store --sizes 10000 100000
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+import benchmarks  # noqa: F401
+
+from inventory import InventoryStore
+
+IMAGES = ('badge_placeholder.png', 'scroll_placeholder.png', 'artifact_placeholder.png')
+SAMPLE_GRANTS = 200 # Individually timed grants on top of a prefilled inventory
+
+
+def make_items(count):
+    return [(f'item{i}', f'Treasure {i}', IMAGES[i % 3], f'goal{i}', 1700000000.0 + i) for i in range(count)]
+
+
+def bench_store(folder, size):
+    path = os.path.join(folder, f'inventory_{size}.db')
+    store = InventoryStore(path)
+    store.grant_many(make_items(size))
+    latencies = []
+    for i in range(SAMPLE_GRANTS):
+        start = time.perf_counter()
+        store.grant(f'extra{i}', f'Extra {i}', IMAGES[0], goal_id=f'extra_goal{i}')
+        latencies.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    store.compact()
+    compact_s = time.perf_counter() - start
+    store.db.close()
+
+    start = time.perf_counter()
+    reopened = InventoryStore(path)
+    count = len(reopened.items)
+    load_s = time.perf_counter() - start
+    reopened.close()
+    assert count == size + SAMPLE_GRANTS
+    return latencies, load_s, compact_s, os.path.getsize(path)
+
+
+def bench_json(folder, size, grants):
+    path = os.path.join(folder, f'inventory_{size}.json')
+    items = [dict(zip(('item_id', 'name', 'image', 'goal_id', 'collected_at'), item)) for item in make_items(size)]
+    latencies = []
+    for i in range(grants):
+        items.append({'item_id': f'extra{i}', 'name': f'Extra {i}', 'image': IMAGES[0],
+                      'goal_id': f'extra_goal{i}', 'collected_at': time.time()})
+        start = time.perf_counter()
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(items, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        latencies.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    with open(path) as f:
+        json.load(f)
+    return latencies, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark inventory load/save latency.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 50000, 100000])
+    parser.add_argument('--json-grants', type=int, default=10, help='grants timed for the JSON baseline')
+    args = parser.parse_args()
+
+    print(f"{'items':>8}{'store':>7}{'grant ms p50':>14}{'grant ms p99':>14}{'load ms':>10}"
+          f"{'compact ms':>12}{'size KB':>10}")
+    with tempfile.TemporaryDirectory() as folder:
+        for size in args.sizes:
+            latencies, load_s, compact_s, nbytes = bench_store(folder, size)
+            latencies = sorted(l * 1000 for l in latencies)
+            print(f"{size:>8}{'wal':>7}{statistics.median(latencies):>14.3f}"
+                  f"{latencies[int(len(latencies) * 0.99) - 1]:>14.3f}{load_s * 1000:>10.1f}"
+                  f"{compact_s * 1000:>12.1f}{nbytes / 1024:>10.0f}")
+            latencies, load_s = bench_json(folder, size, args.json_grants)
+            latencies = sorted(l * 1000 for l in latencies)
+            print(f"{size:>8}{'json':>7}{statistics.median(latencies):>14.3f}{latencies[-1]:>14.3f}"
+                  f"{load_s * 1000:>10.1f}{'-':>12}{'-':>10}")
+
+
+if __name__ == '__main__':
+    main()
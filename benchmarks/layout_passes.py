@@ -0,0 +1,65 @@
+# Layout pass benchmark: layout passes (do_layout calls) per frame on the AR and map screens,
+# idle and while their content changes: dialogue lines advancing on the AR screen (with a
+# synthetic camera feed), a walk being replayed on the map (player marker, geofence status
+# badges). A screen that only animates or changes text should not need any layout passes.
+#     python -m benchmarks.layout_passes --frames 300
+import argparse
+import os
+
+import benchmarks
+
+
+def measure(counter, frames, step=None, every=10):
+    counter.reset()
+    for frame in range(frames):
+        if step is not None and frame % every == 0:
+            step(frame // every)
+        benchmarks.run_frames(1)
+        counter.next_frame()
+    return counter.summary()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Count layout passes per frame on the AR and map screens.')
+    parser.add_argument('--frames', type=int, default=300)
+    args = parser.parse_args()
+
+    os.environ.setdefault('TIME_TRAVELER_CAMERA', 'synthetic') # Before main is imported
+    window = benchmarks.ensure_window()
+    from kivy.uix.layout import Layout
+    from kivy.uix.screenmanager import NoTransition
+    from location import load_trace
+    from main import DEMO_TRACE, PRELOAD_HINTS, SCREENS
+    from profiling import layout_counter
+    from screen_registry import LazyScreenManager
+
+    sm = LazyScreenManager(transition=NoTransition())
+    for name, screen_class in SCREENS:
+        sm.register(name, screen_class, preload=PRELOAD_HINTS.get(name, ()))
+    sm.build_all()
+    window.add_widget(sm)
+    layout_counter.install(Layout) # After every screen module has been imported
+    fixes = load_trace(DEMO_TRACE)
+
+    def advance_dialogue(step):
+        sm.current_screen.advance_dialogue(None)
+
+    def walk(step):
+        map_screen = sm.current_screen
+        for fix in fixes[step * 5:step * 5 + 5]:
+            map_screen.location.push(fix)
+
+    print(f"{'screen':<18}{'activity':<18}{'passes/frame':>14}{'max':>6}  busiest layouts")
+    for screen, activity, step in (('ar_camera_view', 'idle', None), ('ar_camera_view', 'dialogue', advance_dialogue),
+                                   ('map_view', 'idle', None), ('map_view', 'walking', walk)):
+        sm.current = screen
+        benchmarks.run_frames(30) # Let the screen settle
+        summary = measure(layout_counter, args.frames, step)
+        busiest = ', '.join(f"{name} {count}" for name, count in summary['by_class'].items())
+        print(f"{screen:<18}{activity:<18}{summary['per_frame']:>14.2f}{summary['max_per_frame']:>6}  {busiest}")
+    sm.current_screen.dispatch('on_leave')
+    layout_counter.uninstall()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+# Location pipeline benchmark: replays a GPX/CSV trace (or a synthetic high-rate walk)
+# through LocationPipeline against a simulated 60 fps frame clock.
+# Reports filter throughput, how many raw fixes were coalesced into marker moves,
+# fix-to-frame latency and, for synthetic walks where the true path is known, how far
+# raw and smoothed positions are from it.
+#     python -m benchmarks.location_replay --trace traces/demo_walk.csv
+#     python -m benchmarks.location_replay --synthetic 100000 --rate 200
+import argparse
+import math
+import random
+import time
+
+import benchmarks  # noqa: F401
+
+from geo import haversine_m
+from location import ExponentialFilter, Fix, KalmanFilter, LocationPipeline, load_trace, offset_m
+
+START = (51.5030, -0.1250)
+
+
+def synthetic_walk(count, rate_hz, noise_m, rng):
+    # (true position, noisy Fix) pairs for a walk along a slow curve at 1.4 m/s.
+    truth = []
+    fixes = []
+    heading = 0.0
+    lat, lon = START
+    for i in range(count):
+        t = i / rate_hz
+        heading += rng.gauss(0, 0.02)
+        step = 1.4 / rate_hz
+        lat, lon = offset_m(lat, lon, step * math.cos(heading), step * math.sin(heading))
+        truth.append((lat, lon))
+        noisy = offset_m(lat, lon, rng.gauss(0, noise_m), rng.gauss(0, noise_m))
+        fixes.append(Fix(noisy[0], noisy[1], noise_m * 2, t))
+    return truth, fixes
+
+
+def replay(fixes, smoothing, fps):
+    now = [0.0]
+    pipeline = LocationPipeline(smoothing, clock=lambda: now[0])
+    smoothed_at = {} # raw index -> smoothed position delivered while it was the newest fix
+    frame = 1.0 / fps
+    next_frame = fixes[0].timestamp + frame
+    start = time.perf_counter()
+    for i, fix in enumerate(fixes):
+        while fix.timestamp >= next_frame:
+            now[0] = next_frame
+            delivered = pipeline.flush()
+            if delivered is not None:
+                smoothed_at[i - 1] = (delivered.lat, delivered.lon)
+            next_frame += frame
+        now[0] = fix.timestamp
+        pipeline.push(fix)
+    now[0] = next_frame
+    pipeline.flush()
+    elapsed = time.perf_counter() - start
+    return pipeline.stats(), elapsed, smoothed_at
+
+
+def rms(errors):
+    return math.sqrt(sum(e * e for e in errors) / len(errors)) if errors else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the GPS smoothing/coalescing pipeline.')
+    parser.add_argument('--trace', help='GPX or CSV trace to replay')
+    parser.add_argument('--synthetic', type=int, default=50000, help='number of synthetic fixes')
+    parser.add_argument('--rate', type=float, default=200.0, help='synthetic fix rate (Hz)')
+    parser.add_argument('--noise', type=float, default=5.0, help='synthetic GPS noise (m, 1 sigma)')
+    parser.add_argument('--fps', type=float, default=60.0)
+    args = parser.parse_args()
+
+    truth = None
+    if args.trace:
+        fixes = load_trace(args.trace)
+        print(f"trace {args.trace}: {len(fixes)} fixes")
+    else:
+        truth, fixes = synthetic_walk(args.synthetic, args.rate, args.noise, random.Random(1))
+        print(f"synthetic walk: {len(fixes)} fixes at {args.rate:g} Hz, {args.noise:g} m noise")
+
+    print(f"{'filter':<12}{'fixes/s':>12}{'moves':>9}{'coalesced':>11}{'mean lat ms':>13}"
+          f"{'max lat ms':>12}{'raw rms m':>11}{'smooth rms m':>14}")
+    for name, smoothing in (('kalman', KalmanFilter()), ('exponential', ExponentialFilter(0.2))):
+        stats, elapsed, smoothed_at = replay(fixes, smoothing, args.fps)
+        raw_error = smooth_error = '-' # Unknown for recorded traces
+        if truth is not None:
+            raw_error = f"{rms([haversine_m(*truth[i], fixes[i].lat, fixes[i].lon) for i in smoothed_at]):.2f}"
+            smooth_error = f"{rms([haversine_m(*truth[i], *pos) for i, pos in smoothed_at.items()]):.2f}"
+        print(f"{name:<12}{len(fixes) / elapsed:>12.0f}{stats['deliveries']:>9}{stats['coalesced']:>11}"
+              f"{stats['mean_latency_s'] * 1000:>13.2f}{stats['max_latency_s'] * 1000:>12.2f}"
+              f"{raw_error:>11}{smooth_error:>14}")
+
+
+if __name__ == '__main__':
+    main()
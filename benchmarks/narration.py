@@ -0,0 +1,92 @@
+# Story narration benchmark: time from pressing Read Aloud to the first audio, and the
+# number of gaps while reading a story, with a cold and a warm speech cache, with and
+# without pre-synthesis when the story is shown. Synthesis is simulated by FakeEngine
+# (`--delay` seconds per sentence) and playback by a player that finishes each sentence
+# after `--sentence-time` seconds; runs without Kivy.
+#     python -m benchmarks.narration --paragraphs 20 --delay 0.3
+import argparse
+import queue
+import tempfile
+import time
+
+from narration import FakeEngine, Narrator, SpeechCache
+
+SENTENCE = "The clock tower struck {} as the traveler stepped out of the portal."
+
+
+class TimedPlayer(object):
+    # Counts sentences started and gaps (waiting for audio between two sentences).
+    def __init__(self, sentence_time):
+        self.sentence_time = sentence_time
+        self.started = 0
+        self.finishing = None
+
+    def play(self, path, on_finished):
+        self.started += 1
+        self.finishing = (time.perf_counter() + self.sentence_time, on_finished)
+
+    def pause(self):
+        pass
+
+    def resume(self):
+        pass
+
+    def stop(self):
+        self.finishing = None
+
+
+def read_story(directory, text, delay, sentence_time, prefetch, show_time):
+    tasks = queue.Queue() # Worker results, run here as the app's Clock would
+    player = TimedPlayer(sentence_time)
+    narrator = Narrator(FakeEngine(delay=delay), SpeechCache(directory), player, scheduler=tasks.put)
+    gaps = []
+
+    def run_until(condition):
+        while not condition():
+            if player.finishing is not None and time.perf_counter() >= player.finishing[0]:
+                on_finished = player.finishing[1]
+                player.finishing = None
+                on_finished()
+                if narrator.state == 'waiting':
+                    gaps.append(time.perf_counter())
+                continue
+            try:
+                tasks.get(timeout=0.001)()
+            except queue.Empty:
+                pass
+
+    narrator.load(text, prefetch=prefetch)
+    deadline = time.perf_counter() + show_time # The reader looks at the story before pressing the button
+    run_until(lambda: time.perf_counter() >= deadline)
+    narrator.play()
+    run_until(lambda: narrator.first_audio_latency is not None)
+    first_audio = narrator.first_audio_latency
+    run_until(lambda: narrator.state == 'idle')
+    stats = narrator.stats()
+    narrator.shutdown()
+    return first_audio, len(gaps), stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark story narration latency.')
+    parser.add_argument('--paragraphs', type=int, default=5)
+    parser.add_argument('--sentences', type=int, default=4, help='sentences per paragraph')
+    parser.add_argument('--delay', type=float, default=0.2, help='synthesis seconds per sentence')
+    parser.add_argument('--sentence-time', type=float, default=0.05, help='playback seconds per sentence')
+    parser.add_argument('--show-time', type=float, default=1.0, help='seconds between showing and pressing play')
+    args = parser.parse_args()
+
+    text = '\n\n'.join(' '.join(SENTENCE.format(p * args.sentences + s) for s in range(args.sentences))
+                         for p in range(args.paragraphs)) # Distinct sentences, so none share audio
+    print(f"{'cache':<8}{'prefetch':<10}{'first audio ms':>16}{'gaps':>7}{'synthesized':>13}{'cache hits':>12}")
+    for prefetch in (False, True):
+        with tempfile.TemporaryDirectory() as directory:
+            for cache in ('cold', 'warm'):
+                first_audio, gaps, stats = read_story(directory, text, args.delay, args.sentence_time,
+                                                      prefetch, args.show_time)
+                print(f"{cache:<8}{str(prefetch):<10}{first_audio * 1000:>16.1f}{gaps:>7}"
+                      f"{stats['synthesized']:>13}{stats['cache_hits']:>12}")
+
+
+if __name__ == '__main__':
+    main()
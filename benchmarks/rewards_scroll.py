@@ -0,0 +1,66 @@
+# Rewards grid benchmark: build time, scroll frame time and memory of RewardsScreen
+# with 100, 10k and 100k inventory items.
+# The screen is added to the window and scrolled from top to bottom in small steps,
+# one frame per step; the number of item cells that exist as widgets is reported too.
+#     python -m benchmarks.rewards_scroll --sizes 100 10000 100000
+import argparse
+import gc
+import statistics
+import time
+import tracemalloc
+
+import benchmarks
+
+from inventory import InventoryItem
+from main import RewardsScreen
+
+IMAGES = ('badge_placeholder.png', 'scroll_placeholder.png', 'artifact_placeholder.png')
+
+
+def make_items(count):
+    return [InventoryItem(i, f'item{i}', f'Treasure {i}', IMAGES[i % 3], f'goal{i}', 0.0) for i in range(count)]
+
+
+def run(window, size, steps):
+    items = make_items(size)
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    screen = RewardsScreen(name='rewards_screen')
+    screen.show_items(items)
+    window.add_widget(screen)
+    benchmarks.run_frames(2) # First layout and draw
+    build_s = time.perf_counter() - start
+    build_bytes = tracemalloc.get_traced_memory()[0]
+
+    frame_times = []
+    view = screen.inventory_view
+    for step in range(1, steps + 1):
+        view.scroll_y = 1.0 - step / steps
+        frame_times.extend(benchmarks.run_frames(1))
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    cells = len(view.layout_manager.children)
+    window.remove_widget(screen)
+
+    frame_ms = sorted(t * 1000 for t in frame_times)
+    print(f"{size:>8}{build_s * 1000:>11.1f}{statistics.median(frame_ms):>15.2f}"
+          f"{frame_ms[int(len(frame_ms) * 0.95) - 1]:>13.2f}{frame_ms[-1]:>11.2f}{cells:>8}"
+          f"{build_bytes / 1048576:>11.1f}{peak_bytes / 1048576:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the virtualized rewards grid.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 10000, 100000])
+    parser.add_argument('--steps', type=int, default=300, help='scroll steps (one frame each)')
+    args = parser.parse_args()
+
+    window = benchmarks.ensure_window()
+    print(f"{'items':>8}{'build ms':>11}{'frame ms p50':>15}{'p95 ms':>13}{'max ms':>11}{'cells':>8}"
+          f"{'build MB':>11}{'peak MB':>10}")
+    for size in args.sizes:
+        run(window, size, args.steps)
+
+
+if __name__ == '__main__':
+    main()
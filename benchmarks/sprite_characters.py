@@ -0,0 +1,78 @@
+# AR character animation benchmark: frame time with 50+ sprite-sheet characters playing
+# idle/talk/wave at once, all sharing one sheet texture.
+# A synthetic sheet (same layout as sprite_anim.SHEETS['character']) is generated, so no
+# art is needed. Garbage collections during the run are counted as a measure of churn.
+#     python -m benchmarks.sprite_characters --characters 50 100 200
+import argparse
+import gc
+import random
+import statistics
+
+import benchmarks
+
+SHEET = 'benchmark_character'
+
+
+def make_sheet():
+    from kivy.graphics.texture import Texture
+    from sprite_anim import SHEETS, SpriteSheet, register_sheet
+    spec = SHEETS['character']
+    width, height = spec['frame_size']
+    columns = max(clip['frames'] for clip in spec['clips'].values())
+    rows = len(spec['clips'])
+    texture = Texture.create(size=(width * columns, height * rows), colorfmt='rgb')
+    pixels = bytearray()
+    for y in range(height * rows):
+        pixels += bytes(((y * 7) % 256, (y * 3) % 256, 128)) * (width * columns)
+    texture.blit_buffer(bytes(pixels), colorfmt='rgb', bufferfmt='ubyte')
+    register_sheet(SHEET, SpriteSheet(texture, (width, height), spec['clips']))
+
+
+def run(window, count, frames):
+    from kivy.uix.floatlayout import FloatLayout
+    from sprite_anim import CharacterSprite
+    layout = FloatLayout(size=window.size)
+    columns = 10
+    size = (window.width / columns, window.width / columns * 1.33)
+    characters = []
+    for i in range(count):
+        character = CharacterSprite(sheet=SHEET, size_hint=(None, None), size=size,
+                                    pos=((i % columns) * size[0], (i // columns) * size[1] % window.height))
+        characters.append(character)
+        layout.add_widget(character)
+    window.add_widget(layout)
+    benchmarks.run_frames(5) # Warm up
+
+    rng = random.Random(count)
+    collections = sum(stat['collections'] for stat in gc.get_stats())
+    frame_times = []
+    for frame in range(frames):
+        if frame % 10 == 0: # Some characters change state every few frames
+            character = rng.choice(characters)
+            rng.choice((character.idle, character.wave, lambda: character.talk(1.0)))()
+        frame_times.extend(benchmarks.run_frames(1))
+    collections = sum(stat['collections'] for stat in gc.get_stats()) - collections
+    window.remove_widget(layout)
+    for character in characters:
+        character.pause()
+
+    frame_ms = sorted(t * 1000 for t in frame_times)
+    print(f"{count:>11}{statistics.median(frame_ms):>15.2f}{frame_ms[int(len(frame_ms) * 0.95) - 1]:>9.2f}"
+          f"{frame_ms[-1]:>9.2f}{collections:>13}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark sprite-sheet character animation.')
+    parser.add_argument('--characters', type=int, nargs='+', default=[50, 100, 200])
+    parser.add_argument('--frames', type=int, default=600)
+    args = parser.parse_args()
+
+    window = benchmarks.ensure_window()
+    make_sheet()
+    print(f"{'characters':>11}{'frame ms p50':>15}{'p95':>9}{'max':>9}{'gc passes':>13}")
+    for count in args.characters:
+        run(window, count, args.frames)
+
+
+if __name__ == '__main__':
+    main()
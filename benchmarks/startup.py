@@ -0,0 +1,59 @@
+# Startup benchmark: eager vs lazy screen construction.
+# "eager" builds every registered screen before showing the start menu (the old
+# TimeTravelerApp.build behaviour), "lazy" only builds the start screen and leaves
+# the rest to LazyScreenManager. The time to build the remaining screens is also
+# reported, since lazy construction moves that cost rather than removing it.
+#     python -m benchmarks.startup --rounds 20
+import argparse
+import gc
+import statistics
+import time
+
+import benchmarks  # noqa: F401 (sets Kivy environment defaults)
+
+from kivy.uix.screenmanager import NoTransition
+
+from main import SCREENS, PRELOAD_HINTS
+from screen_registry import LazyScreenManager
+
+
+def build_manager(eager):
+    sm = LazyScreenManager(transition=NoTransition())
+    for name, screen_class in SCREENS:
+        sm.register(name, screen_class, preload=PRELOAD_HINTS.get(name, ()))
+    if eager:
+        sm.build_all()
+    sm.current = 'start'
+    return sm
+
+
+def time_round(eager):
+    gc.collect()
+    start = time.perf_counter()
+    sm = build_manager(eager)
+    first_screen = time.perf_counter() - start
+    start = time.perf_counter()
+    sm.build_all() # Whatever is left: nothing for eager, the preload work for lazy
+    remaining = time.perf_counter() - start
+    sm.clear_widgets()
+    return first_screen, remaining
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare eager and lazy screen construction.')
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    time_round(eager=True) # Warm up imports, font and image caches
+
+    print(f"{'mode':<8}{'start screen ms (median)':>28}{'min':>10}{'remaining screens ms':>24}")
+    for mode, eager in (('eager', True), ('lazy', False)):
+        results = [time_round(eager) for _ in range(args.rounds)]
+        first = [r[0] * 1000 for r in results]
+        remaining = [r[1] * 1000 for r in results]
+        print(f"{mode:<8}{statistics.median(first):>28.2f}{min(first):>10.2f}"
+              f"{statistics.median(remaining):>24.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+# Text rendering benchmark: the How to Play instructions and a long story, shown in StoryViews
+# as on HowToPlayScreen and StoryScreen, through the shared text cache. Per screen (cache
+# owner) it reports renders, cache hits and render time for a first visit, a revisit after
+# the views were rebuilt, and a rotation burst (the window width changing on every frame
+# for a while, then settling, then rotating back). The same is run with reflows on every
+# width change instead of debounced ones, and without a text cache.
+#     python -m benchmarks.text_reflow --paragraphs 200 --burst 20
+import argparse
+
+import benchmarks
+
+PORTRAIT = (720, 1280)
+LANDSCAPE = (1280, 720)
+SETTLE_FRAMES = 30 # Frames run after every step, longer than the reflow delay
+
+
+def make_story(paragraphs):
+    from story_engine import Story
+    sentence = 'The clock tower struck noon as the travellers reached the old market square. '
+    return Story('benchmark', 'Benchmark', [f'[b]{i}.[/b] ' + sentence * (2 + i % 6) for i in range(paragraphs)])
+
+
+def instructions():
+    from main import HowToPlayScreen
+    return HowToPlayScreen(name='how_to_play_screen').instructions_view.story
+
+
+def settle(frames=SETTLE_FRAMES):
+    benchmarks.run_frames(frames)
+
+
+def rotate(window, start, end, steps):
+    # Change the window size a little on every frame, from `start` to `end`.
+    for step in range(1, steps + 1):
+        window.size = tuple(int(a + (b - a) * step / steps) for a, b in zip(start, end))
+        benchmarks.run_frames(1)
+    settle()
+
+
+def run(window, mode, stories, burst):
+    from kivy.uix.boxlayout import BoxLayout
+    from story_view import StoryView
+    from text_cache import Debouncer, TextLayoutCache
+    cache = TextLayoutCache(max_bytes=0, max_layouts=0) if mode == 'no cache' else TextLayoutCache()
+
+    def build():
+        root = BoxLayout(orientation='vertical')
+        for owner, story in stories:
+            view = StoryView(owner=owner, text_cache=cache)
+            if mode == 'no debounce':
+                view._reflow = Debouncer(view._rebuild_data, 0) # Next frame: reflows at every width
+            view.show_story(story)
+            root.add_widget(view)
+        window.add_widget(root)
+        return root
+
+    def revisit():
+        window.remove_widget(root_ref[0])
+        root_ref[0] = build()
+        settle()
+
+    window.size = PORTRAIT
+    root_ref = [build()]
+    phases = (('first visit', settle), ('revisit', revisit),
+              ('rotate', lambda: rotate(window, PORTRAIT, LANDSCAPE, burst)),
+              ('rotate back', lambda: rotate(window, LANDSCAPE, PORTRAIT, burst)))
+    results = []
+    for phase, action in phases:
+        cache.reset_stats()
+        action()
+        results.append((phase, {owner: cache.stats(owner) for owner, _ in stories}))
+    window.remove_widget(root_ref[0])
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Text renders and cache hits on first visits, revisits and rotations.')
+    parser.add_argument('--paragraphs', type=int, default=200)
+    parser.add_argument('--burst', type=int, default=20, help='frames the rotation takes')
+    args = parser.parse_args()
+
+    window = benchmarks.ensure_window(PORTRAIT)
+    stories = (('how_to_play', instructions()), ('story_screen', make_story(args.paragraphs)))
+
+    print(f"{'mode':<13}{'phase':<13}{'screen':<14}{'renders':>9}{'hits':>7}{'hit rate':>10}{'render ms':>11}")
+    for mode in ('cache', 'no debounce', 'no cache'):
+        for phase, owners in run(window, mode, stories, args.burst):
+            for owner, stats in owners.items():
+                print(f"{mode:<13}{phase:<13}{owner:<14}{stats['misses']:>9}{stats['hits']:>7}"
+                      f"{stats['hit_rate']:>10.0%}{stats['render_ms']:>11.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+# Screen transition benchmark: frames, dropped frames and frame times of every transition
+# along the main flow (start -> ar_camera_view -> map_view -> story_screen -> rewards_screen
+# and back to start), for each transition mode of transitions.create_transition().
+# The AR screen gets a synthetic camera feed so its live texture is part of the cost.
+#     python -m benchmarks.transitions --modes slide snapshot --rounds 5
+import argparse
+import os
+from collections import defaultdict
+
+import benchmarks
+
+FLOW = ('start', 'ar_camera_view', 'map_view', 'story_screen', 'rewards_screen', 'start')
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+def run(window, mode, rounds):
+    from main import PRELOAD_HINTS, SCREENS
+    from screen_registry import LazyScreenManager
+    from transitions import create_transition, recent_transitions
+    sm = LazyScreenManager(transition=create_transition(mode))
+    for name, screen_class in SCREENS:
+        sm.register(name, screen_class, preload=PRELOAD_HINTS.get(name, ()))
+    sm.build_all() # Construction is measured by benchmarks.startup, not here
+    sm.current = FLOW[0]
+    window.add_widget(sm)
+    benchmarks.run_frames(10)
+
+    recent_transitions.clear()
+    frame_times = defaultdict(list) # (from, to) -> frame seconds while transitioning
+    for _ in range(rounds):
+        for previous, name in zip(FLOW, FLOW[1:]):
+            sm.current = name
+            while sm.transition.is_active:
+                frame_times[previous, name].extend(benchmarks.run_frames(1))
+            benchmarks.run_frames(5) # Let the entered screen settle
+    window.remove_widget(sm)
+    sm.current_screen.dispatch('on_leave') # Stops the camera feed if it is the AR screen
+
+    records = defaultdict(list)
+    for record in recent_transitions:
+        records[record.screen_out, record.screen_in].append(record)
+    for key in zip(FLOW, FLOW[1:]):
+        done = records.get(key, [])
+        frames = sum(record.frames for record in done)
+        dropped = sum(record.dropped for record in done)
+        frame_ms = [t * 1000 for t in frame_times[key]]
+        print(f"{mode:<10}{key[0] + ' -> ' + key[1]:<36}{frames / max(1, len(done)):>8.1f}"
+              f"{dropped / max(1, len(done)):>10.1f}{percentile(frame_ms, 0.5):>15.2f}"
+              f"{percentile(frame_ms, 0.95):>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark screen transitions per mode.')
+    parser.add_argument('--modes', nargs='+', default=['slide', 'snapshot', 'none'])
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ.setdefault('TIME_TRAVELER_CAMERA', 'synthetic') # Before main is imported
+    window = benchmarks.ensure_window()
+    print(f"{'mode':<10}{'transition':<36}{'frames':>8}{'dropped':>10}{'frame ms p50':>15}{'p95':>9}")
+    for mode in args.modes:
+        run(window, mode, args.rounds)
+
+
+if __name__ == '__main__':
+    main()
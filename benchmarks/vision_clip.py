@@ -0,0 +1,112 @@
+# AR marker tracking on a clip: detection rate and latency of vision.VisionStage, and how
+# closely the 60 Hz interpolated overlay pose (AnchorFollower) follows the marker.
+# Without --video a synthetic clip is generated: a white square circling on a dark
+# background, whose true position is known, so tracking error is reported too.
+# Needs no Kivy and no camera; OpenCV/NumPy are used when installed.
+#     python -m benchmarks.vision_clip
+#     python -m benchmarks.vision_clip --video marker_walk.mp4 --seconds 20
+import argparse
+import math
+import statistics
+import time
+
+import benchmarks
+
+from frame_source import FRAME_CHANNELS, FrameSource, VideoFrameSource
+from vision import AnchorFollower, BrightMarkerDetector, VisionStage, create_detector
+
+
+class CirclingMarkerSource(FrameSource):
+    # Dark frames with a white square moving on a circle; truth(t) is its centre at time t.
+
+    def __init__(self, width=1280, height=720, fps=30, marker=80, period=4.0, **kwargs):
+        super(CirclingMarkerSource, self).__init__(width, height, fps, **kwargs)
+        self.marker = marker
+        self.period = period
+        self._blank = bytes(width * height * FRAME_CHANNELS)
+        self._white = b'\xff' * (marker * FRAME_CHANNELS)
+        self.started = time.perf_counter()
+
+    def truth(self, t):
+        # Marker centre (x, y) in 0..1 frame coordinates, y downwards.
+        angle = 2 * math.pi * (t - self.started) / self.period
+        return 0.5 + 0.3 * math.cos(angle), 0.5 + 0.3 * math.sin(angle)
+
+    def read_into(self, buffer):
+        x, y = self.truth(time.perf_counter())
+        left = int(x * self.width - self.marker / 2)
+        top = int(y * self.height - self.marker / 2)
+        buffer[:] = self._blank
+        row_bytes = self.width * FRAME_CHANNELS
+        for row in range(top, top + self.marker):
+            offset = row * row_bytes + left * FRAME_CHANNELS
+            buffer[offset:offset + len(self._white)] = self._white
+        return True
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark marker tracking on a recorded or synthetic clip.')
+    parser.add_argument('--video', help='recorded clip (needs OpenCV); default: synthetic circling marker')
+    parser.add_argument('--seconds', type=float, default=8)
+    parser.add_argument('--rate', type=float, default=10, help='detections per second')
+    parser.add_argument('--display-hz', type=float, default=60)
+    args = parser.parse_args()
+
+    if args.video:
+        source = VideoFrameSource(args.video, loop=True)
+        detector = create_detector()
+    else:
+        source = CirclingMarkerSource()
+        detector = BrightMarkerDetector()
+    stage = VisionStage(detector, rate=args.rate)
+    stage.attach(source)
+    follower = AnchorFollower(duration=1.0 / args.rate)
+    source.start()
+
+    # Stand-in for the UI: poll the slot at display rate, like the AR screen does every frame.
+    poses = 0
+    errors = []
+    steps = []
+    previous = None
+    start = time.perf_counter()
+    while time.perf_counter() - start < args.seconds:
+        pose = follower.update(stage.anchors)
+        now = time.perf_counter()
+        if pose is not None:
+            poses += 1
+            if previous is not None:
+                steps.append(math.hypot(pose.x - previous.x, pose.y - previous.y))
+            if hasattr(source, 'truth'):
+                x, y = source.truth(now)
+                errors.append(math.hypot(pose.x - x, pose.y - y))
+        previous = pose
+        time.sleep(max(0.0, 1.0 / args.display_hz - (time.perf_counter() - now)))
+    elapsed = time.perf_counter() - start
+    source.stop()
+    stage.shutdown()
+
+    stats = stage.stats()
+    last = stage.anchors.get()[1]
+    detect_ms = [t * 1000 for t in stage.detect_times]
+    print(f"clip: {args.video or 'synthetic'} {source.width}x{source.height}, detector: {type(detector).__name__}")
+    print(f"frames: {source.stats()['published'] / elapsed:.1f}/s, detections: {stats['published'] / elapsed:.1f}/s "
+          f"(skipped {stats['skipped']} while busy)")
+    print(f"detect ms: p50 {percentile(detect_ms, 0.5):.2f}, p95 {percentile(detect_ms, 0.95):.2f}")
+    if last is not None:
+        print(f"capture -> result ms (last): {last.latency * 1000:.1f}")
+    print(f"overlay updates with a pose: {poses / elapsed:.1f}/s")
+    if steps:
+        print(f"overlay step per display frame: mean {statistics.mean(steps):.4f}, "
+              f"max {max(steps):.4f} (frame widths)")
+    if errors:
+        print(f"overlay error vs truth: p50 {percentile(errors, 0.5):.4f}, p95 {percentile(errors, 0.95):.4f} "
+              f"(frame widths; includes detection latency)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+from collections import OrderedDict
+
+from kivy.clock import Clock
+from kivy.graphics import Color, InstructionGroup, Rectangle, RoundedRectangle
+from kivy.metrics import dp, sp
+from kivy.uix.widget import Widget
+
+import assets
+from text_cache import shared_text_cache
+
+# AR_RENDERING_POINT: Canvas Overlay Layer
+# Markers, badges and dialogue bubbles drawn straight onto one widget's canvas instead of
+# being Buttons and Labels inside nested layouts. An item is a few canvas instructions
+# (background, text texture or image) plus the box it covers; the layer places items
+# itself from a fractional anchor of its own size, or at a point, so changing text or
+# moving an item never asks any layout for a pass. Taps are hit-tested against the boxes,
+# topmost item first, and go to the item's on_press(item).
+# Bubble and badge text is rendered through text_cache.shared_text_cache, so a line shown
+# before (or the same text in another bubble) reuses its texture.
+
+BUBBLE_WIDTH = '300dp'
+BUBBLE_PADDING = '10dp'
+BUBBLE_RADIUS = '8dp'
+BUBBLE_COLOR = (0.2, 0.6, 0.8, 0.8)
+BADGE_COLOR = (0, 0, 0, 0.5)
+TEXT_COLOR = (1, 1, 1, 1)
+FONT_SIZE = '15sp'
+
+
+class OverlayItem(object):
+    def __init__(self, item_id, size, anchor=None, point=None, anchor_y='bottom', offset=(0, 0), on_press=None):
+        self.id = item_id
+        self.size = size
+        self.anchor = anchor # (fx, fy) fraction of the layer, or None to use `point`
+        self.point = point # (x, y) in the layer's parent coordinates
+        self.anchor_y = anchor_y # Which part of the item sits at the anchor: 'bottom', 'center' or 'top'
+        self.offset = offset
+        self.on_press = on_press
+        self.box = (0, 0, 0, 0) # x, y, width, height once placed
+        self.group = InstructionGroup()
+        self.background = None
+        self.content = None # Rectangle with the text or image texture
+        self.render = None # callable() -> that texture, to bring it back after release()
+        self.released_size = None # Size of the content while its texture is released
+        self.padding = 0
+
+    def collide_point(self, x, y):
+        bx, by, bw, bh = self.box
+        return bx <= x <= bx + bw and by <= y <= by + bh
+
+
+class OverlayLayer(Widget):
+    def __init__(self, **kwargs):
+        super(OverlayLayer, self).__init__(**kwargs)
+        self.items = OrderedDict() # item id -> OverlayItem, drawn in this order
+        self.hit_tests = 0
+        self._trigger_place = Clock.create_trigger(self._place_all)
+        self.bind(pos=self._trigger_place, size=self._trigger_place)
+
+    # --- Items ---
+    def bubble(self, item_id, text, width=BUBBLE_WIDTH, color=BUBBLE_COLOR, text_color=TEXT_COLOR,
+               font_size=FONT_SIZE, **placement):
+        # Text wrapped to `width` on a rounded background; `placement` as for OverlayItem.
+        width = dp(width) if isinstance(width, str) else width
+        padding = dp(BUBBLE_PADDING)
+        text_width, text_size = width - 2 * padding, sp(font_size)
+        texture = shared_text_cache.render(text, text_width, text_size, owner='overlay')
+        item = OverlayItem(item_id, (width, texture.height + 2 * padding), **placement)
+        item.render = lambda: shared_text_cache.render(text, text_width, text_size, owner='overlay')
+        item.padding = padding
+        item.group.add(Color(*color))
+        item.background = RoundedRectangle(radius=[dp(BUBBLE_RADIUS)])
+        item.group.add(item.background)
+        item.group.add(Color(*text_color))
+        item.content = Rectangle(texture=texture, size=texture.size)
+        item.group.add(item.content)
+        return self._add(item)
+
+    def badge(self, item_id, text, width, **placement):
+        # A bubble with a dark translucent background, for status lines.
+        placement.setdefault('color', BADGE_COLOR)
+        return self.bubble(item_id, text, width=width, **placement)
+
+    def marker(self, item_id, source, size=('30dp', '30dp'), **placement):
+        # The shared texture of image `source` (assets.texture).
+        size = tuple(dp(side) if isinstance(side, str) else side for side in size)
+        item = OverlayItem(item_id, size, **placement)
+        item.render = lambda: assets.texture(source)
+        item.group.add(Color(1, 1, 1, 1))
+        item.content = Rectangle(texture=assets.texture(source), size=size)
+        item.group.add(item.content)
+        return self._add(item)
+
+    def _add(self, item):
+        self.remove(item.id)
+        self.items[item.id] = item
+        self.canvas.add(item.group)
+        self._place(item)
+        return item
+
+    def get(self, item_id):
+        return self.items.get(item_id)
+
+    def remove(self, item_id):
+        item = self.items.pop(item_id, None)
+        if item is not None:
+            self.canvas.remove(item.group)
+        return item
+
+    def clear(self):
+        for item_id in list(self.items):
+            self.remove(item_id)
+
+    def release(self):
+        # Drop the items' textures (e.g. while the app is paused); restore() renders them again.
+        for item in self.items.values():
+            if item.content.texture is not None:
+                item.released_size = item.content.size
+                item.content.texture = None
+                item.content.size = (0, 0) # Not a blank box until restored
+
+    def restore(self):
+        for item in self.items.values():
+            if item.content.texture is None and item.released_size is not None:
+                item.content.texture = item.render()
+                item.content.size, item.released_size = item.released_size, None
+
+    def move(self, item_id, x, y):
+        # Put an item at a point (e.g. projected from lat/lon) instead of its anchor.
+        item = self.items[item_id]
+        item.anchor = None
+        item.point = (x, y)
+        self._place(item)
+
+    # --- Placement ---
+    def _place_all(self, *args):
+        for item in self.items.values():
+            self._place(item)
+
+    def _place(self, item):
+        width, height = item.size
+        if item.anchor is not None:
+            x = self.x + item.anchor[0] * self.width
+            y = self.y + item.anchor[1] * self.height
+        elif item.point is not None:
+            x, y = item.point
+        else:
+            x, y = self.center
+        x += item.offset[0] - width / 2
+        y += item.offset[1]
+        if item.anchor_y == 'top':
+            y -= height
+        elif item.anchor_y == 'center':
+            y -= height / 2
+        item.box = (x, y, width, height)
+        if item.background is not None:
+            item.background.pos = (x, y)
+            item.background.size = (width, height)
+        item.content.pos = (x + item.padding, y + item.padding)
+
+    # --- Touches ---
+    def on_touch_down(self, touch):
+        for item in reversed(self.items.values()):
+            if item.on_press is not None:
+                self.hit_tests += 1
+                if item.collide_point(*touch.pos):
+                    item.on_press(item)
+                    return True
+        return super(OverlayLayer, self).on_touch_down(touch)
+
+    def stats(self):
+        return {'items': len(self.items), 'hit_tests': self.hit_tests}
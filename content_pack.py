@@ -0,0 +1,360 @@
+import hashlib
+import json
+import os
+import struct
+import time
+import zipfile
+import zlib
+
+from profiling import log, span
+
+# CONTENT_PACKS: Versioned Offline Content
+# All game content (goals.json, stories/, compiled dialogue/ and images) ships as a single
+# content pack: a zip archive whose central directory is the index, so any entry is read
+# on its own without unpacking the rest. Text is deflated; images are stored as they are,
+# being compressed already. The first entry, manifest.json, holds the pack version and the
+# SHA-256 and size of every entry:
+#     {"format": 1, "version": "2024.06.1", "created": ..., "files": {"stories/goal1.txt":
+#      {"hash": "...", "size": 1234}, ...}}
+# A pack is identified by the hash of its file list (`pack_id`), not just by its version.
+#
+# Updates are shipped as deltas between two pack versions (also zip archives):
+#     delta.json       {"format": 1, "from": <pack id>, "from_version", "to_version",
+#                       "manifest": <new manifest>, "entries": {name: "patch" | "full"}}
+#     patch/<name>     copy/insert instructions against the old entry (make_patch)
+#     full/<name>      the new entry, when it is new or a patch would not be smaller
+# Entries whose hash did not change are not in the delta at all; apply_delta() copies them
+# from the old pack and checks every entry of the result against the new manifest.
+# Entries that must exist as files (images for Kivy, memory-mapped dialogue) are extracted
+# into a cache directory under their content hash, so an update skips every unchanged one.
+# Build packs and deltas with tools/content_pack.py. No Kivy dependency.
+
+PACK_FILE = 'content.pack' # Shipped with the app; updated copies live in App.user_data_dir
+CONTENT_CACHE_DIR = 'content' # Extracted entries, in App.user_data_dir
+UPDATE_DIR = 'updates' # Downloaded deltas waiting to be applied, in App.user_data_dir
+MANIFEST = 'manifest.json'
+DELTA_INDEX = 'delta.json'
+FORMAT = 1
+STORED_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.ogg', '.mp3', '.zip') # Compressed already
+BLOCK_SIZE = 64 # Smallest run of old bytes a patch copies
+PATCH_MAX_RATIO = 0.8 # A patch is only used when it is smaller than this share of the new entry
+
+_COPY = struct.Struct('<BII') # 0, old offset, length
+_INSERT = struct.Struct('<BI') # 1, length, then the bytes
+
+
+class ContentPackError(ValueError):
+    pass
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def pack_id(files):
+    # Identity of a pack's contents: the hash of its manifest's file list.
+    return content_hash(json.dumps(files, sort_keys=True, separators=(',', ':')).encode('utf-8'))
+
+
+def _compression(name):
+    return zipfile.ZIP_STORED if name.lower().endswith(STORED_EXTENSIONS) else zipfile.ZIP_DEFLATED
+
+
+def _write_pack(target, version, entries, created=None):
+    # Write a pack from (name, bytes) pairs, through a temporary file so a reader (or a crash)
+    # never sees half a pack. Entries are written first and the manifest added once all are known.
+    # `created`: the build time to record (default now); a pack rebuilt from a delta keeps
+    # the one of the version it becomes.
+    files = {}
+    temporary = f'{target}.tmp'
+    with zipfile.ZipFile(temporary, 'w') as archive:
+        for name, data in entries:
+            files[name] = {'hash': content_hash(data), 'size': len(data)}
+            archive.writestr(name, data, compress_type=_compression(name))
+        manifest = {'format': FORMAT, 'version': version, 'created': time.time() if created is None else created,
+                    'files': files}
+        archive.writestr(MANIFEST, json.dumps(manifest, indent=1, sort_keys=True), compress_type=zipfile.ZIP_DEFLATED)
+    os.replace(temporary, target)
+    return manifest
+
+
+def build_pack(target, version, files):
+    # Build a pack from {entry name: file path or bytes}; returns its manifest.
+    def entries():
+        for name in sorted(files):
+            source = files[name]
+            if isinstance(source, bytes):
+                yield name, source
+            else:
+                with open(source, 'rb') as f:
+                    yield name, f.read()
+    return _write_pack(target, version, entries())
+
+
+class ContentPack(object):
+    def __init__(self, path):
+        self.path = path
+        try:
+            self._zip = zipfile.ZipFile(path) # Reads the central directory only
+        except (OSError, zipfile.BadZipFile) as e:
+            raise ContentPackError(f'{path} is not a content pack: {e}')
+        try:
+            manifest = json.loads(self._zip.read(MANIFEST).decode('utf-8'))
+        except (KeyError, ValueError) as e:
+            self._zip.close()
+            raise ContentPackError(f'{path} has no valid manifest: {e}')
+        if manifest.get('format') != FORMAT:
+            self._zip.close()
+            raise ContentPackError(f'{path} is a format {manifest.get("format")} pack, expected {FORMAT}.')
+        self.manifest = manifest
+        self.version = manifest['version']
+        self.files = manifest['files']
+        self.id = pack_id(self.files)
+        self.reads = 0
+        self.extracted = 0
+        self.extract_skipped = 0 # Extractions served by an earlier one with the same hash
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._zip.close()
+
+    def __contains__(self, name):
+        return name in self.files
+
+    def __len__(self):
+        return len(self.files)
+
+    def names(self, prefix=''):
+        return sorted(name for name in self.files if name.startswith(prefix))
+
+    def hash(self, name):
+        return self.files[name]['hash']
+
+    def read(self, name):
+        # The bytes of one entry; KeyError if the pack has no such entry.
+        if name not in self.files:
+            raise KeyError(name)
+        with span('read_entry', 'content', entry=name):
+            data = self._zip.read(name)
+        self.reads += 1
+        return data
+
+    def read_text(self, name):
+        return self.read(name).decode('utf-8')
+
+    def read_json(self, name):
+        return json.loads(self.read_text(name))
+
+    def extract(self, name, directory):
+        # Path of the entry as a file in `directory`, named by its content hash; written only
+        # if that hash has not been extracted before.
+        path = os.path.join(directory, self.hash(name) + os.path.splitext(name)[1])
+        if os.path.exists(path):
+            self.extract_skipped += 1
+            return path
+        os.makedirs(directory, exist_ok=True)
+        temporary = f'{path}.tmp'
+        with open(temporary, 'wb') as f:
+            f.write(self.read(name))
+        os.replace(temporary, path)
+        self.extracted += 1
+        return path
+
+    def verify(self):
+        # Names of the entries whose contents do not match the manifest.
+        return [name for name in self.names() if content_hash(self._zip.read(name)) != self.hash(name)]
+
+    def stats(self):
+        return {'version': self.version, 'entries': len(self.files), 'reads': self.reads,
+                'extracted': self.extracted, 'extract_skipped': self.extract_skipped}
+
+
+# --- Binary patches ---
+def make_patch(old, new, block_size=BLOCK_SIZE):
+    # Instructions rebuilding `new` from copies of `old` and inserted bytes. Every aligned
+    # block of `old` is indexed by checksum; `new` is scanned for those blocks at every
+    # offset, so inserted or removed bytes do not hide the unchanged data after them.
+    blocks = {}
+    for offset in range(0, len(old) - block_size + 1, block_size):
+        blocks.setdefault(zlib.adler32(old[offset:offset + block_size]), offset)
+    patch = bytearray()
+    literal = 0 # Start of the new bytes not yet covered by an instruction
+    i = 0
+    last = len(new) - block_size
+    while i <= last:
+        window = new[i:i + block_size]
+        offset = blocks.get(zlib.adler32(window))
+        if offset is None or old[offset:offset + block_size] != window:
+            i += 1
+            continue
+        start, source = i, offset # Grow the match backwards, then forwards
+        while start > literal and source > 0 and new[start - 1] == old[source - 1]:
+            start -= 1
+            source -= 1
+        length = i + block_size - start
+        while start + length + block_size <= len(new) and \
+                new[start + length:start + length + block_size] == old[source + length:source + length + block_size]:
+            length += block_size
+        while start + length < len(new) and source + length < len(old) \
+                and new[start + length] == old[source + length]:
+            length += 1
+        _insert(patch, new[literal:start])
+        patch += _COPY.pack(0, source, length)
+        i = literal = start + length
+    _insert(patch, new[literal:])
+    return bytes(patch)
+
+
+def _insert(patch, data):
+    if data:
+        patch += _INSERT.pack(1, len(data))
+        patch += data
+
+
+def apply_patch(old, patch):
+    out = bytearray()
+    position = 0
+    while position < len(patch):
+        if patch[position] == 0:
+            _, offset, length = _COPY.unpack_from(patch, position)
+            out += old[offset:offset + length]
+            position += _COPY.size
+        else:
+            _, length = _INSERT.unpack_from(patch, position)
+            position += _INSERT.size
+            out += patch[position:position + length]
+            position += length
+    return bytes(out)
+
+
+# --- Deltas between pack versions ---
+def make_delta(old_path, new_path, target):
+    # Write the delta updating pack `old_path` to pack `new_path`; returns its index.
+    with ContentPack(old_path) as old, ContentPack(new_path) as new:
+        entries = {}
+        with zipfile.ZipFile(f'{target}.tmp', 'w', zipfile.ZIP_DEFLATED) as archive:
+            for name in new.names():
+                if name in old and old.hash(name) == new.hash(name):
+                    continue
+                data = new.read(name)
+                if name in old:
+                    patch = make_patch(old.read(name), data)
+                    if len(patch) < len(data) * PATCH_MAX_RATIO:
+                        archive.writestr('patch/' + name, patch)
+                        entries[name] = 'patch'
+                        continue
+                archive.writestr('full/' + name, data, compress_type=_compression(name))
+                entries[name] = 'full'
+            index = {'format': FORMAT, 'from': old.id, 'from_version': old.version,
+                     'to_version': new.version, 'manifest': new.manifest, 'entries': entries}
+            archive.writestr(DELTA_INDEX, json.dumps(index, indent=1, sort_keys=True))
+    os.replace(f'{target}.tmp', target)
+    return index
+
+
+def read_delta_index(path):
+    try:
+        with zipfile.ZipFile(path) as archive:
+            return json.loads(archive.read(DELTA_INDEX).decode('utf-8'))
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile) as e:
+        raise ContentPackError(f'{path} is not a content delta: {e}')
+
+
+def apply_delta(pack_path, delta_path, target=None):
+    # Update pack `pack_path` with a delta, writing the result to `target` (default: in place).
+    # Raises ContentPackError if the delta was made for another pack or the result does not
+    # match its manifest; the pack is left untouched then. Returns the new version.
+    target = target or pack_path
+    index = read_delta_index(delta_path)
+    files = index['manifest']['files']
+    with ContentPack(pack_path) as old, zipfile.ZipFile(delta_path) as delta:
+        if index['from'] != old.id:
+            raise ContentPackError(f'{delta_path} updates version {index["from_version"]}, '
+                                   f'not the installed {old.version}.')
+
+        def entries():
+            for name in sorted(files):
+                kind = index['entries'].get(name)
+                if kind == 'full':
+                    data = delta.read('full/' + name)
+                elif kind == 'patch':
+                    data = apply_patch(old.read(name), delta.read('patch/' + name))
+                else:
+                    data = old.read(name)
+                if content_hash(data) != files[name]['hash']:
+                    raise ContentPackError(f'{name} does not match the manifest of version {index["to_version"]}.')
+                yield name, data
+
+        with span('apply_delta', 'content', version=index['to_version']):
+            try:
+                _write_pack(f'{target}.new', index['to_version'], entries(), index['manifest'].get('created'))
+            except ContentPackError:
+                _remove(f'{target}.new.tmp')
+                raise
+    os.replace(f'{target}.new', target)
+    return index['to_version']
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def install_updates(pack_path, update_dir, target):
+    # Apply every delta in `update_dir` that continues the chain from pack `pack_path`, writing
+    # the updated pack to `target`. Applied and unusable deltas are deleted. Returns the
+    # path of the newest pack (`pack_path` if nothing applied).
+    try:
+        deltas = [os.path.join(update_dir, name) for name in sorted(os.listdir(update_dir))]
+    except OSError:
+        return pack_path
+    indexes = {}
+    for path in deltas:
+        try:
+            indexes[path] = read_delta_index(path)
+        except ContentPackError as e:
+            log.error("Skipping content update: %s", e)
+            _remove(path)
+    if not indexes:
+        return pack_path
+    current = pack_path
+    while True:
+        with ContentPack(current) as pack:
+            current_id = pack.id
+        path = next((path for path, index in indexes.items() if index['from'] == current_id), None)
+        if path is None:
+            break
+        try:
+            version = apply_delta(current, path, target)
+        except (ContentPackError, OSError) as e:
+            log.error("Error applying content update %s: %s", path, e)
+            break
+        del indexes[path]
+        log.info("Content pack updated to version %s.", version)
+        current = target
+        _remove(path)
+    # Deltas that no chain from the current pack reaches (older ones, other branches) would
+    # only be parsed again at every start.
+    reachable = {current_id}
+    growing = True
+    while growing:
+        growing = False
+        for index in indexes.values():
+            if index['from'] in reachable:
+                to_id = pack_id(index['manifest']['files'])
+                if to_id not in reachable:
+                    reachable.add(to_id)
+                    growing = True
+    for path, index in indexes.items():
+        if index['from'] not in reachable:
+            log.info("Removing content update %s: made for version %s, which is not installed.",
+                     path, index['from_version'])
+            _remove(path)
+    return current
@@ -0,0 +1,219 @@
+import json
+import mmap
+import os
+import struct
+from collections import namedtuple
+
+from profiling import log
+
+# CHARACTER_DIALOGUE_SYSTEM: Branching Dialogue Graphs
+# Writers author one JSON file per site in DIALOGUE_DIR:
+#     {"start": "greet",
+#      "nodes": {
+#        "greet": {"speaker": "Alistair", "text": "Hello!", "next": "ask"},
+#        "ask": {"speaker": "Alistair", "text": "Shall we?",
+#                "choices": [{"text": "Yes", "next": "go"}, {"text": "No"}]},
+#        "go": {"speaker": "Alistair", "text": "Off we go."}}}
+# A node without "next" or "choices" (or a choice without "next") ends the dialogue.
+# compile_script() turns that into a compact binary graph (.dlg): every distinct string is
+# stored once, and nodes and choices are fixed-size records in flat arrays that refer to
+# each other by index. DialogueScript memory-maps a compiled file and decodes only the
+# records and strings a conversation actually visits, so opening even a large script costs
+# a header read. Compile with tools/compile_dialogue.py; load_script() also recompiles a
+# script whose JSON is newer than its .dlg, which is convenient while writing.
+#
+# File layout (little endian):
+#   header    MAGIC, version, node/choice/string counts, start node, section offsets
+#   nodes     node_count x (id, speaker, text: string index; next: node index;
+#             first choice: choice index; choice count)
+#   choices   choice_count x (text: string index; next: node index)
+#   id index  node_count x node index, sorted by node id (binary search by id)
+#   strings   (string_count + 1) x offset into the string data, then the UTF-8 data
+
+DIALOGUE_DIR = 'dialogue'
+MAGIC = b'TTDG'
+VERSION = 1
+NONE = 0xFFFFFFFF # "No node" in next fields
+
+_HEADER = struct.Struct('<4sHHIIIIIIIII') # magic, version, reserved, counts x3, start, offsets x5
+_NODE = struct.Struct('<IIIIIHH') # id, speaker, text, next, first_choice, choice_count, reserved
+_CHOICE = struct.Struct('<II') # text, next
+_U32 = struct.Struct('<I')
+
+DialogueLine = namedtuple('DialogueLine', 'index id speaker text next choices')
+DialogueChoice = namedtuple('DialogueChoice', 'text next')
+
+
+class DialogueError(ValueError):
+    pass
+
+
+# --- Compiler ---
+def compile_script(source, target=None):
+    # Compile a JSON dialogue file (or an already parsed dict) into `target` (default for
+    # files: the source path with a .dlg extension). Returns the target path.
+    if isinstance(source, dict):
+        if target is None:
+            raise ValueError('compile_script needs a target when compiling a parsed script.')
+        script = source
+    else:
+        with open(source, 'r', encoding='utf-8') as f:
+            script = json.load(f)
+        target = target or os.path.splitext(source)[0] + '.dlg'
+    with open(target, 'wb') as f:
+        f.write(compile_bytes(script))
+    return target
+
+
+def compile_bytes(script):
+    nodes = script.get('nodes') or {}
+    if not nodes:
+        raise DialogueError('Dialogue script has no nodes.')
+    node_ids = list(nodes)
+    node_index = {node_id: i for i, node_id in enumerate(node_ids)}
+    strings = []
+    string_index = {}
+
+    def intern(text):
+        index = string_index.get(text)
+        if index is None:
+            index = string_index[text] = len(strings)
+            strings.append(text)
+        return index
+
+    def target(node_id, where):
+        if node_id is None:
+            return NONE
+        if node_id not in node_index:
+            raise DialogueError(f'{where} points to unknown node "{node_id}".')
+        return node_index[node_id]
+
+    start = script.get('start', node_ids[0])
+    start_index = target(start, 'start')
+    node_records = []
+    choice_records = []
+    for node_id in node_ids:
+        node = nodes[node_id]
+        choices = node.get('choices') or ()
+        node_records.append(_NODE.pack(intern(node_id), intern(node.get('speaker', '')), intern(node.get('text', '')),
+                                       target(node.get('next'), f'Node "{node_id}"'),
+                                       len(choice_records), len(choices), 0))
+        for choice in choices:
+            choice_records.append(_CHOICE.pack(intern(choice.get('text', '')),
+                                               target(choice.get('next'), f'A choice of node "{node_id}"')))
+    id_order = sorted(range(len(node_ids)), key=lambda i: node_ids[i].encode('utf-8'))
+
+    encoded = [text.encode('utf-8') for text in strings]
+    offsets = [0]
+    for data in encoded:
+        offsets.append(offsets[-1] + len(data))
+
+    node_offset = _HEADER.size
+    choice_offset = node_offset + _NODE.size * len(node_records)
+    id_index_offset = choice_offset + _CHOICE.size * len(choice_records)
+    string_offsets_offset = id_index_offset + _U32.size * len(node_ids)
+    string_data_offset = string_offsets_offset + _U32.size * len(offsets)
+    header = _HEADER.pack(MAGIC, VERSION, 0, len(node_records), len(choice_records), len(strings), start_index,
+                          node_offset, choice_offset, id_index_offset, string_offsets_offset, string_data_offset)
+    return b''.join([header, *node_records, *choice_records,
+                     struct.pack(f'<{len(id_order)}I', *id_order),
+                     struct.pack(f'<{len(offsets)}I', *offsets), *encoded])
+
+
+# --- Runtime ---
+class DialogueScript(object):
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            (magic, version, _, self.node_count, self.choice_count, self.string_count, self.start,
+             self._nodes, self._choices, self._id_index, self._string_offsets, self._string_data) = \
+                _HEADER.unpack_from(self._data, 0)
+        except (ValueError, struct.error) as e:
+            self._file.close()
+            raise DialogueError(f'{path} is not a compiled dialogue script: {e}')
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise DialogueError(f'{path} is not a version {VERSION} dialogue script; recompile it.')
+
+    def close(self):
+        if self._data is not None:
+            self._data.close()
+            self._data = None
+        self._file.close()
+
+    def string(self, index):
+        start, end = struct.unpack_from('<II', self._data, self._string_offsets + index * _U32.size)
+        return self._data[self._string_data + start:self._string_data + end].decode('utf-8')
+
+    def node(self, index):
+        node_id, speaker, text, next_node, first_choice, choice_count, _ = \
+            _NODE.unpack_from(self._data, self._nodes + index * _NODE.size)
+        choices = []
+        for i in range(first_choice, first_choice + choice_count):
+            choice_text, choice_next = _CHOICE.unpack_from(self._data, self._choices + i * _CHOICE.size)
+            choices.append(DialogueChoice(self.string(choice_text), None if choice_next == NONE else choice_next))
+        return DialogueLine(index, self.string(node_id), self.string(speaker), self.string(text),
+                            None if next_node == NONE else next_node, tuple(choices))
+
+    def find(self, node_id):
+        # Index of the node called `node_id` (binary search over the id index), or None.
+        wanted = node_id.encode('utf-8')
+        low, high = 0, self.node_count
+        while low < high:
+            middle = (low + high) // 2
+            index = _U32.unpack_from(self._data, self._id_index + middle * _U32.size)[0]
+            node_id_string = _NODE.unpack_from(self._data, self._nodes + index * _NODE.size)[0]
+            start, end = struct.unpack_from('<II', self._data, self._string_offsets + node_id_string * _U32.size)
+            candidate = self._data[self._string_data + start:self._string_data + end]
+            if candidate == wanted:
+                return index
+            if candidate < wanted:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+
+def load_script(name, directory=DIALOGUE_DIR):
+    # DialogueScript for dialogue/<name>.dlg, compiling <name>.json first if it is newer.
+    source = os.path.join(directory, f'{name}.json')
+    compiled = os.path.join(directory, f'{name}.dlg')
+    if os.path.exists(source) and (not os.path.exists(compiled)
+                                   or os.path.getmtime(source) > os.path.getmtime(compiled)):
+        log.info("Compiling dialogue %s", source)
+        compile_script(source, compiled)
+    return DialogueScript(compiled)
+
+
+class DialogueRunner(object):
+    # Walks one conversation through a script: `line` is the current node (None when finished).
+
+    def __init__(self, script, start=None):
+        self.script = script
+        self.line = None
+        self.restart(start)
+
+    def restart(self, start=None):
+        index = self.script.start if start is None else self.script.find(start)
+        if index is None:
+            raise DialogueError(f'No dialogue node "{start}" in {self.script.path}.')
+        self.line = self.script.node(index)
+
+    @property
+    def finished(self):
+        return self.line is None
+
+    def advance(self, choice=None):
+        # Move on from the current line: to its next node, or along choice number `choice`.
+        if self.line is None:
+            return None
+        if self.line.choices:
+            if choice is None:
+                raise DialogueError('This line needs a choice.')
+            next_node = self.line.choices[choice].next
+        else:
+            next_node = self.line.next
+        self.line = self.script.node(next_node) if next_node is not None else None
+        return self.line
@@ -0,0 +1,296 @@
+import threading
+import time
+
+try:
+    import cv2
+    import numpy
+except ImportError:
+    cv2 = numpy = None
+
+from profiling import log
+
+# AR_RENDERING_POINT: Camera Frame Sources
+# A frame source produces RGB frames on its own thread into a small, fixed set of
+# preallocated buffers (FrameBuffers) and only ever hands the newest one to the UI:
+# - No buffer is allocated per frame; decoders and converters write into the buffers in place.
+# - If the UI has not taken the previous frame yet it is dropped, not queued, so a slow
+#   frame never builds up latency.
+# - Frames are top row first (as cameras and video decoders deliver them); frame_view.FrameView
+#   uploads them into one persistent texture.
+# - Taps (add_tap) see every frame on the source thread before it is published, e.g. for
+#   vision.VisionStage to take a downscaled copy; they must be quick.
+# Sources: SyntheticFrameSource (no dependencies), VideoFrameSource and CameraFrameSource
+# (OpenCV + NumPy, optional). This module has no Kivy dependency.
+
+FRAME_CHANNELS = 3 # RGB, one byte per channel
+FRAME_BUFFERS = 3 # One being written, the newest published one, one being uploaded
+
+
+class FrameBuffers(object):
+    # Triple buffering with a single "newest frame" slot; thread-safe between one writer and one reader.
+
+    def __init__(self, width, height, count=FRAME_BUFFERS, channels=FRAME_CHANNELS):
+        self.width = width
+        self.height = height
+        self.channels = channels
+        self.buffers = [bytearray(width * height * channels) for _ in range(count)]
+        self.timestamps = [0.0] * count # perf_counter() when each buffer's frame was captured
+        self._lock = threading.Lock()
+        self._free = list(range(count))
+        self._latest = None
+        self.published = 0
+        self.dropped = 0 # Published frames replaced by a newer one before being taken
+
+    def acquire(self):
+        # Index of a buffer the writer may fill. Never blocks: with three buffers one is always free.
+        with self._lock:
+            return self._free.pop()
+
+    def publish(self, index, timestamp):
+        self.timestamps[index] = timestamp
+        with self._lock:
+            if self._latest is not None:
+                self._free.append(self._latest)
+                self.dropped += 1
+            self._latest = index
+            self.published += 1
+
+    def take(self):
+        # Index of the newest unread frame (the reader owns it until release()), or None.
+        with self._lock:
+            index, self._latest = self._latest, None
+            return index
+
+    def release(self, index):
+        with self._lock:
+            self._free.append(index)
+
+    def trim(self):
+        # Free the pixel memory while no frames flow (writer stopped); allocate() brings it back.
+        with self._lock:
+            self.buffers = [bytearray() for _ in self.buffers]
+            self._free = list(range(len(self.buffers)))
+            self._latest = None
+
+    def allocate(self):
+        size = self.width * self.height * self.channels
+        with self._lock:
+            if any(len(buffer) != size for buffer in self.buffers):
+                self.buffers = [bytearray(size) for _ in self.buffers]
+
+
+class FrameSource(object):
+    # Base class: subclasses implement read_into(buffer) -> bool (False at end of stream).
+    texture = None # Sources that deliver frames straight into a GPU texture set this instead
+
+    def __init__(self, width, height, fps=30, realtime=True, buffers=FRAME_BUFFERS):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.realtime = realtime # False: produce frames as fast as possible (benchmarks)
+        self.frames = FrameBuffers(width, height, buffers)
+        self._thread = None
+        self._running = False
+        self._taps = []
+
+    @property
+    def size(self):
+        return (self.width, self.height)
+
+    def start(self):
+        if self._running:
+            return
+        self.frames.allocate()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=type(self).__name__, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._running
+
+    def trim(self):
+        # Free the frame buffers of a stopped source (e.g. the app is paused); start() allocates them again.
+        if not self._running:
+            self.frames.trim()
+
+    def add_tap(self, tap):
+        # tap(buffer, width, height, timestamp) on the source thread for every frame read.
+        self._taps.append(tap)
+
+    def remove_tap(self, tap):
+        if tap in self._taps:
+            self._taps.remove(tap)
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def read_into(self, buffer):
+        raise NotImplementedError
+
+    def _run(self):
+        try:
+            self.open()
+            interval = 1.0 / self.fps if self.realtime and self.fps else 0
+            next_frame = time.perf_counter()
+            while self._running:
+                index = self.frames.acquire()
+                try:
+                    ok = self.read_into(self.frames.buffers[index])
+                except Exception as e:
+                    log.error("Error reading frame from %s: %s", type(self).__name__, e)
+                    ok = False
+                if not ok:
+                    self.frames.release(index)
+                    break
+                captured = time.perf_counter()
+                for tap in list(self._taps):
+                    tap(self.frames.buffers[index], self.width, self.height, captured)
+                self.frames.publish(index, captured)
+                if interval:
+                    next_frame += interval
+                    delay = next_frame - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    else:
+                        next_frame = time.perf_counter() # Fell behind: do not try to catch up
+        finally:
+            self.close()
+            self._running = False
+
+    def latest(self):
+        # (index, buffer, capture timestamp) of the newest frame, or None. Call release(index) after use.
+        index = self.frames.take()
+        if index is None:
+            return None
+        return index, self.frames.buffers[index], self.frames.timestamps[index]
+
+    def release(self, index):
+        self.frames.release(index)
+
+    def stats(self):
+        return {'published': self.frames.published, 'dropped': self.frames.dropped}
+
+
+class SyntheticFrameSource(FrameSource):
+    # Moving colour bands, generated by copying a window of a precomputed pattern (one memcpy per frame).
+
+    def __init__(self, width=1280, height=720, fps=30, realtime=True, frames=None, **kwargs):
+        super(SyntheticFrameSource, self).__init__(width, height, fps, realtime, **kwargs)
+        self.frame_limit = frames # None: endless
+        self.frame_count = 0
+        row = width * FRAME_CHANNELS
+        rows = bytearray()
+        for y in range(height * 2):
+            shade = (y * 255 // height) % 256
+            rows += bytes((shade, 255 - shade, (shade * 2) % 256)) * width
+        self._pattern = memoryview(rows)
+        self._row_bytes = row
+
+    def read_into(self, buffer):
+        if self.frame_limit is not None and self.frame_count >= self.frame_limit:
+            return False
+        offset = (self.frame_count * 4 % self.height) * self._row_bytes # Scroll 4 rows per frame
+        buffer[:] = self._pattern[offset:offset + len(buffer)]
+        self.frame_count += 1
+        return True
+
+
+class _OpenCVFrameSource(FrameSource):
+    # Shared OpenCV capture loop: decode into a reused BGR frame, convert/resize into the buffer.
+
+    def __init__(self, capture_arg, width, height, fps, realtime, **kwargs):
+        if cv2 is None:
+            raise ImportError('Video and camera frame sources need OpenCV: pip install opencv-python numpy')
+        super(_OpenCVFrameSource, self).__init__(width, height, fps, realtime, **kwargs)
+        self.capture_arg = capture_arg
+        self.capture = None
+        self._bgr = None # Reused decode target
+        self._views = {} # id(buffer) -> NumPy view sharing the buffer's memory
+
+    def open(self):
+        if self.capture is None:
+            self.capture = cv2.VideoCapture(self.capture_arg)
+        if not self.capture.isOpened():
+            raise OSError(f'Cannot open video capture {self.capture_arg!r}')
+
+    def close(self):
+        if self.capture is not None:
+            self.capture.release()
+            self.capture = None
+
+    def start(self):
+        if not self._running:
+            self._views.clear() # allocate() may replace the buffers; old views would keep them alive
+        super(_OpenCVFrameSource, self).start()
+
+    def trim(self):
+        super(_OpenCVFrameSource, self).trim()
+        if not self._running:
+            self._views.clear() # Let the trimmed buffers go
+
+    def _view(self, buffer):
+        view = self._views.get(id(buffer))
+        if view is None:
+            view = self._views[id(buffer)] = numpy.frombuffer(buffer, dtype=numpy.uint8).reshape(
+                self.height, self.width, FRAME_CHANNELS)
+        return view
+
+    def read_into(self, buffer):
+        ok, self._bgr = self.capture.read(self._bgr)
+        if not ok:
+            return False
+        frame = self._bgr
+        if frame.shape[1] != self.width or frame.shape[0] != self.height:
+            frame = cv2.resize(frame, (self.width, self.height), interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self._view(buffer))
+        return True
+
+
+class VideoFrameSource(_OpenCVFrameSource):
+    # A recorded clip, played at its own frame rate (or as fast as possible with realtime=False).
+
+    def __init__(self, path, loop=False, realtime=True, size=None, **kwargs):
+        if cv2 is None:
+            raise ImportError('Video frame sources need OpenCV: pip install opencv-python numpy')
+        capture = cv2.VideoCapture(path)
+        if not capture.isOpened():
+            raise OSError(f'Cannot open video {path}')
+        width, height = size or (int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                                 int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        fps = capture.get(cv2.CAP_PROP_FPS) or 30
+        super(VideoFrameSource, self).__init__(path, width, height, fps, realtime, **kwargs)
+        self.capture = capture
+        self.path = path
+        self.loop = loop
+
+    def read_into(self, buffer):
+        if super(VideoFrameSource, self).read_into(buffer):
+            return True
+        if not self.loop:
+            return False
+        self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        return super(VideoFrameSource, self).read_into(buffer)
+
+
+class CameraFrameSource(_OpenCVFrameSource):
+    # A webcam through OpenCV (desktop). On phones frame_view.KivyCameraSource is used instead.
+
+    def __init__(self, index=0, width=1280, height=720, fps=30, **kwargs):
+        # The camera paces itself, so frames are read as soon as they are available
+        super(CameraFrameSource, self).__init__(index, width, height, fps, False, **kwargs)
+
+    def open(self):
+        super(CameraFrameSource, self).open()
+        self.capture.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+        self.capture.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        self.capture.set(cv2.CAP_PROP_FPS, self.fps)
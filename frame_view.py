@@ -0,0 +1,147 @@
+import time
+
+from kivy.clock import Clock
+from kivy.graphics import Color, Rectangle
+from kivy.graphics.texture import Texture
+from kivy.properties import BooleanProperty, ObjectProperty
+from kivy.uix.widget import Widget
+
+from frame_source import FrameSource
+
+# AR_RENDERING_POINT: Live Camera Feed Display
+# FrameView draws the newest frame of a frame_source.FrameSource, once per Kivy frame:
+# - The texture is created once per frame size and updated in place with blit_buffer,
+#   straight from the source's preallocated buffer (no per-frame texture or bytes copy).
+# - Frames arrive top row first; the texture is flipped once via its UV coordinates.
+# - Only the newest frame is uploaded; frames the UI could not keep up with were already
+#   dropped by the source.
+# Sources that render into a GPU texture themselves (KivyCameraSource, used on phones)
+# are drawn directly without any upload from Python.
+
+UPLOAD_LATENCY_SAMPLES = 300
+
+
+class FrameView(Widget):
+    source = ObjectProperty(None, allownone=True)
+    keep_ratio = BooleanProperty(False) # False: stretch the feed over the whole widget
+
+    def __init__(self, **kwargs):
+        self._texture = None
+        self.uploads = 0
+        self.upload_times = [] # Seconds spent in blit_buffer, most recent UPLOAD_LATENCY_SAMPLES
+        self.frame_latencies = [] # Capture -> on screen, most recent UPLOAD_LATENCY_SAMPLES
+        super(FrameView, self).__init__(**kwargs)
+        with self.canvas:
+            Color(1, 1, 1, 1)
+            self._rect = Rectangle()
+        self._event = None
+        self.bind(pos=self._update_rect, size=self._update_rect)
+
+    def start(self):
+        if self.source is None:
+            return
+        self.source.start()
+        if self._event is None:
+            self._event = Clock.schedule_interval(self.update, 0) # Every frame
+
+    def stop(self):
+        if self._event is not None:
+            self._event.cancel()
+            self._event = None
+        if self.source is not None:
+            self.source.stop()
+
+    def release(self):
+        # Stop, and free the frame buffers and the texture until the next start().
+        self.stop()
+        if self.source is not None:
+            self.source.trim()
+        self._texture = None
+        self._rect.texture = None
+
+    def on_source(self, instance, source):
+        self._texture = None
+        self._rect.texture = None
+
+    def _ensure_texture(self, size):
+        if self._texture is None or self._texture.size != size:
+            self._texture = Texture.create(size=size, colorfmt='rgb', bufferfmt='ubyte')
+            self._texture.flip_vertical()
+            self._rect.texture = self._texture
+            self._update_rect()
+        return self._texture
+
+    def update(self, *args):
+        source = self.source
+        if source is None:
+            return False
+        if source.texture is not None: # GPU-side source: nothing to upload
+            if self._rect.texture is not source.texture:
+                self._rect.texture = source.texture
+                self._update_rect()
+            return
+        frame = source.latest()
+        if frame is None:
+            return
+        index, buffer, captured = frame
+        try:
+            texture = self._ensure_texture(source.size)
+            start = time.perf_counter()
+            texture.blit_buffer(buffer, colorfmt='rgb', bufferfmt='ubyte')
+            now = time.perf_counter()
+        finally:
+            source.release(index)
+        self.uploads += 1
+        self._record(self.upload_times, now - start)
+        self._record(self.frame_latencies, now - captured)
+        self.canvas.ask_update()
+
+    @staticmethod
+    def _record(samples, value):
+        samples.append(value)
+        if len(samples) > UPLOAD_LATENCY_SAMPLES:
+            del samples[0]
+
+    def _update_rect(self, *args):
+        texture = self._rect.texture
+        pos, size = self.pos, self.size
+        if self.keep_ratio and texture is not None and texture.height:
+            ratio = texture.width / texture.height
+            width = min(self.width, self.height * ratio)
+            height = width / ratio
+            pos = (self.center_x - width / 2, self.center_y - height / 2)
+            size = (width, height)
+        self._rect.pos = pos
+        self._rect.size = size
+
+    def stats(self):
+        stats = dict(self.source.stats()) if self.source is not None else {}
+        stats['uploads'] = self.uploads
+        return stats
+
+
+class KivyCameraSource(FrameSource):
+    # The platform camera through kivy.core.camera (Android/iOS): the camera provider renders
+    # into its own texture, so FrameView just draws that texture.
+
+    def __init__(self, index=0, width=1280, height=720):
+        super(KivyCameraSource, self).__init__(width, height, buffers=0) # Frames never pass through Python buffers
+        from kivy.core.camera import Camera as CoreCamera
+        self.camera = CoreCamera(index=index, resolution=(width, height), stopped=True)
+
+    @property
+    def texture(self):
+        return self.camera.texture
+
+    def start(self):
+        if not self._running:
+            self.camera.start()
+            self._running = True
+
+    def stop(self):
+        if self._running:
+            self.camera.stop()
+            self._running = False
+
+    def latest(self):
+        return None
@@ -0,0 +1,159 @@
+import json
+import os
+
+from profiling import log
+
+# GAME_STATE: Central Game State Store
+# One GameState lives on the App (App.game_state) and holds everything screens share,
+# in named sections of key/value pairs (SECTIONS). Screens no longer read each other's
+# attributes or re-read everything on entry; they subscribe to the keys they display:
+# - set()/update() record which keys changed. Subscribers are called once per frame with
+#   only the changed keys of their section ({key: new value}), however many writes
+#   happened in between; the flush is scheduled through a `scheduler` callable, as in
+#   location.LocationPipeline.
+# - Every section written since the last save() is marked dirty; save() writes only those,
+#   one small JSON file per section. TRANSIENT_SECTIONS are never written.
+# - Rewards go through grant_reward(), which appends to the inventory store (inventory.py,
+#   persisted by itself) and notifies INVENTORY subscribers with just the new items.
+# Values should be treated as immutable: replace them with set() rather than mutating them.
+# Main thread only. Plain Python, no Kivy dependency.
+
+SECTIONS = { # Section -> defaults
+    'progress': {'current_goal': '', 'checked_in': []},
+    'settings': {'read_aloud': True},
+    'player': {'location': None},
+}
+TRANSIENT_SECTIONS = ('player',) # Rebuilt every session, not saved
+INVENTORY = 'inventory' # Pseudo-section: changes are {'added': [InventoryItem, ...]}
+
+
+class GameState(object):
+    def __init__(self, directory=None, scheduler=None, inventory=None, sections=SECTIONS,
+                 transient=TRANSIENT_SECTIONS):
+        self.directory = directory # Where sections are saved; None: not persisted
+        self.scheduler = scheduler # callable(fn): run fn once on the next frame; None = call flush() yourself
+        self.inventory = inventory
+        self.transient = set(transient)
+        self._sections = {name: dict(defaults) for name, defaults in sections.items()}
+        self._subscribers = {} # section -> [(callback, keys or None)]
+        self._changes = {} # section -> {key: value} not delivered yet
+        self._flush_scheduled = False
+        self.dirty = set() # Sections changed since the last save()
+        self.flushes = 0
+        self.writes = 0
+        self.saved_sections = 0
+
+    # --- Persistence ---
+    def _path(self, section):
+        return os.path.join(self.directory, f'{section}.json')
+
+    def load(self):
+        # Read the saved sections over the defaults (unknown keys in saved files are kept).
+        if self.directory is None:
+            return self
+        for section, values in self._sections.items():
+            if section in self.transient:
+                continue
+            try:
+                with open(self._path(section), 'r', encoding='utf-8') as f:
+                    values.update(json.load(f))
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError) as e:
+                log.error("Error loading game state section '%s': %s", section, e)
+        return self
+
+    def save(self):
+        # Write the dirty sections (atomically, one file each); returns their names.
+        if self.directory is None or not self.dirty:
+            return []
+        os.makedirs(self.directory, exist_ok=True)
+        written = []
+        for section in sorted(self.dirty):
+            path = self._path(section)
+            try:
+                with open(path + '.tmp', 'w', encoding='utf-8') as f:
+                    json.dump(self._sections[section], f)
+                os.replace(path + '.tmp', path)
+            except (OSError, TypeError) as e:
+                log.error("Error saving game state section '%s': %s", section, e)
+                continue
+            written.append(section)
+        self.dirty.difference_update(written)
+        self.saved_sections += len(written)
+        return written
+
+    # --- Reading and writing ---
+    def get(self, section, key, default=None):
+        return self._sections[section].get(key, default)
+
+    def section(self, section):
+        return dict(self._sections[section])
+
+    def set(self, section, key, value):
+        self.update(section, {key: value})
+
+    def update(self, section, values):
+        # Changes only count (for subscribers and saving) if a value really differs.
+        current = self._sections[section]
+        changed = {key: value for key, value in values.items()
+                   if key not in current or current[key] != value}
+        if not changed:
+            return False
+        current.update(changed)
+        if section not in self.transient:
+            self.dirty.add(section)
+        self._record(section, changed)
+        return True
+
+    def append(self, section, key, item):
+        # Add `item` to the list at `key` (a new list, so earlier values stay unchanged).
+        values = self._sections[section].get(key) or []
+        if item in values:
+            return False
+        return self.update(section, {key: values + [item]})
+
+    def grant_reward(self, item_id, name, image, goal_id=None):
+        item = self.inventory.grant(item_id, name, image, goal_id=goal_id)
+        pending = self._changes.setdefault(INVENTORY, {})
+        pending['added'] = pending.get('added', []) + [item]
+        self._schedule()
+        return item
+
+    # --- Subscriptions ---
+    def subscribe(self, section, callback, keys=None):
+        # callback({key: value}) once per frame in which any of `keys` (default: any key) changed.
+        self._subscribers.setdefault(section, []).append((callback, set(keys) if keys else None))
+
+    def unsubscribe(self, section, callback):
+        subscribers = self._subscribers.get(section, [])
+        subscribers[:] = [entry for entry in subscribers if entry[0] != callback]
+
+    def _record(self, section, changed):
+        self.writes += 1
+        self._changes.setdefault(section, {}).update(changed)
+        self._schedule()
+
+    def _schedule(self):
+        if self.scheduler is not None and not self._flush_scheduled:
+            self._flush_scheduled = True
+            self.scheduler(self.flush)
+
+    def flush(self):
+        # Deliver everything changed since the last flush; returns the sections delivered.
+        changes, self._changes = self._changes, {}
+        self._flush_scheduled = False
+        if not changes:
+            return []
+        self.flushes += 1
+        for section, changed in changes.items():
+            for callback, keys in list(self._subscribers.get(section, ())):
+                if keys is None:
+                    callback(changed)
+                elif not keys.isdisjoint(changed):
+                    callback({key: value for key, value in changed.items() if key in keys})
+        return list(changes)
+
+    def stats(self):
+        return {'writes': self.writes, 'flushes': self.flushes, 'dirty': sorted(self.dirty),
+                'saved_sections': self.saved_sections}
@@ -0,0 +1,95 @@
+import math
+
+# GEO: Shared geographic helpers
+# Plain-Python (no Kivy) so that the goal index, location pipeline and headless tools
+# can use them without a window.
+
+EARTH_RADIUS_M = 6371008.8 # Mean Earth radius
+METRES_PER_DEGREE_LAT = 111320.0 # Close enough everywhere for cell sizing
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    # Great-circle distance in metres between two lat/lon points (degrees).
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def metres_per_degree_lon(lat):
+    return METRES_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 1e-6)
+
+
+def mercator_y(lat):
+    # Web Mercator y for a latitude in degrees (unitless, grows northwards).
+    lat = max(min(lat, 85.05112878), -85.05112878)
+    return math.log(math.tan(math.pi / 4 + math.radians(lat) / 2))
+
+
+def inverse_mercator_y(y):
+    return math.degrees(2 * math.atan(math.exp(y)) - math.pi / 2)
+
+
+class MapBounds(object):
+    # A lat/lon rectangle covered by a map image (or by the visible part of a map).
+    # Fractions follow Kivy's pos_hint convention: x grows eastwards and y grows
+    # northwards, both from 0 at the south-west corner to 1 at the north-east corner.
+    __slots__ = ('south', 'west', 'north', 'east')
+
+    def __init__(self, south, west, north, east):
+        self.south = south
+        self.west = west
+        self.north = north
+        self.east = east
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['south'], data['west'], data['north'], data['east'])
+
+    def to_dict(self):
+        return {'south': self.south, 'west': self.west, 'north': self.north, 'east': self.east}
+
+    @property
+    def center(self):
+        return (inverse_mercator_y((mercator_y(self.south) + mercator_y(self.north)) / 2),
+                (self.west + self.east) / 2)
+
+    def contains(self, lat, lon):
+        return self.south <= lat <= self.north and self.west <= lon <= self.east
+
+    def expanded(self, fraction):
+        # Bounds grown by `fraction` of their size on every side (e.g. 0.25 for a 25% margin).
+        d_lat = (self.north - self.south) * fraction
+        d_lon = (self.east - self.west) * fraction
+        return MapBounds(self.south - d_lat, self.west - d_lon, self.north + d_lat, self.east + d_lon)
+
+    def to_fraction(self, lat, lon):
+        fx = (lon - self.west) / (self.east - self.west)
+        y_south = mercator_y(self.south)
+        fy = (mercator_y(lat) - y_south) / (mercator_y(self.north) - y_south)
+        return fx, fy
+
+    def from_fraction(self, fx, fy):
+        lon = self.west + fx * (self.east - self.west)
+        y_south = mercator_y(self.south)
+        lat = inverse_mercator_y(y_south + fy * (mercator_y(self.north) - y_south))
+        return lat, lon
+
+    def __repr__(self):
+        return f'MapBounds(south={self.south}, west={self.west}, north={self.north}, east={self.east})'
+
+
+# --- Slippy-map (XYZ) tile coordinates ---
+# "Normalized" coordinates cover the whole Web Mercator world with x from 0 (180 W)
+# to 1 (180 E) and y from 0 (north edge) to 1 (south edge), like XYZ tile rows.
+TILE_SIZE = 256
+
+
+def latlon_to_normalized(lat, lon):
+    return (lon + 180.0) / 360.0, (1.0 - mercator_y(lat) / math.pi) / 2.0
+
+
+def normalized_to_latlon(nx, ny):
+    return inverse_mercator_y((1.0 - 2.0 * ny) * math.pi), nx * 360.0 - 180.0
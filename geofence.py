@@ -0,0 +1,145 @@
+import math
+from collections import namedtuple
+
+from geo import METRES_PER_DEGREE_LAT, haversine_m, metres_per_degree_lon
+
+# GPS_TRACKING: Geofences
+# Every goal is a circular fence around its location. Fed with the smoothed location fixes,
+# a GeofenceEngine reports when the player enters a fence (within `enter_radius_m`),
+# has stayed inside it for `dwell_s` seconds (what triggers an automatic check-in), and
+# leaves it again. Leaving takes moving beyond the larger `exit_radius_m`, so GPS jitter
+# at the edge of a fence does not produce enter/exit flurries; fixes less accurate than
+# `max_accuracy_m` can leave a fence but not enter one.
+# The goals near the player are only looked up in the goal store's grid when a fix lands
+# in another grid cell: the candidates cached for a cell are every goal that can be within
+# exit_radius_m of any point of it, so each fix only measures the distance to those few.
+# Events are collected and handed to listeners in one batch on the next frame through a
+# `scheduler` callable, as in location.LocationPipeline; everything runs on the main thread.
+
+DWELL_SECONDS = 5.0 # Time inside a fence before it counts as a visit
+EXIT_MARGIN_M = 10.0 # exit_radius_m = enter_radius_m + this
+MAX_ACCURACY_M = 30.0
+FLAT_MARGIN = 0.05 # Relative slack of the flat-earth prefilter
+
+GeofenceEvent = namedtuple('GeofenceEvent', 'kind goal distance timestamp') # kind: 'enter', 'dwell' or 'exit'
+
+
+class GeofenceEngine(object):
+    def __init__(self, goal_store, enter_radius_m=None, exit_margin_m=EXIT_MARGIN_M, dwell_s=DWELL_SECONDS,
+                 max_accuracy_m=MAX_ACCURACY_M, scheduler=None):
+        self.goal_store = goal_store
+        self.enter_radius_m = goal_store.check_in_radius_m if enter_radius_m is None else enter_radius_m
+        self.exit_radius_m = self.enter_radius_m + exit_margin_m
+        self.dwell_s = dwell_s
+        self.max_accuracy_m = max_accuracy_m
+        self.scheduler = scheduler # callable(fn): run fn once on the next frame; None = deliver at once
+        self.inside = {} # goal id -> [goal, time entered, dwell reported]
+        self.cell = None # Grid cell the candidates were gathered for
+        self.candidates = []
+        self._lon_scale = 0.0 # Metres per degree of longitude in that cell
+        self.fixes = 0
+        self.cell_changes = 0
+        self.distance_checks = 0
+        self.event_count = 0
+        self._listeners = []
+        self._pending = [] # Events not yet delivered
+
+    def bind(self, callback):
+        # callback(events): a list of GeofenceEvent, in the order they happened.
+        self._listeners.append(callback)
+
+    def unbind(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def refresh(self):
+        # Gather the candidates again on the next fix (call after goals were added or removed).
+        self.cell = None
+
+    def _gather(self, cell):
+        index = self.goal_store.index
+        row, col = cell
+        # The cell edge furthest from the equator has the fewest metres per degree of longitude.
+        pole_lat = min(89.0, max(abs(row * index.cell_lat), abs((row + 1) * index.cell_lat)))
+        d_rows = int(math.ceil(self.exit_radius_m / METRES_PER_DEGREE_LAT / index.cell_lat))
+        d_cols = int(math.ceil(self.exit_radius_m / metres_per_degree_lon(pole_lat) / index.cell_lon))
+        self._lon_scale = metres_per_degree_lon((row + 0.5) * index.cell_lat)
+        candidates = []
+        for r in range(row - d_rows, row + d_rows + 1):
+            for c in range(col - d_cols, col + d_cols + 1):
+                candidates.extend(index.cells.get((r, c), ()))
+        return candidates
+
+    def update(self, fix):
+        # Feed one location Fix; returns the events it caused.
+        self.fixes += 1
+        lat, lon, timestamp = fix.lat, fix.lon, fix.timestamp
+        cell = self.goal_store.index.cell_of(lat, lon)
+        if cell != self.cell:
+            self.cell = cell
+            self.cell_changes += 1
+            self.candidates = self._gather(cell)
+        near = {} # goal id -> (goal, distance) within exit_radius_m
+        exit_radius_m = self.exit_radius_m
+        # A flat-earth distance (off by far less than FLAT_MARGIN over a few cells) rules out
+        # most candidates before the exact great-circle distance is computed.
+        limit = (exit_radius_m * (1 + FLAT_MARGIN)) ** 2
+        lon_scale = self._lon_scale
+        for goal in self.candidates:
+            dy = (goal.lat - lat) * METRES_PER_DEGREE_LAT
+            dx = (goal.lon - lon) * lon_scale
+            if dx * dx + dy * dy <= limit:
+                distance = haversine_m(lat, lon, goal.lat, goal.lon)
+                if distance <= exit_radius_m:
+                    near[goal.id] = (goal, distance)
+        self.distance_checks += len(self.candidates)
+
+        events = []
+        for goal_id, fence in list(self.inside.items()):
+            if goal_id not in near:
+                del self.inside[goal_id]
+                events.append(GeofenceEvent('exit', fence[0], haversine_m(lat, lon, fence[0].lat, fence[0].lon),
+                                            timestamp))
+        if fix.accuracy is None or fix.accuracy <= self.max_accuracy_m:
+            entered = [hit for goal_id, hit in near.items()
+                       if goal_id not in self.inside and hit[1] <= self.enter_radius_m]
+            entered.sort(key=lambda hit: hit[1])
+            for goal, distance in entered:
+                self.inside[goal.id] = [goal, timestamp, False]
+                events.append(GeofenceEvent('enter', goal, distance, timestamp))
+        for goal_id, fence in self.inside.items():
+            if not fence[2] and timestamp - fence[1] >= self.dwell_s:
+                fence[2] = True
+                events.append(GeofenceEvent('dwell', fence[0], near[goal_id][1], timestamp))
+
+        if events:
+            self.event_count += len(events)
+            self._publish(events)
+        return events
+
+    def _publish(self, events):
+        if self.scheduler is None:
+            self._pending.extend(events)
+            self.flush()
+            return
+        schedule = not self._pending
+        self._pending.extend(events)
+        if schedule:
+            self.scheduler(self.flush)
+
+    def flush(self):
+        events, self._pending = self._pending, []
+        if events:
+            for callback in list(self._listeners):
+                callback(events)
+
+    def reset(self):
+        # Forget which fences the player is in (e.g. a new game); no exit events are sent.
+        self.inside.clear()
+        self._pending = []
+        self.cell = None
+
+    def stats(self):
+        return {'fixes': self.fixes, 'cell_changes': self.cell_changes, 'distance_checks': self.distance_checks,
+                'checks_per_fix': self.distance_checks / self.fixes if self.fixes else 0.0,
+                'events': self.event_count, 'inside': len(self.inside)}
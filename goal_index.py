@@ -0,0 +1,236 @@
+import json
+import math
+
+from geo import METRES_PER_DEGREE_LAT, MapBounds, haversine_m, metres_per_degree_lon
+
+# GPS_TRACKING: Goal Store & Spatial Index
+# Goals (historic points of interest) are loaded from a JSON file and bucketed into a
+# uniform lat/lon grid. A query only looks at the cells around the player (or the
+# cells under a viewport), so the cost depends on the local goal density rather than
+# on the total number of goals loaded for an event.
+
+DEFAULT_CELL_SIZE_M = 100.0 # Roughly a check-in radius or two; one cell per city block
+DEFAULT_CHECK_IN_RADIUS_M = 20.0
+EXTENT_MARGIN_M = 200.0 # Around the goals, for goals files without map_bounds
+
+
+class Goal(object):
+    __slots__ = ('id', 'lat', 'lon', 'name', 'data')
+
+    def __init__(self, id, lat, lon, name='', data=None):
+        self.id = id
+        self.lat = lat
+        self.lon = lon
+        self.name = name
+        self.data = data or {} # Anything else from the goals file (story id, reward, ...)
+
+    @classmethod
+    def from_dict(cls, entry):
+        extra = {k: v for k, v in entry.items() if k not in ('id', 'lat', 'lon', 'name')}
+        return cls(entry['id'], float(entry['lat']), float(entry['lon']), entry.get('name', ''), extra)
+
+    def to_dict(self):
+        entry = {'id': self.id, 'lat': self.lat, 'lon': self.lon, 'name': self.name}
+        entry.update(self.data)
+        return entry
+
+    def __repr__(self):
+        return f'Goal({self.id!r}, {self.lat:.6f}, {self.lon:.6f})'
+
+
+class GridIndex(object):
+    # Uniform grid over lat/lon. Cell height is fixed in degrees of latitude; cell width
+    # is chosen so cells are roughly square at `ref_lat`. Any object with `lat`/`lon`
+    # attributes can be indexed.
+
+    def __init__(self, cell_size_m=DEFAULT_CELL_SIZE_M, ref_lat=0.0):
+        self.cell_size_m = cell_size_m
+        self.cell_lat = cell_size_m / METRES_PER_DEGREE_LAT
+        self.cell_lon = cell_size_m / metres_per_degree_lon(ref_lat)
+        self.cells = {} # (row, col) -> list of items
+        self.count = 0
+        self._row_range = None # (min_row, max_row) of occupied cells
+        self._col_range = None
+
+    def cell_of(self, lat, lon):
+        return (int(math.floor(lat / self.cell_lat)), int(math.floor(lon / self.cell_lon)))
+
+    def insert(self, item):
+        key = self.cell_of(item.lat, item.lon)
+        self.cells.setdefault(key, []).append(item)
+        self.count += 1
+        row, col = key
+        if self._row_range is None:
+            self._row_range = (row, row)
+            self._col_range = (col, col)
+        else:
+            self._row_range = (min(self._row_range[0], row), max(self._row_range[1], row))
+            self._col_range = (min(self._col_range[0], col), max(self._col_range[1], col))
+
+    def remove(self, item):
+        key = self.cell_of(item.lat, item.lon)
+        bucket = self.cells.get(key)
+        if not bucket or item not in bucket:
+            return False
+        bucket.remove(item)
+        if not bucket:
+            del self.cells[key]
+        self.count -= 1
+        return True
+
+    def _cell_span_m(self, lat):
+        # Smallest side of a cell in metres around `lat`, used as a conservative bound.
+        return min(self.cell_size_m, self.cell_lon * metres_per_degree_lon(lat))
+
+    def within(self, lat, lon, radius_m):
+        # All (item, distance_m) within radius_m, nearest first.
+        row, col = self.cell_of(lat, lon)
+        d_rows = int(math.ceil(radius_m / METRES_PER_DEGREE_LAT / self.cell_lat))
+        d_cols = int(math.ceil(radius_m / metres_per_degree_lon(lat) / self.cell_lon))
+        found = []
+        for r in range(row - d_rows, row + d_rows + 1):
+            for c in range(col - d_cols, col + d_cols + 1):
+                for item in self.cells.get((r, c), ()):
+                    distance = haversine_m(lat, lon, item.lat, item.lon)
+                    if distance <= radius_m:
+                        found.append((item, distance))
+        found.sort(key=lambda hit: hit[1])
+        return found
+
+    def nearest(self, lat, lon, radius_m=None):
+        # Nearest (item, distance_m), optionally limited to radius_m; None if nothing qualifies.
+        # Searches square rings of cells outwards from the query cell and stops once no
+        # unvisited ring can contain anything closer than the best hit so far.
+        if not self.count:
+            return None
+        row, col = self.cell_of(lat, lon)
+        span = self._cell_span_m(lat)
+        max_ring = max(abs(row - self._row_range[0]), abs(row - self._row_range[1]),
+                       abs(col - self._col_range[0]), abs(col - self._col_range[1]))
+        best = None
+        best_distance = radius_m if radius_m is not None else float('inf')
+        ring = 0
+        while ring <= max_ring:
+            if ring > 0 and (ring - 1) * span > best_distance:
+                break
+            for r, c in _ring_cells(row, col, ring):
+                for item in self.cells.get((r, c), ()):
+                    distance = haversine_m(lat, lon, item.lat, item.lon)
+                    if distance <= best_distance:
+                        best = item
+                        best_distance = distance
+            ring += 1
+        if best is None:
+            return None
+        return best, best_distance
+
+    def in_bounds(self, bounds):
+        # All items inside a MapBounds rectangle.
+        row_min, col_min = self.cell_of(bounds.south, bounds.west)
+        row_max, col_max = self.cell_of(bounds.north, bounds.east)
+        found = []
+        if (row_max - row_min + 1) * (col_max - col_min + 1) > len(self.cells):
+            # Viewport spans more cells than are occupied: walk the occupied ones instead.
+            keys = [(r, c) for (r, c) in self.cells
+                    if row_min <= r <= row_max and col_min <= c <= col_max]
+        else:
+            keys = [(r, c) for r in range(row_min, row_max + 1) for c in range(col_min, col_max + 1)]
+        for key in keys:
+            for item in self.cells.get(key, ()):
+                if bounds.contains(item.lat, item.lon):
+                    found.append(item)
+        return found
+
+
+def _ring_cells(row, col, ring):
+    if ring == 0:
+        yield row, col
+        return
+    for c in range(col - ring, col + ring + 1):
+        yield row - ring, c
+        yield row + ring, c
+    for r in range(row - ring + 1, row + ring):
+        yield r, col - ring
+        yield r, col + ring
+
+
+class GoalStore(object):
+    # Goals for the current game/event plus the spatial index used to query them.
+
+    def __init__(self, goals=(), map_bounds=None, check_in_radius_m=DEFAULT_CHECK_IN_RADIUS_M,
+                 cell_size_m=DEFAULT_CELL_SIZE_M):
+        goals = list(goals)
+        self.map_bounds = map_bounds
+        self.check_in_radius_m = check_in_radius_m
+        if map_bounds is not None:
+            ref_lat = map_bounds.center[0]
+        else:
+            ref_lat = goals[0].lat if goals else 0.0
+        self.index = GridIndex(cell_size_m=cell_size_m, ref_lat=ref_lat)
+        self.by_id = {}
+        for goal in goals:
+            self.add(goal)
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        # Goals file format:
+        # {"map_bounds": {"south":..,"west":..,"north":..,"east":..},
+        #  "check_in_radius_m": 20,
+        #  "goals": [{"id": "goal1", "name": "...", "lat": .., "lon": .., ...}, ...]}
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f), **kwargs)
+
+    @classmethod
+    def from_dict(cls, data, **kwargs):
+        # A store from the parsed contents of a goals file (e.g. read from a content pack).
+        bounds = data.get('map_bounds')
+        kwargs.setdefault('check_in_radius_m', data.get('check_in_radius_m', DEFAULT_CHECK_IN_RADIUS_M))
+        return cls((Goal.from_dict(entry) for entry in data.get('goals', [])),
+                   map_bounds=MapBounds.from_dict(bounds) if bounds else None,
+                   **kwargs)
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def __iter__(self):
+        return iter(self.by_id.values())
+
+    def get(self, goal_id):
+        return self.by_id.get(goal_id)
+
+    def add(self, goal):
+        if goal.id in self.by_id:
+            self.index.remove(self.by_id[goal.id])
+        self.by_id[goal.id] = goal
+        self.index.insert(goal)
+
+    def remove(self, goal_id):
+        goal = self.by_id.pop(goal_id, None)
+        if goal is not None:
+            self.index.remove(goal)
+        return goal
+
+    def nearest(self, lat, lon, radius_m=None):
+        return self.index.nearest(lat, lon, radius_m)
+
+    def within(self, lat, lon, radius_m):
+        return self.index.within(lat, lon, radius_m)
+
+    def in_viewport(self, bounds):
+        return self.index.in_bounds(bounds)
+
+    def extent(self, margin_m=EXTENT_MARGIN_M):
+        # Bounds of all goals plus `margin_m` on every side (never empty), or None without goals.
+        if not self.by_id:
+            return None
+        south = min(goal.lat for goal in self)
+        north = max(goal.lat for goal in self)
+        west = min(goal.lon for goal in self)
+        east = max(goal.lon for goal in self)
+        d_lat = margin_m / METRES_PER_DEGREE_LAT
+        d_lon = margin_m / metres_per_degree_lon((south + north) / 2)
+        return MapBounds(south - d_lat, west - d_lon, north + d_lat, east + d_lon)
+
+    def check_in(self, lat, lon, radius_m=None):
+        # (goal, distance_m) for a successful check-in at lat/lon, or None if no goal is close enough.
+        return self.nearest(lat, lon, self.check_in_radius_m if radius_m is None else radius_m)
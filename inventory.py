@@ -0,0 +1,114 @@
+import sqlite3
+import time
+from collections import namedtuple
+
+# REWARD_SYSTEM: Persistent Inventory
+# Collected items are stored in SQLite in WAL (write-ahead log) mode. Granting a reward
+# is a single appended INSERT committed to the log, so it costs the same with 10 items
+# or 100k, and once grant() returns the item survives the process being killed
+# (e.g. by the OS after on_pause). The log is folded back into the database file by
+# compact(), which the app calls periodically and when it is paused or stopped.
+# Plain Python (no Kivy) so tools and benchmarks can use it directly.
+
+InventoryItem = namedtuple('InventoryItem', 'seq item_id name image goal_id collected_at')
+
+CHECKPOINT_EVERY = 1000 # Grants between passive checkpoints
+VACUUM_FREE_RATIO = 0.25 # VACUUM during compact() once this share of pages is free
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS items (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    item_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    image TEXT NOT NULL,
+    goal_id TEXT,
+    collected_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS items_goal ON items (goal_id);
+'''
+
+
+class InventoryStore(object):
+    def __init__(self, path, durable=False):
+        # durable=True also survives power loss (fsync per grant), at a much higher write cost.
+        self.path = path
+        self.db = sqlite3.connect(path, isolation_level=None) # Autocommit: each grant is its own transaction
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute(f"PRAGMA synchronous={'FULL' if durable else 'NORMAL'}")
+        self.db.executescript(SCHEMA)
+        self._items = None # Loaded lazily on first access
+        self._goal_ids = set()
+        self._writes_since_checkpoint = 0
+
+    # --- Reading ---
+    @property
+    def items(self):
+        if self._items is None:
+            self.load()
+        return self._items
+
+    def load(self):
+        rows = self.db.execute(
+            'SELECT seq, item_id, name, image, goal_id, collected_at FROM items ORDER BY seq').fetchall()
+        self._items = [InventoryItem._make(row) for row in rows]
+        self._goal_ids = {item.goal_id for item in self._items if item.goal_id}
+        return self._items
+
+    def __len__(self):
+        return len(self.items)
+
+    def has_reward_for(self, goal_id):
+        self.items # Make sure the goal ids are loaded
+        return goal_id in self._goal_ids
+
+    # --- Writing ---
+    def grant(self, item_id, name, image, goal_id=None, collected_at=None):
+        collected_at = time.time() if collected_at is None else collected_at
+        cursor = self.db.execute(
+            'INSERT INTO items (item_id, name, image, goal_id, collected_at) VALUES (?, ?, ?, ?, ?)',
+            (item_id, name, image, goal_id, collected_at))
+        item = InventoryItem(cursor.lastrowid, item_id, name, image, goal_id, collected_at)
+        if self._items is not None:
+            self._items.append(item)
+        if goal_id:
+            self._goal_ids.add(goal_id)
+        self._writes_since_checkpoint += 1
+        if self._writes_since_checkpoint >= CHECKPOINT_EVERY:
+            self.checkpoint()
+        return item
+
+    def grant_many(self, items):
+        # Bulk import (e.g. migrating or restoring an account) in a single transaction.
+        # `items` are (item_id, name, image, goal_id, collected_at) tuples.
+        with self.db:
+            self.db.execute('BEGIN')
+            self.db.executemany(
+                'INSERT INTO items (item_id, name, image, goal_id, collected_at) VALUES (?, ?, ?, ?, ?)',
+                items)
+        self._items = None # Reload on next access
+
+    def remove(self, seq):
+        self.db.execute('DELETE FROM items WHERE seq = ?', (seq,))
+        self._items = None
+
+    # --- Maintenance ---
+    def checkpoint(self):
+        # Copy committed log pages into the database file without blocking readers.
+        self.db.execute('PRAGMA wal_checkpoint(PASSIVE)')
+        self._writes_since_checkpoint = 0
+
+    def compact(self):
+        # Fold the whole log into the database and truncate it; VACUUM after many deletions.
+        self.db.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        self._writes_since_checkpoint = 0
+        pages = self.db.execute('PRAGMA page_count').fetchone()[0]
+        free = self.db.execute('PRAGMA freelist_count').fetchone()[0]
+        if pages and free / pages >= VACUUM_FREE_RATIO:
+            self.db.execute('VACUUM')
+            self.db.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+
+    def close(self):
+        if self.db is not None:
+            self.compact()
+            self.db.close()
+            self.db = None
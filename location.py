@@ -0,0 +1,266 @@
+import csv
+import math
+import threading
+import time
+import xml.etree.ElementTree as ET
+from collections import namedtuple
+from datetime import datetime
+
+from geo import METRES_PER_DEGREE_LAT, metres_per_degree_lon
+
+# GPS_TRACKING: Location Pipeline
+# Raw fixes come from a pluggable provider (device GPS through plyer, or a recorded
+# GPX/CSV trace), possibly on another thread and at a high rate. The pipeline smooths
+# them as they arrive, keeps only the latest smoothed fix, and hands that to its
+# listeners at most once per frame. Listeners (the map's player marker) therefore move
+# at display rate no matter how fast the GPS reports.
+# Plain Python: the per-frame flush is scheduled through a `scheduler` callable so the
+# same pipeline runs on the Kivy clock in the app and in a loop in benchmarks.
+
+Fix = namedtuple('Fix', 'lat lon accuracy timestamp') # accuracy in metres, timestamp in seconds
+
+DEFAULT_ACCURACY_M = 10.0
+
+
+# --- Filters ---
+class ExponentialFilter(object):
+    # Exponential moving average; `alpha` close to 1 follows raw fixes, close to 0 smooths harder.
+
+    def __init__(self, alpha=0.3):
+        self.alpha = alpha
+        self.state = None
+
+    def update(self, fix):
+        if self.state is None:
+            self.state = fix
+        else:
+            a = self.alpha
+            self.state = Fix(self.state.lat + a * (fix.lat - self.state.lat),
+                             self.state.lon + a * (fix.lon - self.state.lon),
+                             fix.accuracy, fix.timestamp)
+        return self.state
+
+    def reset(self):
+        self.state = None
+
+
+class KalmanFilter(object):
+    # Position-only Kalman filter, one variance shared by lat and lon. The process noise
+    # grows with the time since the last fix at `speed_mps` (a brisk walk by default), and
+    # each fix is weighted by its reported accuracy.
+
+    def __init__(self, speed_mps=2.0):
+        self.speed_mps = speed_mps
+        self.lat = None
+        self.lon = None
+        self.variance = -1.0 # Negative: no fix yet
+        self.timestamp = None
+
+    def update(self, fix):
+        accuracy = max(fix.accuracy or DEFAULT_ACCURACY_M, 1.0)
+        if self.variance < 0:
+            self.lat, self.lon = fix.lat, fix.lon
+            self.variance = accuracy * accuracy
+        else:
+            dt = max(fix.timestamp - self.timestamp, 0.0)
+            self.variance += dt * self.speed_mps * self.speed_mps
+            gain = self.variance / (self.variance + accuracy * accuracy)
+            self.lat += gain * (fix.lat - self.lat)
+            self.lon += gain * (fix.lon - self.lon)
+            self.variance *= (1 - gain)
+        self.timestamp = fix.timestamp
+        return Fix(self.lat, self.lon, math.sqrt(self.variance), fix.timestamp)
+
+    def reset(self):
+        self.variance = -1.0
+
+
+# --- Pipeline ---
+class LocationPipeline(object):
+    def __init__(self, smoothing=None, scheduler=None, clock=time.perf_counter):
+        self.smoothing = smoothing if smoothing is not None else KalmanFilter()
+        self.scheduler = scheduler # callable(fn): run fn once on the next frame; None = call flush() yourself
+        self.clock = clock
+        self.latest = None # Latest smoothed Fix delivered to listeners
+        self.raw_fixes = 0
+        self.deliveries = 0
+        self.total_latency = 0.0 # Seconds from receiving a fix to delivering its smoothed value
+        self.max_latency = 0.0
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._pending = None # (smoothed Fix, receive time) not yet delivered
+        self._flush_scheduled = False
+
+    def bind(self, callback):
+        self._listeners.append(callback)
+
+    def unbind(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def push(self, fix):
+        # Called by providers, from any thread.
+        received = self.clock()
+        with self._lock:
+            self.raw_fixes += 1
+            smoothed = self.smoothing.update(fix)
+            self._pending = (smoothed, received)
+            schedule = self.scheduler is not None and not self._flush_scheduled
+            self._flush_scheduled = self._flush_scheduled or schedule
+        if schedule:
+            self.scheduler(self.flush)
+
+    def flush(self):
+        # Deliver the newest smoothed fix, if any arrived since the last flush (main thread).
+        with self._lock:
+            pending, self._pending = self._pending, None
+            self._flush_scheduled = False
+        if pending is None:
+            return None
+        smoothed, received = pending
+        latency = self.clock() - received
+        self.deliveries += 1
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+        self.latest = smoothed
+        for callback in list(self._listeners):
+            callback(smoothed)
+        return smoothed
+
+    def reset(self):
+        with self._lock:
+            self._pending = None
+            self.smoothing.reset()
+
+    def stats(self):
+        return {'raw_fixes': self.raw_fixes, 'deliveries': self.deliveries,
+                'coalesced': self.raw_fixes - self.deliveries,
+                'mean_latency_s': self.total_latency / self.deliveries if self.deliveries else 0.0,
+                'max_latency_s': self.max_latency}
+
+
+# --- Providers ---
+class LocationProvider(object):
+    # Providers call `on_fix(Fix)` for every raw fix between start() and stop().
+
+    def start(self, on_fix):
+        raise NotImplementedError
+
+    def stop(self):
+        pass
+
+
+class PlyerGPSProvider(LocationProvider):
+    # Device GPS through plyer (Android/iOS). Needs the location permission on Android.
+
+    def __init__(self, min_time_ms=1000, min_distance_m=1):
+        from plyer import gps # Optional dependency, only present on mobile builds
+        self.gps = gps
+        self.min_time_ms = min_time_ms
+        self.min_distance_m = min_distance_m
+        self._on_fix = None
+        self.gps.configure(on_location=self._on_location)
+
+    def _on_location(self, **kwargs):
+        if self._on_fix is not None:
+            self._on_fix(Fix(float(kwargs['lat']), float(kwargs['lon']),
+                             float(kwargs.get('accuracy') or DEFAULT_ACCURACY_M), time.time()))
+
+    def start(self, on_fix):
+        self._on_fix = on_fix
+        self.gps.start(minTime=self.min_time_ms, minDistance=self.min_distance_m)
+
+    def stop(self):
+        self._on_fix = None
+        self.gps.stop()
+
+
+def load_trace(path):
+    # Fixes from a GPX file (track points, optional <time>) or a CSV file with a header
+    # containing lat, lon and optionally time (seconds or ISO 8601) and accuracy.
+    if path.lower().endswith('.gpx'):
+        return _load_gpx(path)
+    return _load_csv(path)
+
+
+def _parse_time(value, index):
+    if value in (None, ''):
+        return float(index)
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+
+
+def _load_csv(path):
+    fixes = []
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        for i, row in enumerate(csv.DictReader(f)):
+            fixes.append(Fix(float(row['lat']), float(row['lon']),
+                             float(row.get('accuracy') or DEFAULT_ACCURACY_M),
+                             _parse_time(row.get('time'), i)))
+    return fixes
+
+
+def _load_gpx(path):
+    fixes = []
+    for point in ET.parse(path).getroot().iter():
+        if not point.tag.endswith('trkpt'):
+            continue
+        when = next((child.text for child in point if child.tag.endswith('time')), None)
+        fixes.append(Fix(float(point.get('lat')), float(point.get('lon')),
+                         DEFAULT_ACCURACY_M, _parse_time(when, len(fixes))))
+    return fixes
+
+
+class ReplayProvider(LocationProvider):
+    # Plays a recorded trace back on a background thread, keeping the recorded spacing
+    # between fixes divided by `speed` (speed=0 replays as fast as possible).
+    # Timestamps are rebased to the time of start(), keeping the recorded spacing, so
+    # filters see the same intervals as during recording.
+
+    def __init__(self, path_or_fixes, speed=1.0, loop=False):
+        self.fixes = load_trace(path_or_fixes) if isinstance(path_or_fixes, str) else list(path_or_fixes)
+        self.speed = speed
+        self.loop = loop
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self, on_fix):
+        self.stop()
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(on_fix, self._stop_event),
+                                        name='location-replay', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
+        self._thread = None
+
+    def _run(self, on_fix, stop_event):
+        if not self.fixes:
+            return
+        first = self.fixes[0].timestamp
+        duration = self.fixes[-1].timestamp - first + 1.0
+        origin = time.time()
+        lap = 0
+        while not stop_event.is_set():
+            start = time.time()
+            for fix in self.fixes:
+                if self.speed > 0:
+                    delay = start + (fix.timestamp - first) / self.speed - time.time()
+                    if delay > 0 and stop_event.wait(delay):
+                        return
+                elif stop_event.is_set():
+                    return
+                on_fix(fix._replace(timestamp=origin + lap * duration + fix.timestamp - first))
+            if not self.loop:
+                return
+            lap += 1
+
+
+def offset_m(lat, lon, north_m, east_m):
+    # lat/lon moved by a small offset in metres (used to build synthetic traces).
+    return lat + north_m / METRES_PER_DEGREE_LAT, lon + east_m / metres_per_degree_lon(lat)
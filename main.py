@@ -1,17 +1,217 @@
+import os
+from weakref import WeakSet
+
 import kivy
 from kivy.app import App
-from kivy.uix.screenmanager import ScreenManager, Screen
+from kivy.uix.screenmanager import Screen
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.button import Button
 from kivy.uix.label import Label
-from kivy.uix.image import Image # Added for background image
 from kivy.core.window import Window # Added to potentially set background color
 
 from kivy.uix.floatlayout import FloatLayout # Added for better background and content layering
-from kivy.uix.scrollview import ScrollView # For StoryScreen and RewardsScreen
 from kivy.properties import StringProperty # For binding Label text size in ScrollView
-from kivy.uix.gridlayout import GridLayout # For RewardsScreen
-from kivy.uix.screenmanager import SlideTransition # For screen transitions
+from kivy.uix.recycleview import RecycleView # For RewardsScreen (virtualized item grid)
+from kivy.uix.recyclegridlayout import RecycleGridLayout
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+from kivy.uix.image import AsyncImage # Thumbnails decoded off the main thread
+from kivy.metrics import dp
+from kivy.clock import Clock # For per-frame location updates
+from kivy.utils import platform # To pick the location provider
+from kivy.base import EventLoop # Its per-frame steps are timed when profiling
+from kivy.cache import Cache # Kivy's own image/texture caches, emptied while paused
+from kivy.uix.layout import Layout # Its do_layout calls are counted when profiling
+
+from screen_registry import LazyScreenManager # Builds screens on first use
+from goal_index import GoalStore # Spatial index over the goals of the current event
+from geo import MapBounds
+from marker_layer import GoalMarkerLayer, PlayerMarker # Pooled goal markers, transform-moved player marker
+from tile_map import TiledMapLayer, open_tile_source # Pan/zoom map drawn from cached tiles
+from location import KalmanFilter, LocationPipeline, PlyerGPSProvider, ReplayProvider # GPS fixes
+from geofence import GeofenceEngine # Enter/dwell/exit events around goals
+from inventory import InventoryStore # Crash-safe, append-only reward storage
+import assets # Shared sprite textures/atlas and pre-scaled backgrounds
+import async_image
+from async_image import ProgressiveImage, release_textures # Large images decoded off the main thread
+from story_engine import STORY_DIR, Story, StoryPack # Per-goal stories from the content pack
+from story_view import StoryView # Paragraph-virtualized story text
+from text_cache import shared_text_cache # Rendered text shared by every screen
+from frame_source import CameraFrameSource, SyntheticFrameSource, VideoFrameSource # AR camera feed
+from frame_view import FrameView, KivyCameraSource
+from vision import AnchorFollower, VisionStage # Marker tracking off the main thread
+from sprite_anim import CharacterSprite # Sprite-sheet animated AR character
+from dialogue import DIALOGUE_DIR, DialogueRunner, DialogueScript, load_script # Compiled branching dialogue scripts
+from content_pack import CONTENT_CACHE_DIR, PACK_FILE, UPDATE_DIR, ContentPack, ContentPackError, install_updates # Offline content
+from game_state import INVENTORY, GameState # Shared game data with per-frame change events
+from resources import ResourceManager, memory_rss # Heavy resources released while the app is paused
+from profiling import frame_profiler, layout_counter, log, traced, tracer # Levelled logging, spans and frame timing
+from profiling_overlay import ProfilerOverlay
+from canvas_overlay import OverlayLayer # Bubbles, badges and markers drawn as canvas instructions
+from transitions import create_transition # Snapshot slides, or none on low-end devices
+from narration import SPEECH_DIR, Narrator, SpeechCache, create_engine # Background story narration
+from sound_player import SoundPlayer
+
+GOALS_FILE = 'goals.json' # Goal locations, names and check-in radius
+MAP_TILE_SOURCES = ('map.mbtiles', 'map_tiles') # First one found is used; see tools/make_tiles.py
+DEFAULT_MAP_BOUNDS = MapBounds(51.5, -0.13, 51.506, -0.12) # The demo park, when there are no goals to show
+DEMO_TRACE = 'traces/demo_walk.csv' # Walk replayed on desktop, where there is no GPS
+DEMO_REPLAY_SPEED = 4.0
+INVENTORY_FILE = 'inventory.db' # Created in App.user_data_dir
+INVENTORY_COMPACT_INTERVAL = 300 # Seconds between inventory compactions while running
+STATE_DIR = 'state' # Game state sections, in App.user_data_dir
+STATE_SAVE_INTERVAL = 30 # Seconds between saves of changed game state sections
+
+CHARACTER_HOME = {'center_x': 0.5, 'center_y': 0.5} # AR character position without a tracked marker
+DIALOGUE_SITE = 'intro' # dialogue/<site>.json, compiled to .dlg
+CHARACTER_TALK_TIME = 2.5 # Seconds the AR character animates talking per dialogue line
+DEFAULT_GREETING = "Hello, Traveler! Welcome to the past." # Shown without a dialogue script
+CHOICE_COLOR = (0.15, 0.35, 0.55, 0.9)
+CAMERA_SETTING = os.environ.get('TIME_TRAVELER_CAMERA', '') # Desktop: camera index, video file or 'synthetic'
+TRANSITION_SETTING = os.environ.get('TIME_TRAVELER_TRANSITIONS', '') # snapshot, slide or none; '' picks per device
+SPEECH_ENGINE = os.environ.get('TIME_TRAVELER_TTS', '') # pyttsx3 (the default, if installed) or fake
+NARRATION_LABELS = {'idle': 'Read Aloud', 'waiting': 'Preparing...', 'playing': 'Pause', 'paused': 'Resume'}
+
+PROFILE = bool(os.environ.get('TIME_TRAVELER_PROFILE')) # Spans, frame timing and the on-screen overlay
+PROFILE_TRACE_FILE = 'trace.json' # Chrome trace of the session, written to App.user_data_dir on stop
+
+if platform in ('android', 'ios') and not os.environ.get('TIME_TRAVELER_LOG'):
+    log.set_level('warning') # Console output is itself slow on phones
+
+if os.environ.get('TIME_TRAVELER_AUDIT_DECODES'):
+    assets.install_decode_audit() # Duplicate decodes are printed when the app stops
+
+def game_state():
+    # GAME_STATE: The running app's GameState, or None for screens built outside the app (benchmarks).
+    return getattr(App.get_running_app(), 'game_state', None)
+
+def app_resources():
+    # APP_LIFECYCLE: The running app's ResourceManager, or None for screens built outside the app.
+    return getattr(App.get_running_app(), 'resources', None)
+
+def app_content():
+    # CONTENT_PACKS: The running app's ContentPack, or None to use the loose files in the repository.
+    return getattr(App.get_running_app(), 'content', None)
+
+def open_content_pack(data_dir):
+    # CONTENT_PACKS: The newest content pack: the installed copy in the app's data directory or
+    # the one shipped with the app, whichever was built later, with downloaded updates applied.
+    installed = os.path.join(data_dir, PACK_FILE)
+    candidates = []
+    for path in (installed, PACK_FILE):
+        try:
+            with ContentPack(path) as pack:
+                candidates.append((pack.manifest.get('created', 0), path))
+        except ContentPackError:
+            pass
+    if not candidates:
+        return None
+    path = install_updates(max(candidates)[1], os.path.join(data_dir, UPDATE_DIR), installed)
+    try:
+        pack = ContentPack(path)
+    except ContentPackError as e:
+        log.error("Error opening content pack: %s", e)
+        return None
+    log.info("Content pack version %s (%d entries).", pack.version, len(pack))
+    return pack
+
+def content_file(name):
+    # CONTENT_PACKS: A file holding `name`: extracted from the content pack (once per content
+    # hash) if the pack has it, otherwise the loose file itself.
+    pack = app_content()
+    if pack is None or name not in pack:
+        return name
+    return pack.extract(name, os.path.join(App.get_running_app().user_data_dir, CONTENT_CACHE_DIR))
+
+def load_dialogue(site):
+    # CHARACTER_DIALOGUE_SYSTEM: The compiled script of a site, from the content pack if it has one.
+    entry = f'{DIALOGUE_DIR}/{site}.dlg'
+    pack = app_content()
+    if pack is not None and entry in pack:
+        return DialogueScript(content_file(entry))
+    return load_script(site)
+
+def release_cached_textures():
+    # APP_LIFECYCLE: Empty the process-wide texture caches; textures are decoded again when next used.
+    # The caches only free what no widget shows: screens release their widgets' textures
+    # themselves (register_textures). Atlas sprites stay resident, being one shared texture.
+    assets.shared_textures.release()
+    release_textures()
+    shared_text_cache.clear()
+    Cache.remove('kv.image')
+    Cache.remove('kv.texture')
+
+def register_textures(screen, name, widget):
+    # APP_LIFECYCLE: `widget` drops its textures while the app is paused (widget.release) and
+    # gets them back when `screen` is shown again (widget.restore).
+    resources = app_resources()
+    if resources is not None:
+        resources.register(f'{screen.name}.{name}', widget.release, widget.restore, owner=screen.name)
+
+def log_text_cache_stats(owner):
+    # TEXT_RENDERING: What a screen's text cost it, logged when the screen is left.
+    if log.enabled_for('info'):
+        stats = shared_text_cache.stats(owner)
+        log.info("Text cache [%s]: %d hits, %d renders (%.0f%% hit rate), %.1f ms rendering, %d KB resident.",
+                 owner, stats['hits'], stats['misses'], stats['hit_rate'] * 100, stats['render_ms'],
+                 stats['resident_bytes'] // 1024)
+
+_goal_store = None
+
+def shared_goal_store():
+    # The goals of the current event, loaded once and shared by the screens that need them.
+    global _goal_store
+    if _goal_store is None:
+        pack = app_content()
+        try:
+            if pack is not None and GOALS_FILE in pack:
+                _goal_store = GoalStore.from_dict(pack.read_json(GOALS_FILE))
+            else:
+                _goal_store = GoalStore.load(GOALS_FILE)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            # A missing or broken goals file leaves the event without goals rather than the app without a map.
+            log.error("Error loading goals from %s: %s", GOALS_FILE, e)
+            _goal_store = GoalStore()
+    return _goal_store
+
+def create_location_provider():
+    # GPS_TRACKING: Device GPS on mobile, a recorded walk everywhere else (None if neither works).
+    if platform in ('android', 'ios'):
+        try:
+            return PlyerGPSProvider()
+        except Exception as e:
+            log.warning("GPS not available: %s", e)
+            return None
+    try:
+        return ReplayProvider(DEMO_TRACE, speed=DEMO_REPLAY_SPEED, loop=True)
+    except OSError as e:
+        log.error("Error loading demo trace %s: %s", DEMO_TRACE, e)
+        return None
+
+def create_narrator():
+    # TEXT_TO_SPEECH: A Narrator speaking through the configured engine, caching audio in the
+    # app's data directory (None without a running app or a speech engine).
+    app = App.get_running_app()
+    engine = create_engine(SPEECH_ENGINE)
+    if app is None or engine is None:
+        return None
+    return Narrator(engine, SpeechCache(os.path.join(app.user_data_dir, SPEECH_DIR)), SoundPlayer(),
+                    scheduler=lambda fn: Clock.schedule_once(lambda dt: fn()))
+
+def create_frame_source():
+    # AR_RENDERING_POINT: The phone camera on mobile; on desktop whatever TIME_TRAVELER_CAMERA
+    # names (None, i.e. the placeholder image, if unset or unavailable).
+    try:
+        if platform in ('android', 'ios'):
+            return KivyCameraSource()
+        if CAMERA_SETTING == 'synthetic':
+            return SyntheticFrameSource()
+        if CAMERA_SETTING.isdigit():
+            return CameraFrameSource(int(CAMERA_SETTING))
+        if CAMERA_SETTING:
+            return VideoFrameSource(CAMERA_SETTING, loop=True)
+    except Exception as e:
+        log.warning("Camera feed not available: %s", e)
+    return None
 
 kivy.require('2.0.0') # Ensure Kivy version compatibility
 
@@ -24,16 +224,16 @@ class StartScreen(Screen):
 
         # --- Background Image ---
         # FUTURE_INTEGRATION: Consider animated or themed backgrounds based on game progress.
-        try:
-            background_image = Image(source='placeholder_background.png', 
-                                     allow_stretch=True, 
-                                     keep_ratio=False,
-                                     size_hint=(1, 1)) # Cover the whole screen
-            root_layout.add_widget(background_image)
-        except Exception as e:
-            print(f"Error loading background image 'placeholder_background.png': {e}")
-            # Fallback: set window background color if image fails
-            Window.clearcolor = (0.1, 0.1, 0.1, 1) # Dark fallback color
+        # The forest painting is used in a pre-scaled variant matching the window (built by
+        # tools/build_assets.py), or the full-size original without variants. It is decoded
+        # on a worker thread: the first frame shows its blurred preview (or a dark colour) and
+        # the painting fades in when ready, staying on the placeholder if it cannot be loaded.
+        background_image = ProgressiveImage(source=assets.background_source(assets.FOREST_BACKGROUND,
+                                                                            Window.size),
+                                            placeholder_color=(0.1, 0.1, 0.1, 1),
+                                            size_hint=(1, 1)) # Cover the whole screen
+        root_layout.add_widget(background_image)
+        register_textures(self, 'background', background_image)
 
         # --- Content Layout (BoxLayout for title and buttons) ---
         content_layout = BoxLayout(orientation='vertical', 
@@ -72,15 +272,15 @@ class StartScreen(Screen):
         self.add_widget(root_layout) # Add the root layout to the screen
 
     def start_game(self, instance):
-        print("Start Game button pressed")
+        log.debug("Start Game button pressed")
         self.manager.current = 'ar_camera_view' # Navigate to ARCameraViewScreen
 
     def how_to_play(self, instance):
-        print("How to Play button pressed, navigating to HowToPlayScreen.")
+        log.debug("How to Play button pressed, navigating to HowToPlayScreen.")
         self.manager.current = 'how_to_play_screen'
 
     def exit_app(self, instance):
-        print("Exit button pressed")
+        log.debug("Exit button pressed")
         App.get_running_app().stop()
 
 class MainScreen(Screen):
@@ -121,7 +321,7 @@ class SettingsScreen(Screen):
 
     def go_to_start_screen(self, instance):
         # Renamed method for clarity, navigates back to Start Screen.
-        print("SettingsScreen: Navigating back to Start Screen.")
+        log.debug("SettingsScreen: Navigating back to Start Screen.")
         self.manager.current = 'start'
 
 # How To Play Screen
@@ -151,17 +351,14 @@ Welcome, Time Traveler!
 
 Have fun exploring the past!
         """
-        instructions_label = Label(text=instructions_text,
-                                   font_size='16sp',
-                                   halign='left',
-                                   valign='top',
-                                   text_size=(Window.width - 60, None)) # For word wrap
-        instructions_label.bind(texture_size=instructions_label.setter('size')) # Adjust size for text
-
-        # Add instructions to a ScrollView in case they get too long
-        scroll_view_instructions = ScrollView(size_hint=(1, 1))
-        scroll_view_instructions.add_widget(instructions_label)
-        layout.add_widget(scroll_view_instructions)
+        # TEXT_RENDERING: The instructions are a StoryView with one row per line, so they are
+        # rendered through the shared text cache: coming back to this screen, or rotating back
+        # to a width seen before, reuses the textures instead of wrapping the text again.
+        lines = [line.strip() for line in instructions_text.splitlines() if line.strip()]
+        self.instructions_view = StoryView(owner='how_to_play', size_hint=(1, 1))
+        self.instructions_view.show_story(Story('how_to_play', title_label.text, lines))
+        layout.add_widget(self.instructions_view)
+        register_textures(self, 'text', self.instructions_view)
 
         back_button = Button(text='Back to Start', size_hint_y=None, height='50dp')
         back_button.bind(on_press=self.back_to_start)
@@ -169,6 +366,9 @@ Have fun exploring the past!
 
         self.add_widget(layout)
 
+    def on_leave(self, *args):
+        log_text_cache_stats('how_to_play')
+
     def back_to_start(self, instance):
         self.manager.current = 'start'
 
@@ -176,75 +376,75 @@ Have fun exploring the past!
 class ARCameraViewScreen(Screen):
     def __init__(self, **kwargs):
         super(ARCameraViewScreen, self).__init__(**kwargs)
-        
-        # Root layout for AR screen: FloatLayout for layering
-        ar_root_layout = FloatLayout()
+        # LAYOUT: A Screen already lays its children out like a FloatLayout, so the feed, the
+        # character, the dialogue overlay and the buttons are its direct children.
 
         # --- Camera Feed Simulation ---
         # AR_RENDERING_POINT: Live Camera Feed Integration
-        # The Image widget below (camera_feed_image) is a placeholder.
-        # This should be replaced with a Kivy widget capable of displaying a live camera feed
-        # (e.g., Kivy's `Camera` widget or a custom solution using OpenCV).
+        # Frames come from a frame source (see create_frame_source) and are uploaded into one
+        # persistent texture by FrameView, at most once per frame; frames the UI cannot keep up
+        # with are dropped. Without a camera the placeholder image is shown instead.
         # The actual AR rendering (placing virtual objects onto the feed) would happen
         # either by overlaying widgets on this feed or by manipulating the camera texture directly.
-        try:
-            camera_feed_image = Image(source='camera_feed_placeholder.png',
-                                      allow_stretch=True,
-                                      keep_ratio=False,
-                                      size_hint=(1, 1))
-            ar_root_layout.add_widget(camera_feed_image)
-        except Exception as e:
-            print(f"Error loading camera_feed_placeholder.png: {e}")
-            with ar_root_layout.canvas.before:
-                from kivy.graphics import Color, Rectangle
-                Color(0.15, 0.15, 0.2, 1) 
-                self.rect = Rectangle(size=Window.size) 
-                Window.bind(on_resize=self._update_rect_size)
+        self.camera_feed = None
+        frame_source = create_frame_source()
+        if frame_source is not None:
+            self.camera_feed = FrameView(source=frame_source, size_hint=(1, 1))
+            self.add_widget(self.camera_feed)
+            # APP_LIFECYCLE: While the app is paused the camera is closed and its frame buffers
+            # and texture are freed; it restarts when this screen is shown again.
+            resources = app_resources()
+            if resources is not None:
+                resources.register('ar.camera', self.camera_feed.release, self.camera_feed.start, owner=self.name)
+        else:
+            camera_feed_image = ProgressiveImage(source='camera_feed_placeholder.png',
+                                                 placeholder_color=(0.15, 0.15, 0.2, 1),
+                                                 size_hint=(1, 1))
+            self.add_widget(camera_feed_image)
+            register_textures(self, 'placeholder', camera_feed_image)
 
         # --- Character Interaction Overlay ---
         # AR_RENDERING_POINT: AR Objects & Character Rendering
-        # This `character_overlay` FloatLayout is intended to hold AR elements.
-        # Virtual characters, clues, or other AR objects would be added as widgets to this layout.
+        # AR elements sit directly on the screen: the animated character as a widget, and
+        # bubbles, clues and other flat objects drawn on the canvas of `dialogue_overlay`.
         # Their positions could be determined by AR tracking libraries (e.g., ARCore, ARKit) via Python bindings,
         # or by simpler logic if not using full SLAM.
-        character_overlay = FloatLayout(size_hint=(1, 1))
-        
+        # With a CPU-side camera feed, a VisionStage detects a marker in the frames on worker
+        # threads (vision.py); the character follows it, eased between detections by an
+        # AnchorFollower, and returns to the centre when the marker is lost.
+        self.vision = None
+        self.anchor_follower = AnchorFollower()
+        if self.camera_feed is not None and not isinstance(frame_source, KivyCameraSource):
+            self.vision = VisionStage()
+            self.vision.attach(frame_source)
+
         # CHARACTER_DIALOGUE_SYSTEM: Character Appearance & Animation
-        # The character_image below is a static placeholder.
-        # Future logic should dynamically set the character's image, position, and animations.
-        # This could involve:
-        # - A state machine for character behavior.
-        # - Animation sequences (e.g., using Kivy's Atlas for sprite sheets or `ImageSequence`).
-        # - Logic to trigger appearances based on game events, location, or story progress.
-        try:
-            character_image = Image(source='character_placeholder.png',
-                                    size_hint=(None, None),
-                                    size=('150dp', '200dp'), 
-                                    pos_hint={'center_x': 0.5, 'center_y': 0.5}) 
-            character_overlay.add_widget(character_image)
-        except Exception as e:
-            print(f"Error loading character_placeholder.png: {e}")
-            character_image = Label(text="Character\nPlaceholder",
-                                    size_hint=(None, None), size=('150dp', '200dp'),
-                                    pos_hint={'center_x': 0.5, 'center_y': 0.5})
-            character_overlay.add_widget(character_image)
+        # The character is a CharacterSprite (sprite_anim.py): idle/talk/wave clips played from
+        # one shared sprite sheet by changing texture coordinates, with a small state machine.
+        # It talks while its dialogue is shown and waves when tapped. Until character_sheet.png
+        # exists the static placeholder is shown instead.
+        # Future logic could trigger appearances based on game events, location, or story progress.
+        self.character_image = CharacterSprite(size_hint=(None, None),
+                                               size=('150dp', '200dp'), 
+                                               pos_hint=CHARACTER_HOME) 
+        self.add_widget(self.character_image)
 
         # CHARACTER_DIALOGUE_SYSTEM: Dialogue Text & Logic
-        # The dialogue_bubble's text is static.
-        # Future logic should:
-        # - Fetch dialogue lines from a script or database.
-        # - Update the text dynamically based on game state or player interaction.
-        # - Potentially include branching dialogues or player choices.
-        dialogue_bubble = Button(text="Hello, Traveler! Welcome to the past.", # Placeholder text
-                                 size_hint=(None, None),
-                                 width='300dp',
-                                 height='60dp',
-                                 pos_hint={'center_x': 0.5, 'y': 0.25}, 
-                                 background_color=(0.2, 0.6, 0.8, 0.8), 
-                                 color=(1,1,1,1)) 
-        character_overlay.add_widget(dialogue_bubble)
-        
-        ar_root_layout.add_widget(character_overlay)
+        # Lines come from the compiled, memory-mapped dialogue script of the current site
+        # (dialogue.py). The line and its choices are bubbles on an OverlayLayer (canvas_overlay.py),
+        # so showing a line changes canvas instructions rather than Buttons inside a BoxLayout.
+        # Tapping the line bubble moves to the next line; lines with choices wait for a
+        # choice bubble to be tapped instead. The character talks while a line is shown.
+        # FUTURE_INTEGRATION: Pick the site script from game state (e.g. the last check-in).
+        self.dialogue = None
+        try:
+            self.dialogue = DialogueRunner(load_dialogue(DIALOGUE_SITE))
+        except (OSError, ValueError) as e:
+            log.error("Error loading dialogue '%s': %s", DIALOGUE_SITE, e)
+        self.dialogue_overlay = OverlayLayer(size_hint=(1, 1))
+        self.add_widget(self.dialogue_overlay)
+        register_textures(self, 'dialogue', self.dialogue_overlay)
+        self._show_dialogue_line(talk=False) # Talking starts in on_enter
 
         # --- Navigation Buttons ---
         nav_layout = BoxLayout(orientation='horizontal',
@@ -262,91 +462,170 @@ class ARCameraViewScreen(Screen):
         next_button.bind(on_press=self.go_next)
         nav_layout.add_widget(next_button)
         
-        ar_root_layout.add_widget(nav_layout) # Add nav buttons on top of everything
-
-        self.add_widget(ar_root_layout)
-
-    def _update_rect_size(self, instance, width, height):
-        if hasattr(self, 'rect'):
-            self.rect.size = (width, height)
+        self.add_widget(nav_layout) # Add nav buttons on top of everything
+
+    def on_enter(self, *args):
+        if self.camera_feed is not None:
+            self.camera_feed.start()
+        self.character_image.resume()
+        self.character_image.talk(CHARACTER_TALK_TIME) # Greets the player
+        if self.vision is not None:
+            self.anchor_follower.reset()
+            Clock.schedule_interval(self._follow_anchor, 0) # Every frame
+
+    def on_leave(self, *args):
+        # The camera only runs while the AR view is shown.
+        Clock.unschedule(self._follow_anchor)
+        self.character_image.pause() # No animation ticks while off screen
+        if self.camera_feed is not None:
+            self.camera_feed.stop()
+            if log.enabled_for('info'):
+                stats = self.camera_feed.stats()
+                log.info("ARCameraView: %d frames shown, %d dropped.", stats['uploads'], stats.get('dropped', 0))
+
+    def _show_dialogue_line(self, talk=True):
+        overlay = self.dialogue_overlay
+        overlay.clear()
+        line = self.dialogue.line if self.dialogue is not None else None
+        if self.dialogue is None:
+            text = DEFAULT_GREETING
+        elif line is None:
+            text = '...'
+        else:
+            text = f"{line.speaker}: {line.text}" if line.speaker else line.text
+        overlay.bubble('line', text, anchor=(0.5, 0.25), on_press=self.advance_dialogue)
+        if line is None:
+            return
+        below = 0 # Choices are stacked downwards from just under the line
+        for number, choice in enumerate(line.choices):
+            item = overlay.bubble(f'choice{number}', choice.text, color=CHOICE_COLOR, anchor=(0.5, 0.24),
+                                  anchor_y='top', offset=(0, -below),
+                                  on_press=lambda item, number=number: self.choose(number))
+            below += item.size[1] + dp(5)
+        if talk:
+            self.character_image.talk(CHARACTER_TALK_TIME)
+
+    def advance_dialogue(self, instance):
+        if self.dialogue is None:
+            self.character_image.talk(CHARACTER_TALK_TIME)
+            return
+        if self.dialogue.finished:
+            self.dialogue.restart()
+        elif self.dialogue.line.choices:
+            return # Waiting for a choice button
+        else:
+            self.dialogue.advance()
+        self._show_dialogue_line()
+
+    def choose(self, number):
+        self.dialogue.advance(number)
+        self._show_dialogue_line()
+
+    def _follow_anchor(self, dt):
+        pose = self.anchor_follower.update(self.vision.anchors)
+        if pose is None:
+            if not self.character_image.pos_hint:
+                self.character_image.pos_hint = dict(CHARACTER_HOME)
+            return
+        self.character_image.pos_hint = {} # Positioned from the pose instead of the layout
+        feed = self.camera_feed # Frames are stretched over it; pose y grows downwards
+        self.character_image.center = (feed.x + pose.x * feed.width, feed.top - pose.y * feed.height)
 
     def go_back(self, instance):
-        print("ARCameraView: Back button pressed")
+        log.debug("ARCameraView: Back button pressed")
         # Example: Navigate back to StartScreen or a previous AR scene
         self.manager.current = 'start' 
 
     def go_next(self, instance):
-        print("ARCameraView: Next button pressed, navigating to MapViewScreen")
+        log.debug("ARCameraView: Next button pressed, navigating to MapViewScreen")
         self.manager.current = 'map_view'
 
 # Map View Screen
 class MapViewScreen(Screen):
     def __init__(self, **kwargs):
         super(MapViewScreen, self).__init__(**kwargs)
-        
-        # Root layout for Map screen: FloatLayout for layering map and markers
-        map_root_layout = FloatLayout()
+        # LAYOUT: The map, markers, status badges and buttons are direct children of the
+        # screen, which lays them out like a FloatLayout.
+
+        # --- Goals ---
+        # GPS_TRACKING: Dynamic Goal Loading & Proximity
+        # Goals are loaded from GOALS_FILE into a GoalStore (spatial index), which also gives
+        # the lat/lon bounds of the event's map.
+        # The `check_in_location` method uses the store to verify proximity to these goals.
+        self.goal_store = shared_goal_store()
+        # Goals files without map_bounds are shown around their goals.
+        map_bounds = self.goal_store.map_bounds or self.goal_store.extent() or DEFAULT_MAP_BOUNDS
+        # GPS_TRACKING: Until the first location fix arrives the player stands at the centre of the map.
+        self.player_location = map_bounds.center
 
         # --- Map Background ---
-        # FUTURE_INTEGRATION: Could use an interactive map library (e.g., Kivy Garden mapview)
-        # or allow pinch-to-zoom and panning on a large map image.
-        try:
-            map_image = Image(source='map_placeholder.png',
-                              allow_stretch=True,
-                              keep_ratio=True, 
-                              size_hint=(1, 1))
-            map_root_layout.add_widget(map_image)
-        except Exception as e:
-            print(f"Error loading map_placeholder.png: {e}")
-            with map_root_layout.canvas.before:
-                from kivy.graphics import Color, Rectangle
-                Color(0.7, 0.8, 0.5, 1) 
-                self.rect = Rectangle(size=Window.size)
-                Window.bind(on_resize=self._update_rect_size)
+        # MAP_RENDERING: A tiled map (pan, pinch-zoom, tiles decoded off the UI thread) is used
+        # when one of MAP_TILE_SOURCES exists; otherwise the placeholder image is stretched
+        # over the screen and the view stays fixed on map_bounds.
+        self.map_layer = None
+        tile_source = open_tile_source(MAP_TILE_SOURCES)
+        if tile_source is not None:
+            self.map_layer = TiledMapLayer(tile_source, center=map_bounds.center, size_hint=(1, 1))
+            self.map_layer.fit_bounds(map_bounds)
+            self.map_layer.bind(bounds=self._on_map_viewport)
+            self.add_widget(self.map_layer)
+            # APP_LIFECYCLE: Decoded tiles are dropped while the app is paused and reloaded
+            # for the visible area when the map is shown again.
+            resources = app_resources()
+            if resources is not None:
+                resources.register('map.tiles', self.map_layer.trim, self.map_layer.redraw, owner=self.name)
+        else:
+            map_image = ProgressiveImage(source='map_placeholder.png',
+                                         placeholder_color=(0.7, 0.8, 0.5, 1),
+                                         keep_ratio=True,
+                                         size_hint=(1, 1))
+            self.add_widget(map_image)
+            register_textures(self, 'placeholder', map_image)
         
         # --- Player Marker ---
         # GPS_TRACKING: Player Position Update
-        # The `player_marker` position is static.
-        # Future logic should:
-        # - Interface with a GPS module (e.g., using `plyer` on mobile).
-        # - Continuously update `player_marker.pos_hint` based on real-time GPS coordinates,
-        #   translating lat/lon to map coordinates.
-        try:
-            player_marker = Image(source='player_marker.png',
-                                  size_hint=(None, None),
-                                  size=('30dp', '30dp'), 
-                                  pos_hint={'center_x': 0.5, 'center_y': 0.5}) # Placeholder position
-            map_root_layout.add_widget(player_marker)
-        except Exception as e:
-            print(f"Error loading player_marker.png: {e}")
-            player_marker = Label(text="P", pos_hint={'center_x': 0.5, 'center_y': 0.5}) 
-            map_root_layout.add_widget(player_marker)
+        # Raw fixes from the location provider go through a LocationPipeline that smooths them
+        # and delivers at most one update per frame to `_on_location`. The marker is moved via
+        # a canvas transform (PlayerMarker.move_to) rather than pos_hint, avoiding relayouts.
+        self.player_marker = PlayerMarker()
+        self.add_widget(self.player_marker)
+        self.location = LocationPipeline(KalmanFilter(),
+                                         scheduler=lambda flush: Clock.schedule_once(lambda dt: flush()))
+        self.location.bind(self._on_location)
+        self.location_provider = create_location_provider()
+        self.tracking = False
+        resources = app_resources()
+        if resources is not None:
+            resources.register('map.gps', self.stop_tracking, self.start_tracking, owner=self.name)
+        # CHECK_IN_LOGIC: Every smoothed fix also goes to a GeofenceEngine (geofence.py), which
+        # only measures distances to the goals around the player's grid cell. Walking up to a
+        # goal shows its name; staying there for DWELL_SECONDS checks in automatically.
+        self.geofences = GeofenceEngine(self.goal_store,
+                                        scheduler=lambda flush: Clock.schedule_once(lambda dt: flush()))
+        self.geofences.bind(self._on_geofence_events)
 
         # --- Goal Markers ---
-        # GPS_TRACKING: Dynamic Goal Loading & Proximity
-        # Goal markers are currently hardcoded.
-        # Future logic should:
-        # - Load goal locations (lat/lon, story data, etc.) from a database or configuration file.
-        # - Dynamically create and place `goal_marker` widgets on the map.
-        # - The `check_in_location` method will use GPS data to verify proximity to these goals.
-        goal_positions = [ # Placeholder goal data
-            {'center_x': 0.3, 'center_y': 0.7, 'id': 'goal1'},
-            {'center_x': 0.7, 'center_y': 0.3, 'id': 'goal2'},
-            {'center_x': 0.8, 'center_y': 0.8, 'id': 'goal3'}
-        ]
-        for i, pos_data in enumerate(goal_positions):
-            try:
-                goal_marker = Image(source='goal_marker.png',
-                                    size_hint=(None, None),
-                                    size=('25dp', '25dp'), 
-                                    pos_hint={'center_x': pos_data['center_x'], 'center_y': pos_data['center_y']})
-                # FUTURE_INTEGRATION: Store goal_id or related data with the marker widget for interaction.
-                # goal_marker.goal_id = pos_data['id'] 
-                map_root_layout.add_widget(goal_marker)
-            except Exception as e:
-                print(f"Error loading goal_marker.png for goal {i}: {e}")
-                goal_marker = Label(text=f"G{i+1}", pos_hint={'center_x': pos_data['center_x'], 'center_y': pos_data['center_y']})
-                map_root_layout.add_widget(goal_marker)
+        # The marker layer only creates (pooled) marker widgets for goals inside the visible
+        # map bounds, placed by projecting their lat/lon into those bounds.
+        self.marker_layer = GoalMarkerLayer(goal_store=self.goal_store,
+                                            bounds=map_bounds,
+                                            size_hint=(1, 1))
+        self.marker_layer.bind(pos=self._update_player_marker, size=self._update_player_marker)
+        self.add_widget(self.marker_layer)
+        register_textures(self, 'markers', self.marker_layer)
+
+        # --- Check-In Feedback ---
+        # Status and progress lines are badges on a canvas OverlayLayer: updating them while
+        # walking does not lay out anything.
+        self.badges = OverlayLayer(size_hint=(1, 1))
+        self.add_widget(self.badges)
+        register_textures(self, 'badges', self.badges)
+        self.status_goal = None # Goal the status badge is about, if any
+        # GAME_STATE: Only the progress label listens to check-ins.
+        state = game_state()
+        if state is not None:
+            state.subscribe('progress', self._on_progress, keys=('checked_in',))
+            self._on_progress({'checked_in': state.get('progress', 'checked_in')})
 
         # --- UI Elements (Buttons) ---
         ui_layout = BoxLayout(orientation='vertical', # Changed to vertical for easier stacking
@@ -364,94 +643,155 @@ class MapViewScreen(Screen):
         back_to_ar_button.bind(on_press=self.back_to_ar)
         ui_layout.add_widget(back_to_ar_button)
         
-        map_root_layout.add_widget(ui_layout)
-        self.add_widget(map_root_layout)
-
-    def _update_rect_size(self, instance, width, height):
-        if hasattr(self, 'rect'): # Check if self.rect exists (for fallback background)
-            self.rect.size = (width, height)
-
+        self.add_widget(ui_layout)
+
+    def _on_map_viewport(self, map_layer, bounds):
+        # The tiled map was panned or zoomed: move the markers along with it.
+        self.marker_layer.set_viewport(bounds)
+        self._update_player_marker()
+
+    def _on_location(self, fix):
+        self.player_location = (fix.lat, fix.lon)
+        self._update_player_marker()
+        self.geofences.update(fix)
+        state = game_state()
+        if state is not None:
+            state.set('player', 'location', self.player_location)
+
+    def _on_geofence_events(self, events):
+        visit = None
+        for event in events:
+            if event.kind == 'enter':
+                self.set_status(f"You are near {event.goal.name or event.goal.id}...", goal_id=event.goal.id)
+            elif event.kind == 'exit':
+                if self.status_goal == event.goal.id: # Keep the status of a goal entered since
+                    self.set_status('')
+            elif visit is None and self.manager is not None and self.manager.current == self.name:
+                # Dwell: the player stayed, so this is a visit (unless the goal was visited before).
+                state = game_state()
+                if state is None or event.goal.id not in (state.get('progress', 'checked_in') or ()):
+                    visit = event
+        if visit is not None: # After the whole batch, as it leaves the screen
+            self._check_in(visit.goal, visit.distance)
+
+    def _on_progress(self, changes):
+        found = len(changes['checked_in'] or ())
+        self.badges.badge('progress', f"Echoes found: {found} / {len(self.goal_store)}", width=dp(220),
+                          font_size='14sp', anchor=(0.5, 0.94), anchor_y='top')
+
+    def set_status(self, text, goal_id=None):
+        # `goal_id`: the goal the status is about, so leaving another goal does not clear it.
+        self.status_goal = goal_id if text else None
+        if text:
+            self.badges.badge('status', text, width=dp(320), font_size='16sp', anchor=(0.5, 1), anchor_y='top',
+                              offset=(0, -dp(4)))
+        else:
+            self.badges.remove('status')
+
+    def _update_player_marker(self, *args):
+        self.player_marker.move_to(*self.marker_layer.to_layer(*self.player_location))
+
+    def start_tracking(self):
+        if self.location_provider is not None and not self.tracking:
+            self.tracking = True
+            self.location_provider.start(self.location.push)
+
+    def stop_tracking(self):
+        if self.tracking:
+            self.tracking = False
+            self.location_provider.stop()
+
+    def on_enter(self, *args):
+        self.start_tracking()
+
+    def on_leave(self, *args):
+        # Stop the GPS while the map is not shown; it is a major battery drain.
+        self.stop_tracking()
+        if self.map_layer is not None and log.enabled_for('info'):
+            stats = self.map_layer.stats()
+            log.info("MapViewScreen: tile cache hit rate %.0f%%, %d tiles / %.1f MB resident.",
+                     stats['hit_rate'] * 100, stats['tiles'], stats['resident_bytes'] / 1048576)
+
+    @traced('check_in', 'map')
     def check_in_location(self, instance):
-        print("MapViewScreen: Check In button pressed. Navigating to StoryScreen.")
+        log.debug("MapViewScreen: Check In button pressed.")
         # CHECK_IN_LOGIC: Proximity Verification & Event Triggering
-        # This function is called when the "Check In" button is pressed.
-        # Future logic should:
-        # 1. Get current player GPS coordinates.
-        # 2. Identify the nearest active goal marker (or a specific target goal).
-        # 3. Calculate distance to the goal.
-        # 4. If within a defined radius (e.g., 10-20 meters):
-        #    a. Trigger the story event: self.manager.current = 'story_screen'
-        #       (Potentially pass goal_id to StoryScreen to load specific content).
-        #    b. Mark the goal as completed or update game state.
-        # 5. Else (not close enough):
-        #    a. Provide feedback to the player (e.g., "You are not close enough to check in.").
-        self.manager.current = 'story_screen' # Placeholder: navigates directly
+        # Check-ins normally happen by themselves (see _on_geofence_events); the button checks in
+        # at once at the nearest goal within the event's check-in radius, looked up in the
+        # goal store's spatial index, so the cost does not grow with the number of goals loaded.
+        lat, lon = self.player_location
+        hit = self.goal_store.check_in(lat, lon)
+        if hit is None:
+            nearest = self.goal_store.nearest(lat, lon)
+            if nearest is not None:
+                self.set_status(f"You are not close enough to check in "
+                                f"({nearest[1]:.0f} m to {nearest[0].name}).")
+            else:
+                self.set_status("There are no goals to check in to.")
+            return
+        self._check_in(*hit)
+
+    def _check_in(self, goal, distance):
+        # A check-in is recorded in the game state (current goal, goals visited); the story
+        # screen follows current_goal from there.
+        log.info("MapViewScreen: Checked in at %s (%.1f m). Navigating to StoryScreen.", goal.id, distance)
+        self.set_status('')
+        state = game_state()
+        if state is not None:
+            state.set('progress', 'current_goal', goal.id)
+            state.append('progress', 'checked_in', goal.id)
+        self.manager.current = 'story_screen'
 
     def back_to_ar(self, instance):
-        print("MapViewScreen: Navigating back to AR Camera View.")
+        log.debug("MapViewScreen: Navigating back to AR Camera View.")
         self.manager.current = 'ar_camera_view'
 
 # Story Screen
 class StoryScreen(Screen):
-    story_text_content = StringProperty("""
-A long time ago, in a bustling city that is now your quiet park, lived a famous inventor named Alistair Finch. 
-Alistair was known for his peculiar gadgets and his even more peculiar theories about time. 
-One day, he vanished without a trace, leaving behind only a cryptic journal filled with diagrams of a strange device.
-
-Legend says Alistair discovered a way to create small pockets in time, allowing him to observe the past. 
-He wasn't trying to change history, only to learn from its forgotten moments. His journal speaks of 'Echoes of Time' – 
-locations where significant events left a strong temporal residue.
-
-Your mission, should you choose to accept it, is to find these Echoes. 
-By visiting the locations marked on your map, you'll unlock fragments of Alistair's story and perhaps discover what became of him.
-
-The first Echo is said to be near the old oak tree, the oldest in the park. 
-Alistair believed it was a silent witness to centuries of change. Go there, activate your scanner (the AR view), 
-and see if you can perceive the whispers of the past.
-
-Remember, time is a river; we are merely travelers on its currents. Observe, learn, and respect the flow.
-This is a very long text to ensure that scrolling is actually needed. 
-Kivy's ScrollView requires its child's size_hint_y to be None and its height to be set explicitly. 
-The Label's text_size property is also important for word wrapping. 
-By binding the Label's height to its texture_size[1], it will grow as tall as its text content.
-Let's add more lines. And more. And more.
-This should be enough to demonstrate scrolling functionality within the Kivy application.
-Ancient tales speak of a hidden artifact, the Chronos Shard, which Alistair sought. 
-It was said to stabilize these time pockets.
-Perhaps clues to its whereabouts are hidden within these Echoes.
-The city archives mention a great fire in 1888 that ravaged this part of the town. Alistair was fascinated by it.
-Could one of the Echoes be related to this event?
-Be wary, some say that lingering too long in these Echoes can have... side effects.
-But that's just superstition, right?
-Keep exploring!
-    """)
-
+    goal_id = StringProperty('') # Goal the player checked in at (GameState progress.current_goal)
     def __init__(self, **kwargs):
         super(StoryScreen, self).__init__(**kwargs)
         
         screen_layout = BoxLayout(orientation='vertical', padding='10dp', spacing='10dp')
 
         # --- Story Text Area ---
-        # FUTURE_INTEGRATION: Story text could be loaded dynamically based on game progress or goal_id.
-        # Consider using Kivy's markup for richer text formatting if needed.
-        scroll_view = ScrollView(size_hint=(1, 0.7)) 
-        
-        story_label = Label(text=self.story_text_content, # Current placeholder text
-                            font_size='16sp',
-                            text_size=(Window.width - 40, None), 
-                            size_hint_y=None,
-                            markup=True) 
-        story_label.bind(texture_size=story_label.setter('height')) 
-        
-        scroll_view.add_widget(story_label)
-        screen_layout.add_widget(scroll_view)
+        # STORY_ENGINE: The story for the checked-in goal comes from the content pack in
+        # STORY_DIR (story_engine.py) and is shown one paragraph per row of a StoryView, so
+        # only visible paragraphs are rasterised and their textures are reused across visits.
+        # Kivy markup can be used in the story files for richer formatting.
+        self.story_pack = StoryPack(STORY_DIR, pack=app_content())
+        self.title_label = Label(text='',
+                                 font_size='20sp',
+                                 bold=True,
+                                 size_hint=(1, 0.08))
+        screen_layout.add_widget(self.title_label)
+        self.story_view = StoryView(owner='story_screen', size_hint=(1, 0.62))
+        screen_layout.add_widget(self.story_view)
+        register_textures(self, 'text', self.story_view)
 
         # --- Buttons ---
         button_layout = BoxLayout(orientation='horizontal', size_hint=(1, 0.15), height='50dp', spacing='10dp')
 
-        read_aloud_button = Button(text='Read Aloud')
-        read_aloud_button.bind(on_press=self.read_aloud)
-        button_layout.add_widget(read_aloud_button)
+        # TEXT_TO_SPEECH: Read Aloud narrates the story sentence by sentence (narration.py).
+        # Audio is synthesised on a worker thread ahead of playback and cached on disk, so a
+        # story heard before starts at once; with the read_aloud setting on, the first
+        # sentences are prepared as soon as the story is shown. The button toggles
+        # play/pause and the arrows move by sentence.
+        self.narrator = create_narrator()
+        self.read_aloud_button = Button(text=NARRATION_LABELS['idle'], disabled=self.narrator is None)
+        self.read_aloud_button.bind(on_press=self.read_aloud)
+        button_layout.add_widget(self.read_aloud_button)
+        previous_sentence_button = Button(text='<<', size_hint_x=0.4, disabled=self.narrator is None)
+        previous_sentence_button.bind(on_press=lambda instance: self.skip_sentences(-1))
+        button_layout.add_widget(previous_sentence_button)
+        next_sentence_button = Button(text='>>', size_hint_x=0.4, disabled=self.narrator is None)
+        next_sentence_button.bind(on_press=lambda instance: self.skip_sentences(1))
+        button_layout.add_widget(next_sentence_button)
+        if self.narrator is not None:
+            self.narrator.on_change = self._on_narration
+            resources = app_resources()
+            if resources is not None:
+                resources.register('story.narration', self.narrator.pause, owner=self.name) # Silent while paused
 
         collect_reward_button = Button(text='Collect Reward')
         collect_reward_button.bind(on_press=self.collect_reward)
@@ -466,46 +806,114 @@ Keep exploring!
         
         self.add_widget(screen_layout)
 
+        # GAME_STATE: The story is only reloaded when the current goal changes.
+        state = game_state()
+        if state is not None:
+            state.subscribe('progress', self._on_progress, keys=('current_goal',))
+            self.goal_id = state.get('progress', 'current_goal') # Shows its story through on_goal_id
+        if not self.goal_id:
+            self._show_story() # The intro
+
+    def _on_progress(self, changes):
+        self.goal_id = changes['current_goal']
+
+    def on_pre_enter(self, *args):
+        # A check-in made this frame has not been delivered yet.
+        state = game_state()
+        if state is not None:
+            self.goal_id = state.get('progress', 'current_goal')
+
+    def on_goal_id(self, instance, goal_id):
+        self._show_story()
+
+    def _show_story(self):
+        try:
+            story = self.story_pack.story_for(self.goal_id)
+        except OSError as e:
+            log.error("Error loading story for '%s': %s", self.goal_id, e)
+            return
+        self.title_label.text = story.title
+        self.story_view.show_story(story)
+        if self.narrator is not None:
+            state = game_state()
+            self.narrator.load(story.text, prefetch=state is None or state.get('settings', 'read_aloud'))
+
     def read_aloud(self, instance):
-        print("StoryScreen: Read Aloud button pressed.")
-        # TEXT_TO_SPEECH: TTS Integration
-        # This function is the entry point for Text-to-Speech.
-        # Future logic should:
-        # 1. Check if a TTS engine is available (e.g., using `plyer.tts` or other libraries).
-        # 2. Pass `self.story_text_content` (or selected parts) to the TTS engine.
-        # 3. Provide controls for play/pause/stop if necessary.
-        # Example (using plyer):
-        # try:
-        #     from plyer import tts
-        #     tts.speak(self.story_text_content)
-        # except ImportError:
-        #     print("Plyer TTS not available on this platform.")
-        # except Exception as e:
-        #     print(f"TTS Error: {e}")
-        pass
+        log.debug("StoryScreen: Read Aloud button pressed.")
+        if self.narrator is not None:
+            self.narrator.toggle()
+
+    def skip_sentences(self, count):
+        self.narrator.seek(self.narrator.index + count)
+
+    def _on_narration(self, narrator):
+        self.read_aloud_button.text = NARRATION_LABELS[narrator.state]
+
+    def on_leave(self, *args):
+        if self.narrator is not None:
+            self.narrator.stop()
+        log_text_cache_stats('story_screen')
 
     def collect_reward(self, instance):
-        print("StoryScreen: Collect Reward button pressed. Navigating to RewardsScreen.")
+        log.debug("StoryScreen: Collect Reward button pressed. Navigating to RewardsScreen.")
         # REWARD_SYSTEM: Granting and Persisting Rewards
-        # This function is called after the player reads the story.
-        # Future logic should:
-        # 1. Determine the reward associated with the current story/goal.
-        # 2. Add the reward to the player's inventory (which needs a data structure, e.g., a list or dict).
-        # 3. Persist the updated inventory (e.g., save to a file using JSON/pickle, or a database).
-        #    This ensures rewards are not lost when the app closes.
-        # 4. Provide feedback to the player (e.g., "You collected [Reward Name]!").
-        # Example:
-        # current_goal_id = self.manager.get_screen('map_view').current_goal_id # Hypothetical
-        # reward_to_grant = game_data.get_reward_for_goal(current_goal_id)
-        # player_inventory.add_item(reward_to_grant)
-        # player_inventory.save() # Save the inventory state
+        # The reward for the goal the player checked in at comes from the goals file and is
+        # appended to the persistent inventory (at most once per goal).
+        # FUTURE_INTEGRATION: Show the collected reward with an animation rather than a log line.
+        state = game_state()
+        goal = shared_goal_store().get(self.goal_id)
+        reward = goal.data.get('reward') if goal is not None else None
+        if state is not None and reward and not state.inventory.has_reward_for(goal.id):
+            state.grant_reward(reward['id'], reward['name'], reward['image'], goal_id=goal.id)
+            log.info("StoryScreen: You collected %s!", reward['name'])
         self.manager.current = 'rewards_screen'
 
     def back_to_map(self, instance):
-        print("StoryScreen: Navigating back to Map View.")
+        log.debug("StoryScreen: Navigating back to Map View.")
         self.manager.current = 'map_view'
 
 # Rewards / Inventory Screen
+class RewardItemView(RecycleDataViewBehavior, BoxLayout):
+    # One cell of the rewards grid; RecycleView rebinds it to other items as the player scrolls.
+    item_name = StringProperty('')
+    image = StringProperty('')
+
+    def __init__(self, **kwargs):
+        super(RewardItemView, self).__init__(orientation='vertical', spacing='5dp', **kwargs)
+        self.item_image = AsyncImage(size_hint_y=None, 
+                                     height='80dp', 
+                                     allow_stretch=True, 
+                                     keep_ratio=True)
+        self.item_label = Label(font_size='14sp', 
+                                size_hint_y=None, 
+                                height='20dp',
+                                halign='center')
+        self.add_widget(self.item_image)
+        self.add_widget(self.item_label)
+
+    def refresh_view_attrs(self, rv, index, data):
+        rv.cells.add(self)
+        super(RewardItemView, self).refresh_view_attrs(rv, index, data)
+
+    def on_item_name(self, instance, value):
+        self.item_label.text = value
+
+    def on_image(self, instance, value):
+        self.show_image()
+
+    def show_image(self):
+        # Sprites share one resident texture (atlas region); anything else loads asynchronously.
+        shared = assets.texture(self.image) if self.image in assets.SPRITES else None
+        if shared is not None:
+            self.item_image.source = ''
+            self.item_image.texture = shared
+        else:
+            self.item_image.source = self.image
+
+    def release(self):
+        self.item_image.source = ''
+        self.item_image.texture = None
+
 class RewardsScreen(Screen):
     def __init__(self, **kwargs):
         super(RewardsScreen, self).__init__(**kwargs)
@@ -521,64 +929,33 @@ class RewardsScreen(Screen):
         screen_layout.add_widget(title_label)
 
         # --- Inventory Display ---
-        scroll_view = ScrollView(size_hint=(1, 1)) # Takes available vertical space
-        
-        # GridLayout for items
-        inventory_layout = GridLayout(cols=3, 
-                                      spacing='10dp', 
-                                      padding='10dp',
-                                      size_hint_y=None)
-        inventory_layout.bind(minimum_height=inventory_layout.setter('height')) 
-
         # REWARD_SYSTEM: Displaying Collected Rewards
-        # The `placeholder_items` list is static.
-        # Future logic should:
-        # 1. Load the player's actual collected items from the persisted inventory data.
-        # 2. Dynamically populate `inventory_layout` with widgets for each collected item.
-        #    - Each item might have properties like name, image, description, date_collected.
-        # Example:
-        # player_items = player_inventory.load_items() # Load from save file/database
-        # for item_data in player_items:
-        #    # Create item_box, item_image, item_label as below
-        #    inventory_layout.add_widget(item_box)
-        # If no items, display a message like "No treasures collected yet."
-
-        placeholder_items = [ # Placeholder data
-            {"name": "Ancient Badge", "image": "badge_placeholder.png"},
-            {"name": "Mystic Scroll", "image": "scroll_placeholder.png"},
-            {"name": "Time Crystal", "image": "artifact_placeholder.png"},
-            {"name": "Old Compass", "image": "badge_placeholder.png"}, # Reusing for demo
-            {"name": "Faded Map", "image": "scroll_placeholder.png"},  # Reusing for demo
-            {"name": "Lost Diary Page", "image": "artifact_placeholder.png"}, # Reusing for demo
-            {"name": "Roman Coin", "image": "badge_placeholder.png"},
-            {"name": "Victorian Locket", "image": "artifact_placeholder.png"},
-            {"name": "WWII Medal", "image": "badge_placeholder.png"},
-        ]
-
-        for item_data in placeholder_items:
-            item_box = BoxLayout(orientation='vertical', size_hint_y=None, height='120dp', spacing='5dp')
-            try:
-                item_image = Image(source=item_data["image"], 
-                                   size_hint_y=None, 
-                                   height='80dp', 
-                                   allow_stretch=True, 
-                                   keep_ratio=True)
-            except Exception as e:
-                print(f"Error loading reward image {item_data['image']}: {e}")
-                item_image = Label(text="Img\nError", size_hint_y=None, height='80dp')
-            
-            item_label = Label(text=item_data["name"], 
-                               font_size='14sp', 
-                               size_hint_y=None, 
-                               height='20dp',
-                               halign='center')
-            
-            item_box.add_widget(item_image)
-            item_box.add_widget(item_label)
-            inventory_layout.add_widget(item_box)
-        
-        scroll_view.add_widget(inventory_layout)
-        screen_layout.add_widget(scroll_view)
+        # Items come from the persistent inventory once, when the screen is built; after that
+        # only newly granted items arrive, through the game state's INVENTORY changes. The
+        # grid is a RecycleView: only the cells that fit on screen exist as widgets and they
+        # are rebound to other items while scrolling, so building and scrolling cost the same
+        # with 10 items or 100k. Thumbnails are only loaded (asynchronously) once a cell
+        # showing them becomes visible.
+        self.empty_label = Label(text='No treasures collected yet.',
+                                 font_size='16sp',
+                                 size_hint_y=None,
+                                 height='40dp')
+        screen_layout.add_widget(self.empty_label)
+
+        self.inventory_view = RecycleView(size_hint=(1, 1), viewclass=RewardItemView)
+        self.inventory_view.cells = WeakSet() # RewardItemViews, shown or kept for reuse
+        register_textures(self, 'thumbnails', self)
+        inventory_layout = RecycleGridLayout(cols=3, 
+                                             spacing='10dp', 
+                                             padding='10dp',
+                                             default_size=(None, dp(120)),
+                                             default_size_hint=(1, None),
+                                             size_hint_y=None)
+        inventory_layout.bind(minimum_height=inventory_layout.setter('height')) 
+        self.inventory_view.add_widget(inventory_layout)
+        screen_layout.add_widget(self.inventory_view)
+        self.shown_items = 0
+        self.last_seq = 0 # Inventory seq of the newest item shown
 
         # --- Navigation ---
         back_to_game_button = Button(text='Back to Map', 
@@ -589,37 +966,156 @@ class RewardsScreen(Screen):
         
         self.add_widget(screen_layout)
 
+        state = game_state()
+        if state is not None:
+            self.show_items(state.inventory.items)
+            state.subscribe(INVENTORY, self._on_inventory)
+
+    def _on_inventory(self, changes):
+        # Items granted in the frame the screen was built are in the inventory already: skip them.
+        added = [item for item in changes.get('added', ()) if item.seq > self.last_seq]
+        if not added:
+            return
+        self.last_seq = added[-1].seq
+        self.inventory_view.data.extend({'item_name': item.name, 'image': item.image} for item in added)
+        self.shown_items += len(added)
+        self._update_empty_label()
+
+    def show_items(self, items):
+        # The inventory only grows by appending, so usually only the new items are added.
+        data = self.inventory_view.data
+        if len(items) < self.shown_items: # Items were removed: start over
+            data = []
+        data.extend({'item_name': item.name, 'image': item.image} for item in items[len(data):])
+        self.inventory_view.data = data
+        self.shown_items = len(items)
+        self.last_seq = items[-1].seq if items else 0
+        self._update_empty_label()
+
+    def release(self):
+        # Thumbnails are dropped while the app is paused and loaded again when shown.
+        for cell in self.inventory_view.cells:
+            cell.release()
+
+    def restore(self):
+        for cell in self.inventory_view.cells:
+            cell.show_image()
+
+    def _update_empty_label(self):
+        if self.shown_items:
+            self.empty_label.text = ''
+            self.empty_label.height = 0
+        else:
+            self.empty_label.text = 'No treasures collected yet.'
+            self.empty_label.height = dp(40)
+
     def back_to_game(self, instance):
-        print("RewardsScreen: Navigating back to Map View.")
+        log.debug("RewardsScreen: Navigating back to Map View.")
         # Or could navigate to AR view, or a main game hub screen
         self.manager.current = 'map_view'
 
+# Screen registry used by TimeTravelerApp.build: (name, Screen subclass)
+SCREENS = [
+    ('start', StartScreen),
+    ('main', MainScreen),
+    ('settings', SettingsScreen),
+    ('how_to_play_screen', HowToPlayScreen),
+    ('ar_camera_view', ARCameraViewScreen),
+    ('map_view', MapViewScreen),
+    ('story_screen', StoryScreen),
+    ('rewards_screen', RewardsScreen),
+]
+
+# Screens usually opened next from a given screen, preloaded in the background.
+# LazyScreenManager also learns from the navigations the player actually makes.
+PRELOAD_HINTS = {
+    'start': ('ar_camera_view', 'how_to_play_screen'),
+    'ar_camera_view': ('map_view',),
+    'map_view': ('story_screen', 'ar_camera_view'),
+    'story_screen': ('rewards_screen', 'map_view'),
+    'rewards_screen': ('map_view',),
+}
+
 class TimeTravelerApp(App):
-    # FUTURE_INTEGRATION: Consider implementing app lifecycle events (on_start, on_pause, on_resume, on_stop)
-    # for tasks like:
-    # - Initializing game state or loading saved data (on_start).
-    # - Saving game state (on_pause, on_stop).
-    # - Releasing resources like camera or GPS (on_pause, on_stop).
-    # - Restoring camera or GPS (on_resume).
+    # APP_LIFECYCLE:
+    # - The inventory is persistent: every grant is committed to its write-ahead log, and the
+    #   log is compacted periodically and when the app is paused or stopped.
+    # - Changed game state sections are saved periodically and when paused or stopped.
+    # - Screens register their heavy resources (camera, GPS, tile caches, the textures their
+    #   widgets show) with self.resources. On pause they are released together with the shared
+    #   texture caches, and the resident memory before and after is logged; on resume only the
+    #   shown screen's resources are restored, the other screens' when they are next shown.
 
     def build(self):
-        # Create the screen manager with a default transition
-        sm = ScreenManager(transition=SlideTransition(direction="left"))
+        # Create the screen manager with a default transition.
+        # Screens are registered rather than built: each one is constructed the first time
+        # it is navigated to, and the likely next screens are preloaded during idle frames.
+        # SCREEN_TRANSITIONS: Screens slide as a snapshot of the outgoing screen rather than
+        # two live screen trees, and do not animate at all on low-end devices.
+        tracer.enabled = PROFILE
+        # CONTENT_PACKS: Goals, stories, dialogue and images come from the content pack when one
+        # is installed (content_pack.py); updates downloaded into UPDATE_DIR are applied first.
+        # FUTURE_INTEGRATION: Download the week's delta into UPDATE_DIR when online.
+        self.content = open_content_pack(self.user_data_dir)
+        if self.content is not None:
+            assets.shared_textures.resolve = content_file
+            async_image.resolve = content_file
+        sm = LazyScreenManager(transition=create_transition(TRANSITION_SETTING, direction='left'))
         
-        # Add all screens
-        # FUTURE_INTEGRATION: Game data (player inventory, story progress, settings) could be
-        # managed by a central class/object accessible by all screens, passed during init or via App instance.
-        sm.add_widget(StartScreen(name='start'))
-        sm.add_widget(MainScreen(name='main')) 
-        sm.add_widget(SettingsScreen(name='settings')) 
-        sm.add_widget(HowToPlayScreen(name='how_to_play_screen')) 
-        sm.add_widget(ARCameraViewScreen(name='ar_camera_view'))
-        sm.add_widget(MapViewScreen(name='map_view'))
-        sm.add_widget(StoryScreen(name='story_screen'))
-        sm.add_widget(RewardsScreen(name='rewards_screen'))
+        # GAME_STATE: Shared game data (progress, settings, inventory) lives in self.game_state,
+        # created before any screen so screens can subscribe to it while they are built.
+        self.inventory = InventoryStore(os.path.join(self.user_data_dir, INVENTORY_FILE))
+        Clock.schedule_interval(lambda dt: self.inventory.compact(), INVENTORY_COMPACT_INTERVAL)
+        self.game_state = GameState(os.path.join(self.user_data_dir, STATE_DIR),
+                                    scheduler=lambda flush: Clock.schedule_once(lambda dt: flush()),
+                                    inventory=self.inventory).load()
+        Clock.schedule_interval(lambda dt: self.game_state.save(), STATE_SAVE_INTERVAL)
+        self.resources = ResourceManager()
+        self.resources.register('textures', release_cached_textures)
+        if hasattr(sm.transition, 'release'):
+            self.resources.register('transition.snapshot', sm.transition.release)
+        sm.bind(current=lambda manager, name: self.resources.show(name))
+
+        # Register all screens
+        for name, screen_class in SCREENS:
+            sm.register(name, screen_class, preload=PRELOAD_HINTS.get(name, ()))
         
         sm.current = 'start' 
         return sm
 
+    def on_start(self):
+        if PROFILE:
+            frame_profiler.install(Clock, EventLoop, Window)
+            layout_counter.install(Layout, Clock)
+            Window.add_widget(ProfilerOverlay()) # Above every screen
+        rss = memory_rss()
+        if rss is not None:
+            log.info("Started: resident memory %.1f MB.", rss / 1048576)
+
+    def on_pause(self):
+        # The OS may kill the app while it is paused: save what changed, compact the inventory
+        # to keep the next startup fast, and give back as much memory as possible.
+        self.game_state.flush()
+        self.game_state.save()
+        self.inventory.compact()
+        self.resources.pause()
+        return True # Allow pausing instead of stopping the app
+
+    def on_resume(self):
+        self.resources.resume(self.root.current)
+
+    def on_stop(self):
+        self.resources.release() # Closes the camera and GPS
+        self.game_state.save()
+        self.inventory.close()
+        for filename, count in assets.decode_report():
+            log.warning("Decoded %d times: %s", count, filename)
+        if PROFILE:
+            path = os.path.join(self.user_data_dir, PROFILE_TRACE_FILE)
+            try:
+                log.info("Wrote %d trace events to %s", tracer.export(path), path)
+            except OSError as e:
+                log.error("Error writing trace %s: %s", path, e)
+
 if __name__ == '__main__':
     TimeTravelerApp().run()
@@ -0,0 +1,134 @@
+from kivy.clock import Clock
+from kivy.graphics import Color, InstructionGroup, PopMatrix, PushMatrix, Rectangle, Translate
+from kivy.metrics import dp
+from kivy.uix.image import Image
+from kivy.uix.widget import Widget
+
+import assets
+
+# GPS_TRACKING: Viewport-Culled Goal Markers
+# Only goals inside the visible map bounds get a marker widget, and those widgets come
+# from a pool that is reused as the viewport moves, so the widget count depends on what
+# is on screen rather than on the size of the event. Goals just outside the viewport
+# (within `margin`) and any visible goals beyond `max_widgets` are drawn as plain
+# Rectangles sharing the marker texture inside a single InstructionGroup.
+# Markers are positioned directly in window coordinates; the layer is a plain Widget,
+# so moving them never triggers a layout pass.
+
+GOAL_MARKER_SOURCE = 'goal_marker.png'
+PLAYER_MARKER_SOURCE = 'player_marker.png'
+
+
+class GoalMarkerLayer(Widget):
+    def __init__(self, goal_store, bounds, marker_source=GOAL_MARKER_SOURCE, marker_size=None,
+                 margin=0.25, max_widgets=64, **kwargs):
+        super(GoalMarkerLayer, self).__init__(**kwargs)
+        self.goal_store = goal_store
+        self.bounds = bounds # MapBounds currently shown by the map under this layer
+        self.marker_source = marker_source
+        self.marker_size = marker_size or (dp(25), dp(25))
+        self.margin = margin
+        self.max_widgets = max_widgets
+        self.markers = {} # goal_id -> marker widget currently on screen
+        self._pool = [] # Detached marker widgets ready for reuse
+        self._batched = [] # Goals drawn in the batch group
+        self._batch_group = InstructionGroup()
+        self.canvas.after.add(self._batch_group)
+        self._refresh_trigger = Clock.create_trigger(self.refresh)
+        self.bind(pos=self._refresh_trigger, size=self._refresh_trigger)
+
+    def set_viewport(self, bounds):
+        self.bounds = bounds
+        self._refresh_trigger()
+
+    def marker_for(self, goal_id):
+        return self.markers.get(goal_id)
+
+    def refresh(self, *args):
+        if self.bounds is None:
+            return
+        visible = self.goal_store.in_viewport(self.bounds)
+        with_widgets = visible[:self.max_widgets]
+        wanted = {goal.id: goal for goal in with_widgets}
+
+        for goal_id in list(self.markers):
+            if goal_id not in wanted:
+                self._release(self.markers.pop(goal_id))
+        for goal in with_widgets:
+            marker = self.markers.get(goal.id)
+            if marker is None:
+                marker = self.markers[goal.id] = self._acquire(goal)
+            marker.center = self.to_layer(goal.lat, goal.lon)
+
+        shown = set(wanted)
+        margin_goals = self.goal_store.in_viewport(self.bounds.expanded(self.margin))
+        self._batched = [goal for goal in margin_goals if goal.id not in shown]
+        self._redraw_batch()
+
+    def release(self):
+        # Drop the marker widgets and the batch (e.g. while the app is paused); restore() redraws them.
+        for goal_id in list(self.markers):
+            self._release(self.markers.pop(goal_id))
+        self._pool = []
+        self._batched = []
+        self._batch_group.clear()
+
+    def restore(self):
+        self.refresh()
+
+    def to_layer(self, lat, lon):
+        fx, fy = self.bounds.to_fraction(lat, lon)
+        return self.x + fx * self.width, self.y + fy * self.height
+
+    def _acquire(self, goal):
+        if self._pool:
+            marker = self._pool.pop()
+        else:
+            marker = assets.image(self.marker_source, size_hint=(None, None), size=self.marker_size)
+        marker.goal_id = goal.id
+        self.add_widget(marker)
+        return marker
+
+    def _release(self, marker):
+        self.remove_widget(marker)
+        marker.goal_id = None
+        self._pool.append(marker)
+
+    def _marker_texture(self):
+        # Same shared texture as the marker widgets; None draws plain squares instead.
+        return assets.texture(self.marker_source)
+
+    def _redraw_batch(self):
+        group = self._batch_group
+        group.clear()
+        if not self._batched:
+            return
+        w, h = self.marker_size
+        group.add(Color(1, 1, 1, 1))
+        texture = self._marker_texture()
+        for goal in self._batched:
+            x, y = self.to_layer(goal.lat, goal.lon)
+            group.add(Rectangle(texture=texture, pos=(x - w / 2, y - h / 2), size=(w, h)))
+
+
+class PlayerMarker(Image):
+    # GPS_TRACKING: Player marker moved through a canvas Translate.
+    # The widget itself stays at (0, 0) with a fixed size, so a position update only
+    # changes one instruction and never asks the parent layout for a relayout.
+    def __init__(self, source=PLAYER_MARKER_SOURCE, marker_size=None, **kwargs):
+        size = marker_size or (dp(30), dp(30))
+        shared = assets.texture(source)
+        if shared is not None:
+            kwargs['texture'] = shared
+        else:
+            kwargs['source'] = source
+        super(PlayerMarker, self).__init__(size_hint=(None, None), size=size, pos=(0, 0), **kwargs)
+        with self.canvas.before:
+            PushMatrix()
+            self._translate = Translate()
+        with self.canvas.after:
+            PopMatrix()
+
+    def move_to(self, x, y):
+        # Centre the marker on window coordinates (x, y).
+        self._translate.xy = (x - self.x - self.width / 2, y - self.y - self.height / 2)
@@ -0,0 +1,333 @@
+import hashlib
+import os
+import re
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import pyttsx3
+except ImportError:
+    pyttsx3 = None
+
+from profiling import log, span
+
+# TEXT_TO_SPEECH: Background Narration
+# Speaking a whole story with one blocking tts.speak() call freezes the UI and synthesises
+# the same text again on every visit. A Narrator instead:
+# - splits the text into sentences (markup removed) and synthesises them one at a time on
+#   its own worker thread through a pluggable engine, always the first sentence from the
+#   current position on that has no audio yet, so the next sentences are ready before
+#   they are needed and a seek is served first;
+# - keeps the audio in a SpeechCache on disk, named by a hash of engine and text, so a
+#   story heard before starts speaking at once (and a changed sentence is synthesised anew);
+# - plays sentence after sentence through a player object (play/pause/resume/stop; see
+#   sound_player.py) and supports pause, resume and seeking by sentence.
+# Worker results are handed to the main thread through a `scheduler` callable, as in
+# game_state.GameState; everything else runs on the main thread.
+# Engines: Pyttsx3Engine (offline: eSpeak, SAPI5 or NSSpeechSynthesizer; optional) and
+# FakeEngine (silent audio of a plausible length, for benchmarks and machines without TTS).
+# FUTURE_INTEGRATION: An Android engine around TextToSpeech.synthesizeToFile via pyjnius.
+
+SPEECH_DIR = 'speech' # Audio cache, in App.user_data_dir
+PREFETCH_SENTENCES = 2 # Synthesised as soon as a text is loaded, before play() is pressed
+CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+_MARKUP = re.compile(r'\[/?[a-z_]+(=[^\]]*)?\]') # Kivy markup tags
+_SENTENCE_END = re.compile(r'(?<=[.!?…])\s+|(?<=[.!?…]["\'”’)])\s+')
+_FAILED = '' # Path of a sentence that could not be synthesised: skipped when playing
+
+
+def split_sentences(text):
+    sentences = []
+    for paragraph in text.split('\n\n'):
+        plain = ' '.join(_MARKUP.sub('', paragraph).split())
+        sentences.extend(sentence for sentence in _SENTENCE_END.split(plain) if sentence)
+    return sentences
+
+
+def audio_duration(path):
+    # Length of a WAV file in seconds (None for other formats).
+    try:
+        with wave.open(path, 'rb') as f:
+            return f.getnframes() / float(f.getframerate())
+    except (OSError, EOFError, wave.Error):
+        return None
+
+
+# --- Cache ---
+class SpeechCache(object):
+    def __init__(self, directory, max_bytes=CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, engine_id, text):
+        return hashlib.sha1(f'{engine_id}\n{text}'.encode('utf-8')).hexdigest()
+
+    def path(self, key, ext):
+        return os.path.join(self.directory, f'{key}.{ext}')
+
+    def get(self, key, ext):
+        path = self.path(key, ext)
+        return path if os.path.exists(path) else None
+
+    def trim(self):
+        # Delete the least recently written files until the cache fits max_bytes.
+        try:
+            entries = [entry for entry in os.scandir(self.directory) if entry.is_file()]
+        except OSError:
+            return 0
+        entries.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+        total = 0
+        removed = 0
+        for entry in entries:
+            total += entry.stat().st_size
+            if total > self.max_bytes:
+                try:
+                    os.remove(entry.path)
+                    removed += 1
+                except OSError:
+                    pass
+        return removed
+
+
+# --- Engines ---
+class FakeEngine(object):
+    # Silent WAV files as long as the text would take to read, written after `delay` seconds
+    # per sentence (standing in for synthesis time).
+    ext = 'wav'
+
+    def __init__(self, seconds_per_char=0.06, delay=0.0, rate=8000):
+        self.seconds_per_char = seconds_per_char
+        self.delay = delay
+        self.rate = rate
+        self.id = f'fake-{seconds_per_char}-{rate}'
+
+    def synthesize(self, text, path):
+        if self.delay:
+            time.sleep(self.delay)
+        with wave.open(path, 'wb') as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(self.rate)
+            f.writeframes(bytes(2 * int(len(text) * self.seconds_per_char * self.rate)))
+
+
+class Pyttsx3Engine(object):
+    # pyttsx3 drivers are not thread-safe, so the engine is created on first use, i.e. on
+    # the narrator's worker thread, and only used there.
+    ext = 'wav'
+
+    def __init__(self, voice=None, rate=None):
+        self.voice = voice
+        self.rate = rate
+        self.id = f'pyttsx3-{voice or "default"}-{rate or "default"}'
+        self._engine = None
+
+    def synthesize(self, text, path):
+        if self._engine is None:
+            self._engine = pyttsx3.init()
+            if self.voice:
+                self._engine.setProperty('voice', self.voice)
+            if self.rate:
+                self._engine.setProperty('rate', self.rate)
+        self._engine.save_to_file(text, path)
+        self._engine.runAndWait()
+
+
+def create_engine(name=''):
+    # 'fake', 'pyttsx3' or '' (pyttsx3 if installed); None if no engine is available.
+    if name == 'fake':
+        return FakeEngine()
+    if name not in ('', 'pyttsx3'):
+        log.warning("Unknown speech engine '%s'.", name)
+        return None
+    if pyttsx3 is None:
+        if name:
+            log.warning("Speech engine pyttsx3 is not installed.")
+        return None
+    return Pyttsx3Engine()
+
+
+# --- Narrator ---
+class Narrator(object):
+    # state: 'idle', 'waiting' (for the current sentence's audio), 'playing' or 'paused'.
+
+    def __init__(self, engine, cache, player, scheduler=None, prefetch=PREFETCH_SENTENCES):
+        self.engine = engine
+        self.cache = cache
+        self.player = player
+        self.scheduler = scheduler # callable(fn): run fn on the main thread; None: call it directly
+        self.prefetch = prefetch
+        self.on_change = None # callback(narrator) when the state or current sentence changes
+        self.sentences = []
+        self.paths = [] # Audio file per sentence; None until synthesised, _FAILED if that failed
+        self.index = 0
+        self.state = 'idle'
+        self.synthesized = 0
+        self.cache_hits = 0
+        self.first_audio_latency = None # Seconds from the last play() to audio starting
+        self._keys = []
+        self._limit = 0 # Sentences before this index may be synthesised
+        self._generation = 0 # Bumped by load(); results for an older text are dropped
+        self._in_flight = None
+        self._paused_in_sentence = False
+        self._play_requested = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='tts')
+        self._executor.submit(cache.trim)
+
+    # --- Text ---
+    def load(self, text, prefetch=True):
+        # Speak `text` from now on; its first sentences are synthesised right away if `prefetch`.
+        self.stop()
+        self._generation += 1
+        self._in_flight = None
+        self.sentences = split_sentences(text)
+        self._keys = [self.cache.key(self.engine.id, sentence) for sentence in self.sentences]
+        self.paths = [self.cache.get(key, self.engine.ext) for key in self._keys]
+        self.cache_hits += sum(1 for path in self.paths if path is not None)
+        self.index = 0
+        self._limit = self.prefetch if prefetch else 0
+        self._pump()
+        self._changed()
+
+    def _pump(self):
+        # Keep the worker busy with the first sentence from the current one on without audio.
+        if self._in_flight is not None:
+            return
+        for i in range(self.index, min(self._limit, len(self.sentences))):
+            if self.paths[i] is None:
+                self._in_flight = i
+                self._executor.submit(self._synthesize, self._generation, i, self.sentences[i], self._keys[i])
+                return
+
+    def _synthesize(self, generation, index, text, key):
+        # Worker thread.
+        if generation != self._generation:
+            return
+        path = self.cache.path(key, self.engine.ext)
+        temporary = f'{path[:-len(self.engine.ext) - 1]}.tmp.{self.engine.ext}' # Engines go by the extension
+        try:
+            with span('synthesize', 'tts', chars=len(text)):
+                self.engine.synthesize(text, temporary)
+            os.replace(temporary, path)
+        except Exception as e:
+            log.error("Error synthesising speech: %s", e)
+            path = _FAILED
+        if self.scheduler is not None:
+            self.scheduler(lambda: self._synthesized(generation, index, path))
+        else:
+            self._synthesized(generation, index, path)
+
+    def _synthesized(self, generation, index, path):
+        if generation != self._generation:
+            return
+        self._in_flight = None
+        self.paths[index] = path
+        self.synthesized += 1
+        self._pump()
+        if self.state == 'waiting' and index == self.index:
+            self._play_current()
+
+    # --- Playback ---
+    def play(self, index=None):
+        if not self.sentences:
+            return
+        if index is not None:
+            self.player.stop()
+            self.index = max(0, min(len(self.sentences) - 1, index))
+        self._play_requested = time.perf_counter()
+        self._limit = len(self.sentences)
+        self._pump()
+        self._play_current()
+
+    def _play_current(self):
+        while self.index < len(self.sentences) and self.paths[self.index] == _FAILED:
+            self.index += 1
+        if self.index >= len(self.sentences):
+            self.index = 0
+            self.state = 'idle'
+        elif self.paths[self.index] is None:
+            self.state = 'waiting'
+            self._pump()
+        else:
+            self.state = 'playing'
+            self._paused_in_sentence = False
+            if self._play_requested is not None:
+                self.first_audio_latency = time.perf_counter() - self._play_requested
+                self._play_requested = None
+            self.player.play(self.paths[self.index], self._sentence_finished)
+        self._changed()
+
+    def _sentence_finished(self):
+        # Called by the player (main thread) when a sentence has played to its end.
+        if self.state != 'playing':
+            return
+        self.index += 1
+        self._play_current()
+
+    def pause(self):
+        if self.state == 'playing':
+            self.player.pause()
+            self._paused_in_sentence = True
+        elif self.state != 'waiting':
+            return
+        self.state = 'paused'
+        self._changed()
+
+    def resume(self):
+        if self.state != 'paused':
+            return
+        if self._paused_in_sentence:
+            self._paused_in_sentence = False
+            self.state = 'playing'
+            self.player.resume()
+            self._changed()
+        else:
+            self._play_current()
+
+    def toggle(self):
+        if self.state in ('playing', 'waiting'):
+            self.pause()
+        elif self.state == 'paused':
+            self.resume()
+        else:
+            self.play()
+
+    def seek(self, index):
+        # Continue from sentence `index` (playing on if playing, else staying paused/idle there).
+        if not self.sentences:
+            return
+        index = max(0, min(len(self.sentences) - 1, index))
+        if self.state in ('playing', 'waiting'):
+            self.play(index)
+            return
+        self.player.stop()
+        self._paused_in_sentence = False
+        self.index = index
+        self._limit = max(self._limit, index + self.prefetch)
+        self._pump()
+        self._changed()
+
+    def stop(self):
+        self.player.stop()
+        self.state = 'idle'
+        self.index = 0
+        self._paused_in_sentence = False
+        self._play_requested = None
+        self._changed()
+
+    def shutdown(self):
+        self.stop()
+        self._generation += 1
+        self._executor.shutdown(wait=False)
+
+    def _changed(self):
+        if self.on_change is not None:
+            self.on_change(self)
+
+    def stats(self):
+        ready = sum(1 for path in self.paths if path)
+        return {'sentences': len(self.sentences), 'ready': ready, 'synthesized': self.synthesized,
+                'cache_hits': self.cache_hits, 'first_audio_latency': self.first_audio_latency}
@@ -0,0 +1,307 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+# PROFILING: Levelled Logging, Spans and Frame Timing
+# - `log` replaces print() in the app. log.info("Checked in at %s", goal_id) only formats
+#   and writes the message if its level is enabled: methods of disabled levels are swapped
+#   for a no-op, so a disabled call costs one function call. Console output is slow on
+#   phones, so the app logs warnings and errors only there (TIME_TRAVELER_LOG overrides it:
+#   debug, info, warning, error or off).
+# - Spans time named pieces of work (screen builds, image decodes, check-ins) from any
+#   thread: `with span('check_in'):` or the @traced(...) decorator. While the tracer is
+#   disabled span() returns a shared do-nothing context manager. Recorded spans are exported
+#   as Chrome trace-event JSON (open in chrome://tracing or https://ui.perfetto.dev).
+# - FrameProfiler times every frame of the Kivy event loop split into phases: input,
+#   clock (scheduled callbacks), layout (callbacks triggered before drawing, which is where
+#   Kivy runs layouts), canvas (drawing) and flip, plus the idle wait for the next frame.
+#   It wraps those methods on the objects passed to install(), so this module has no Kivy
+#   dependency; profiling_overlay.py shows the numbers on screen.
+# - LayoutCounter counts layout passes (do_layout calls) per frame and per layout class,
+#   so tools and benchmarks can check that a screen does not relayout while it only
+#   animates or updates text.
+# The app turns spans, frame timing and the overlay on with TIME_TRAVELER_PROFILE=1.
+
+LEVELS = {'debug': 10, 'info': 20, 'warning': 30, 'error': 40, 'off': 100}
+TRACE_EVENTS = 200000 # Most recent trace events kept (older ones are dropped)
+FRAME_HISTORY = 300 # Frames kept by FrameProfiler for its summary
+PHASES = ('input', 'clock', 'layout', 'canvas', 'flip', 'idle')
+
+
+def _noop(*args):
+    pass
+
+
+# --- Logging ---
+class Log(object):
+    # debug/info/warning/error(message, *args): `message % args` is only built for enabled levels.
+
+    def __init__(self, level='info', stream=None):
+        self.stream = stream # None: sys.stdout at the time of writing
+        self.set_level(level)
+
+    def set_level(self, level):
+        if level not in LEVELS:
+            level = 'info'
+        self.level = level
+        for name in ('debug', 'info', 'warning', 'error'):
+            setattr(self, name, self._emitter(name) if LEVELS[name] >= LEVELS[level] else _noop)
+
+    def enabled_for(self, level):
+        # For messages whose arguments are expensive to compute.
+        return LEVELS[level] >= LEVELS[self.level]
+
+    def _emitter(self, level):
+        prefix = '' if level == 'info' else f'[{level.upper()}] '
+
+        def emit(message, *args):
+            if args:
+                message = message % args
+            print(prefix + message, file=self.stream or sys.stdout)
+        return emit
+
+
+log = Log(os.environ.get('TIME_TRAVELER_LOG') or 'info')
+
+
+# --- Spans ---
+class _NoSpan(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+class _Span(object):
+    def __init__(self, tracer, name, category, args):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.tracer.complete(self.name, self.category, self.start, time.perf_counter() - self.start, self.args)
+        return False
+
+
+class Tracer(object):
+    # Collects complete ("X") trace events; thread-safe (deque appends are atomic).
+
+    def __init__(self, max_events=TRACE_EVENTS):
+        self.enabled = False
+        self.events = deque(maxlen=max_events)
+        self.origin = time.perf_counter()
+        self._threads = {} # thread id -> thread name, for the trace's metadata events
+
+    def span(self, name, category='app', **args):
+        if not self.enabled:
+            return _NO_SPAN
+        return _Span(self, name, category, args)
+
+    def complete(self, name, category, start, duration, args=None):
+        # An event that began at perf_counter() time `start` and lasted `duration` seconds.
+        thread = threading.current_thread()
+        self._threads[thread.ident] = thread.name
+        event = {'name': name, 'cat': category, 'ph': 'X', 'pid': os.getpid(), 'tid': thread.ident,
+                 'ts': (start - self.origin) * 1e6, 'dur': duration * 1e6}
+        if args:
+            event['args'] = args
+        self.events.append(event)
+
+    def clear(self):
+        self.events.clear()
+
+    def chrome_trace(self):
+        pid = os.getpid()
+        metadata = [{'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': name}}
+                    for tid, name in list(self._threads.items())]
+        return {'traceEvents': metadata + list(self.events), 'displayTimeUnit': 'ms'}
+
+    def export(self, path):
+        # Write the recorded events as Chrome trace-event JSON; returns the number of events.
+        trace = self.chrome_trace()
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(trace, f)
+        os.replace(path + '.tmp', path)
+        return len(trace['traceEvents'])
+
+
+tracer = Tracer() # Process-wide instance used by every module
+
+
+def span(name, category='app', **args):
+    return tracer.span(name, category, **args)
+
+
+def traced(name, category='app'):
+    # Decorator: the wrapped function is recorded as a span while the tracer is enabled.
+    def decorate(fn):
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return fn(*args, **kwargs)
+            with _Span(tracer, name, category, None):
+                return fn(*args, **kwargs)
+        wrapper.__name__ = fn.__name__
+        wrapper.__wrapped__ = fn
+        return wrapper
+    return decorate
+
+
+# --- Frame timing ---
+class FrameProfiler(object):
+    def __init__(self, tracer=tracer, history=FRAME_HISTORY):
+        self.tracer = tracer
+        self.frames = deque(maxlen=history) # (frame seconds, {phase: seconds})
+        self.frame_count = 0
+        self._frame_start = None
+        self._phases = {}
+        self._installed = [] # (object, method name)
+
+    def install(self, clock, event_loop, window):
+        # Wrap the per-frame methods of the Kivy Clock, EventLoop and Window instances.
+        # Clock.tick starts a frame; Clock.idle is the wait for it inside tick().
+        self._wrap(clock, 'tick', 'clock')
+        self._wrap(clock, 'idle', 'idle')
+        self._wrap(event_loop, 'dispatch_input', 'input')
+        self._wrap(clock, 'tick_draw', 'layout')
+        self._wrap(window, 'on_draw', 'canvas')
+        self._wrap(window, 'on_flip', 'flip')
+
+    def uninstall(self):
+        for obj, name in self._installed:
+            try:
+                delattr(obj, name) # The class method shows through again
+            except AttributeError:
+                pass
+        self._installed = []
+
+    def _wrap(self, obj, name, phase):
+        original = getattr(obj, name)
+        profiler = self
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            if phase == 'clock':
+                profiler._next_frame(start)
+            try:
+                return original(*args, **kwargs)
+            finally:
+                profiler._record(phase, start, time.perf_counter())
+        setattr(obj, name, timed)
+        self._installed.append((obj, name))
+
+    def _record(self, phase, start, end):
+        self._phases[phase] = self._phases.get(phase, 0.0) + end - start
+        if self.tracer.enabled and phase != 'idle':
+            self.tracer.complete(phase, 'frame', start, end - start)
+
+    def _next_frame(self, now):
+        if self._frame_start is not None:
+            phases = self._phases
+            # Clock.tick includes the idle wait; count it only once.
+            phases['clock'] = phases.get('clock', 0.0) - phases.get('idle', 0.0)
+            duration = now - self._frame_start
+            self.frames.append((duration, phases))
+            self.frame_count += 1
+            if self.tracer.enabled:
+                self.tracer.complete('frame', 'frame', self._frame_start, duration)
+        self._frame_start = now
+        self._phases = {}
+
+    def summary(self):
+        # Over the frames kept: fps, mean/worst frame time and mean time per phase (ms).
+        if not self.frames:
+            return {'fps': 0.0, 'frame_ms': 0.0, 'worst_ms': 0.0, 'phases_ms': {}}
+        total = sum(duration for duration, _ in self.frames)
+        phases_ms = {phase: sum(phases.get(phase, 0.0) for _, phases in self.frames) / len(self.frames) * 1000
+                     for phase in PHASES}
+        return {'fps': len(self.frames) / total if total else 0.0,
+                'frame_ms': total / len(self.frames) * 1000,
+                'worst_ms': max(duration for duration, _ in self.frames) * 1000,
+                'phases_ms': phases_ms}
+
+
+frame_profiler = FrameProfiler()
+
+
+class LayoutCounter(object):
+    def __init__(self, history=FRAME_HISTORY):
+        self.frames = deque(maxlen=history) # Layout passes of each completed frame
+        self.current = 0 # Passes in the frame under way
+        self.total = 0
+        self.by_class = Counter() # Layout class name -> passes
+        self._inside = set() # Ids of layouts in do_layout, so a super() call counts once
+        self._patched = [] # (class, original do_layout)
+        self._event = None
+
+    def install(self, layout_class, clock=None):
+        # Wrap do_layout of `layout_class` (Kivy's Layout) and of every subclass defining its
+        # own; imported subclasses only, so install once the app's modules are loaded. With a
+        # `clock`, frames end on its ticks; otherwise call next_frame() yourself.
+        classes = [layout_class]
+        for cls in classes:
+            classes.extend(sub for sub in cls.__subclasses__() if sub not in classes)
+        for cls in classes:
+            original = cls.__dict__.get('do_layout')
+            if original is not None:
+                cls.do_layout = self._wrap(original)
+                self._patched.append((cls, original))
+        if clock is not None:
+            self._event = clock.schedule_interval(lambda dt: self.next_frame(), 0)
+
+    def uninstall(self):
+        for cls, original in self._patched:
+            cls.do_layout = original
+        self._patched = []
+        if self._event is not None:
+            self._event.cancel()
+            self._event = None
+
+    def _wrap(self, original):
+        counter = self
+
+        def counted(layout, *args):
+            key = id(layout)
+            if key in counter._inside:
+                return original(layout, *args)
+            counter._inside.add(key)
+            counter.current += 1
+            counter.total += 1
+            counter.by_class[type(layout).__name__] += 1
+            try:
+                return original(layout, *args)
+            finally:
+                counter._inside.discard(key)
+        return counted
+
+    def next_frame(self):
+        self.frames.append(self.current)
+        self.current = 0
+
+    def reset(self):
+        self.frames.clear()
+        self.current = 0
+        self.total = 0
+        self.by_class.clear()
+
+    def summary(self):
+        # Over the frames kept: mean and most passes per frame, and the busiest layout classes.
+        frames = self.frames
+        return {'per_frame': sum(frames) / len(frames) if frames else 0.0,
+                'max_per_frame': max(frames) if frames else 0,
+                'total': self.total, 'by_class': dict(self.by_class.most_common(5))}
+
+
+layout_counter = LayoutCounter()
@@ -0,0 +1,47 @@
+from kivy.clock import Clock
+from kivy.graphics import Color, Rectangle
+from kivy.uix.label import Label
+
+from profiling import PHASES, frame_profiler, layout_counter
+
+# PROFILING: On-Screen Frame Overlay
+# A small label in the top left corner of the window showing FPS, the mean and worst frame
+# time of the last FRAME_HISTORY frames and where the time goes per phase (see
+# profiling.FrameProfiler), and the layout passes per frame. It is refreshed a few times per
+# second, not every frame, so it hardly shows up in the numbers it displays. Add it to the
+# Window, above every screen.
+
+OVERLAY_REFRESH = 0.5 # Seconds between updates
+
+
+class ProfilerOverlay(Label):
+    def __init__(self, profiler=frame_profiler, layouts=layout_counter, **kwargs):
+        kwargs.setdefault('size_hint', (None, None))
+        kwargs.setdefault('size', ('320dp', '54dp'))
+        kwargs.setdefault('pos_hint', {'x': 0, 'top': 1})
+        kwargs.setdefault('font_size', '11sp')
+        kwargs.setdefault('halign', 'left')
+        kwargs.setdefault('valign', 'top')
+        super(ProfilerOverlay, self).__init__(**kwargs)
+        self.profiler = profiler
+        self.layouts = layouts
+        with self.canvas.before:
+            Color(0, 0, 0, 0.6)
+            self._background = Rectangle()
+        self.bind(pos=self._update_background, size=self._update_background)
+        self._event = Clock.schedule_interval(self.refresh, OVERLAY_REFRESH)
+
+    def _update_background(self, *args):
+        self._background.pos = self.pos
+        self._background.size = self.size
+        self.text_size = (self.width - 8, self.height - 4)
+
+    def refresh(self, *args):
+        summary = self.profiler.summary()
+        phases = '  '.join(f"{phase} {summary['phases_ms'].get(phase, 0.0):.1f}" for phase in PHASES)
+        layouts = self.layouts.summary()
+        self.text = (f"{summary['fps']:.0f} fps  frame {summary['frame_ms']:.1f} ms  "
+                     f"worst {summary['worst_ms']:.1f} ms  layouts {layouts['per_frame']:.1f}/frame\n{phases}")
+
+    def stop(self):
+        self._event.cancel()
@@ -0,0 +1,121 @@
+import gc
+import os
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+from profiling import log
+
+# APP_LIFECYCLE: Releasing Heavy Resources While Paused
+# One ResourceManager lives on the App (App.resources). Screens and modules register what
+# is expensive to keep while the app is in the background (camera feed, GPS, decoded
+# textures, tile caches) as a release/restore pair:
+# - pause() releases everything registered, collects garbage and reports the resident
+#   memory before and after, so the OS is less likely to kill a paused app.
+# - Restoring is lazy. resume() restores only the resources of the screen being shown
+#   (and marks global caches usable again: they refill themselves on use); a screen's
+#   resources are restored when show() is called for it, i.e. when it is next navigated to.
+# - Resources registered with an owner belong to that screen; owner None means global.
+# Release and restore callbacks must be safe to call when there is nothing to do (e.g.
+# stopping a camera that is not running). Main thread only. Plain Python, no Kivy dependency.
+
+
+def memory_rss():
+    # Resident memory of this process in bytes, or None where it cannot be read.
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    return None
+
+
+def _megabytes(value):
+    return 'unknown' if value is None else f'{value / 1048576:.1f} MB'
+
+
+class _Resource(object):
+    def __init__(self, name, release, restore, owner):
+        self.name = name
+        self.release = release
+        self.restore = restore # None: nothing to do, the resource reloads itself on use
+        self.owner = owner
+        self.released = False
+
+
+class ResourceManager(object):
+    def __init__(self):
+        self._resources = {} # name -> _Resource, in registration order
+        self.paused = False
+        self.releases = 0
+        self.restores = 0
+        self.last_report = None # {'released': [names], 'rss_before': bytes, 'rss_after': bytes}
+
+    def register(self, name, release, restore=None, owner=None):
+        self._resources[name] = _Resource(name, release, restore, owner)
+
+    def unregister(self, name):
+        self._resources.pop(name, None)
+
+    def release(self):
+        # Release every resource not released yet; returns their names.
+        released = []
+        for resource in list(self._resources.values()):
+            if resource.released:
+                continue
+            try:
+                resource.release()
+            except Exception as e:
+                log.error("Error releasing resource '%s': %s", resource.name, e)
+                continue
+            resource.released = True
+            released.append(resource.name)
+        self.releases += len(released)
+        return released
+
+    def pause(self):
+        rss_before = memory_rss()
+        released = self.release()
+        gc.collect()
+        rss_after = memory_rss()
+        self.paused = True
+        self.last_report = {'released': released, 'rss_before': rss_before, 'rss_after': rss_after}
+        # Warning level: phones log warnings and errors only, and that is where this matters.
+        log.warning("Paused: released %d resources, resident memory %s -> %s.",
+                 len(released), _megabytes(rss_before), _megabytes(rss_after))
+        return self.last_report
+
+    def resume(self, current=None):
+        # Restore the global resources and those of `current` (the screen shown after resuming).
+        self.paused = False
+        self.show(None)
+        if current is not None:
+            self.show(current)
+
+    def show(self, owner):
+        # Restore the released resources of `owner` (a screen that is being shown).
+        if self.paused:
+            return []
+        restored = []
+        for resource in list(self._resources.values()):
+            if not resource.released or resource.owner != owner:
+                continue
+            resource.released = False
+            restored.append(resource.name)
+            if resource.restore is None:
+                continue
+            try:
+                resource.restore()
+            except Exception as e:
+                log.error("Error restoring resource '%s': %s", resource.name, e)
+        self.restores += len(restored)
+        return restored
+
+    def stats(self):
+        released = [resource.name for resource in self._resources.values() if resource.released]
+        return {'resources': len(self._resources), 'released': released,
+                'releases': self.releases, 'restores': self.restores}
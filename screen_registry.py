@@ -0,0 +1,101 @@
+from collections import defaultdict
+
+from kivy.clock import Clock
+from kivy.uix.screenmanager import ScreenManager
+
+from profiling import span
+
+# LAZY_SCREENS: Screen Registry & Predictive Preloading
+# Building every Screen up front means cold start pays for the widget trees and
+# image decodes of the whole app before the start menu can show.
+# LazyScreenManager keeps a factory per screen name instead and only builds a
+# screen the first time something asks for it (navigation, get_screen, ...).
+# After each navigation the screens the player is likely to open next are built
+# one per frame while no transition is running, so the cost is spread over idle
+# frames instead of landing on the button press.
+
+PRELOAD_DELAY = 0.1 # Seconds to wait after a navigation before preloading starts
+
+
+class LazyScreenManager(ScreenManager):
+    def __init__(self, **kwargs):
+        self._factories = {} # name -> callable(name=...) returning a Screen
+        self._preload_hints = {} # name -> screen names usually opened next
+        self._transition_counts = defaultdict(lambda: defaultdict(int)) # Observed navigations
+        self._preload_queue = []
+        super(LazyScreenManager, self).__init__(**kwargs)
+        self._preload_trigger = Clock.create_trigger(self._preload_step, PRELOAD_DELAY)
+
+    def register(self, name, factory, preload=()):
+        # `factory` is usually the Screen subclass itself; it is called with name=name.
+        if self.is_built(name) or name in self._factories:
+            raise ValueError(f'Screen "{name}" is already registered.')
+        self._factories[name] = factory
+        self._preload_hints[name] = tuple(preload)
+
+    def is_built(self, name):
+        return any(screen.name == name for screen in self.screens)
+
+    def registered_names(self):
+        return [screen.name for screen in self.screens] + list(self._factories)
+
+    def get_screen(self, name):
+        for screen in self.screens:
+            if screen.name == name:
+                return screen
+        if name in self._factories:
+            return self._build(name)
+        return super(LazyScreenManager, self).get_screen(name) # Raises ScreenManagerException
+
+    def has_screen(self, name):
+        return name in self._factories or super(LazyScreenManager, self).has_screen(name)
+
+    def build_all(self):
+        # Eager construction, e.g. for benchmarks or platforms where startup time does not matter.
+        for name in list(self._factories):
+            self._build(name)
+
+    def _build(self, name):
+        factory = self._factories.pop(name)
+        with span('build_screen', 'screens', screen=name):
+            screen = factory(name=name)
+        self.add_widget(screen)
+        return screen
+
+    def on_current(self, instance, value):
+        previous_screen = self.current_screen
+        super(LazyScreenManager, self).on_current(instance, value)
+        if value is None:
+            return
+        if previous_screen is not None and previous_screen.name != value:
+            self._transition_counts[previous_screen.name][value] += 1
+        self._schedule_preload(value)
+
+    # --- Predictive Preloading ---
+    def predicted_next(self, name):
+        # Screens the player actually navigated to from `name` come first (most frequent first),
+        # followed by the static hints given at registration time.
+        observed = self._transition_counts.get(name, {})
+        predicted = sorted(observed, key=observed.get, reverse=True)
+        for hint in self._preload_hints.get(name, ()):
+            if hint not in predicted:
+                predicted.append(hint)
+        return predicted
+
+    def _schedule_preload(self, name):
+        self._preload_queue = [n for n in self.predicted_next(name) if n in self._factories]
+        if self._preload_queue:
+            self._preload_trigger()
+
+    def _preload_step(self, dt):
+        if not self._preload_queue:
+            return
+        if self.transition.is_active:
+            # Do not compete with the running transition for frame time; try again later.
+            self._preload_trigger()
+            return
+        name = self._preload_queue.pop(0)
+        if name in self._factories:
+            self._build(name)
+        if self._preload_queue:
+            self._preload_trigger() # One screen per frame
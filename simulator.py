@@ -0,0 +1,281 @@
+import asyncio
+import math
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+from content_pack import ContentPack
+from game_state import GameState
+from geo import haversine_m
+from geofence import DWELL_SECONDS, GeofenceEngine
+from goal_index import GoalStore
+from inventory import InventoryStore
+from location import DEFAULT_ACCURACY_M, Fix, KalmanFilter, LocationPipeline, load_trace, offset_m
+from profiling import log
+from resources import memory_rss
+from story_engine import STORY_DIR, StoryPack
+
+# SIMULATION: Headless Multi-Player Load
+# Runs the game logic of TimeTravelerApp for N players at once, without a window, to see how
+# it behaves with a whole class (30-200 players) in one park. Each simulated player is a
+# PlayerSession holding what one app instance holds: its location pipeline and geofences,
+# its game state and inventory (in its own directory) and its story pack. The goal store,
+# being the same for everyone at an event, is shared by the sessions of a process, as a
+# server would share it. A session is fed a walk (synthetic, or a recorded trace jittered
+# per player) and does what the map and story screens do with it:
+#     goal_lookup  nearest goal for the status line, on every fix
+#     location     smoothing and geofence update of a fix (LocationPipeline, GeofenceEngine)
+#     check_in     recording a visit in the game state when a geofence reports a dwell
+#     story        picking and parsing the goal's story (StoryPack.story_for)
+#     reward       granting the goal's reward into the inventory (once per goal)
+#     save         writing the changed game state sections, every STATE_SAVE_INTERVAL
+#     lag          how late a player's next fix was handled (only when paced, speed > 0)
+# Players run as coroutines in one asyncio event loop per process; `processes` > 1 splits
+# them over a process pool. Every operation is timed (milliseconds) and reported as
+# percentiles; memory is reported per session as the resident memory (and, with
+# trace_memory, the Python allocations) a process gained for its sessions.
+# Use it through tools/simulate.py. No Kivy dependency.
+
+GOALS_FILE = 'goals.json'
+INVENTORY_FILE = 'inventory.db'
+STATE_DIR = 'state'
+STATE_SAVE_INTERVAL = 30.0 # Simulated seconds between saves of the game state, as in the app
+WALK_SPEED_MPS = 1.4
+GPS_NOISE_M = 4.0
+STAY_SECONDS = (DWELL_SECONDS + 3, DWELL_SECONDS + 20) # Time spent at each goal of a synthetic walk
+TRACE_JITTER_M = 5.0 # Recorded traces are moved up to this far for each player
+START_SPREAD_S = 60.0 # Players start within this many seconds of each other
+OPERATIONS = ('goal_lookup', 'location', 'check_in', 'story', 'reward', 'save', 'lag')
+PERCENTILES = (50, 90, 99)
+
+
+def percentile(values, q):
+    # Nearest-rank percentile of sorted `values`.
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, math.ceil(q / 100 * len(values)) - 1))]
+
+
+# --- Walks ---
+def _noisy(lat, lon, t, rng):
+    lat, lon = offset_m(lat, lon, rng.gauss(0, GPS_NOISE_M), rng.gauss(0, GPS_NOISE_M))
+    return Fix(lat, lon, DEFAULT_ACCURACY_M, t)
+
+
+def synthetic_walk(goal_store, rng, goals=None):
+    # One fix per second: from a random point on the map to `goals` random goals in turn
+    # (all of them by default), staying a while at each so it is checked in by dwelling.
+    bounds = goal_store.map_bounds
+    targets = list(goal_store)
+    rng.shuffle(targets)
+    targets = targets[:goals] if goals else targets
+    if bounds is not None:
+        lat, lon = rng.uniform(bounds.south, bounds.north), rng.uniform(bounds.west, bounds.east)
+    else:
+        lat, lon = targets[0].lat, targets[0].lon
+    fixes = []
+    t = 0.0
+    for goal in targets:
+        steps = max(1, int(haversine_m(lat, lon, goal.lat, goal.lon) / WALK_SPEED_MPS))
+        for step in range(1, steps + 1):
+            fixes.append(_noisy(lat + (goal.lat - lat) * step / steps, lon + (goal.lon - lon) * step / steps, t, rng))
+            t += 1.0
+        lat, lon = goal.lat, goal.lon
+        for _ in range(int(rng.uniform(*STAY_SECONDS))):
+            fixes.append(_noisy(lat, lon, t, rng))
+            t += 1.0
+    return fixes
+
+
+def jittered_trace(fixes, rng):
+    # A recorded trace moved by a small random offset, so players do not walk in lockstep.
+    north, east = rng.uniform(-TRACE_JITTER_M, TRACE_JITTER_M), rng.uniform(-TRACE_JITTER_M, TRACE_JITTER_M)
+    return [fix._replace(lat=lat, lon=lon) for fix, (lat, lon) in
+            ((fix, offset_m(fix.lat, fix.lon, north, east)) for fix in fixes)]
+
+
+# --- Sessions ---
+class PlayerSession(object):
+    def __init__(self, player_id, goal_store, directory, pack=None):
+        self.id = player_id
+        self.goal_store = goal_store
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.timings = {name: [] for name in OPERATIONS} # operation -> [milliseconds]
+        self.state = GameState(os.path.join(directory, STATE_DIR),
+                               inventory=InventoryStore(os.path.join(directory, INVENTORY_FILE))).load()
+        self.story_pack = StoryPack(STORY_DIR, pack=pack)
+        self.location = LocationPipeline(KalmanFilter()) # Flushed after every fix, like once per frame
+        self.location.bind(self._on_location)
+        self.geofences = GeofenceEngine(goal_store) # Events are delivered at once
+        self.geofences.bind(self._on_geofence_events)
+        self.fixes = 0
+        self.check_ins = 0
+        self.rewards = 0
+        self.last_save = None
+
+    def _timed(self, operation, fn, *args):
+        start = time.perf_counter()
+        result = fn(*args)
+        self.timings[operation].append((time.perf_counter() - start) * 1000)
+        return result
+
+    def push(self, fix):
+        # One GPS fix, as delivered by a location provider and flushed on the next frame.
+        self.fixes += 1
+        self.location.push(fix)
+        self._timed('location', self.location.flush)
+        self._timed('goal_lookup', self.goal_store.nearest, fix.lat, fix.lon)
+        if self.last_save is None:
+            self.last_save = fix.timestamp
+        elif fix.timestamp - self.last_save >= STATE_SAVE_INTERVAL:
+            self.last_save = fix.timestamp
+            if self.state.dirty:
+                self._timed('save', self.state.save)
+
+    def _on_location(self, fix):
+        self.geofences.update(fix)
+        self.state.set('player', 'location', (fix.lat, fix.lon))
+
+    def _on_geofence_events(self, events):
+        for event in events:
+            if event.kind == 'dwell' and event.goal.id not in (self.state.get('progress', 'checked_in') or ()):
+                self._timed('check_in', self.check_in, event.goal)
+                story = self._timed('story', self.story_pack.story_for, event.goal.id)
+                self._timed('reward', self.collect_reward, event.goal)
+                log.debug("Player %s checked in at %s (%s).", self.id, event.goal.id, story.title)
+
+    def check_in(self, goal):
+        # MapViewScreen._check_in
+        self.check_ins += 1
+        self.state.set('progress', 'current_goal', goal.id)
+        self.state.append('progress', 'checked_in', goal.id)
+        self.state.flush()
+
+    def collect_reward(self, goal):
+        # StoryScreen.collect_reward
+        reward = goal.data.get('reward')
+        if reward and not self.state.inventory.has_reward_for(goal.id):
+            self.state.grant_reward(reward['id'], reward['name'], reward['image'], goal_id=goal.id)
+            self.rewards += 1
+        self.state.flush()
+
+    def close(self):
+        self.state.save()
+        self.state.inventory.close()
+
+    async def play(self, fixes, speed=0.0, start_delay=0.0):
+        # Feed `fixes` in, keeping their spacing divided by `speed` (0: as fast as possible).
+        loop = asyncio.get_running_loop()
+        if not fixes:
+            return
+        start = loop.time() + (start_delay / speed if speed > 0 else 0.0)
+        first = fixes[0].timestamp
+        for fix in fixes:
+            if speed > 0:
+                due = start + (fix.timestamp - first) / speed
+                await asyncio.sleep(max(0.0, due - loop.time()))
+                self.timings['lag'].append(max(0.0, loop.time() - due) * 1000)
+            else:
+                await asyncio.sleep(0) # Let the other players run
+            self.push(fix)
+
+
+# --- Running ---
+def load_goal_store(goals_path=GOALS_FILE, pack=None):
+    if pack is not None and GOALS_FILE in pack:
+        return GoalStore.from_dict(pack.read_json(GOALS_FILE))
+    return GoalStore.load(goals_path)
+
+
+def make_walks(goal_store, players, traces=(), goals=None, seed=1):
+    # One walk per player: the recorded traces in turn (jittered), or synthetic walks.
+    rng = random.Random(seed)
+    recorded = [load_trace(path) for path in traces]
+    if recorded:
+        return [jittered_trace(recorded[i % len(recorded)], rng) for i in range(players)]
+    return [synthetic_walk(goal_store, rng, goals) for _ in range(players)]
+
+
+async def _run_players(sessions, walks, speed, seed):
+    rng = random.Random(seed)
+    await asyncio.gather(*(session.play(walk, speed, rng.uniform(0, START_SPREAD_S))
+                           for session, walk in zip(sessions, walks)))
+
+
+def run_shard(player_ids, walks, directory, speed=0.0, goals_path=GOALS_FILE, pack_path=None,
+              trace_memory=False, seed=1):
+    # Simulate some players in this process, in one event loop; returns the raw results.
+    pack = ContentPack(pack_path) if pack_path else None
+    goal_store = load_goal_store(goals_path, pack)
+    if trace_memory:
+        tracemalloc.start()
+    rss_before = memory_rss()
+    traced_before = tracemalloc.get_traced_memory()[0] if trace_memory else 0
+    sessions = [PlayerSession(player_id, goal_store, os.path.join(directory, f'player{player_id}'), pack)
+                for player_id in player_ids]
+    start = time.perf_counter()
+    asyncio.run(_run_players(sessions, walks, speed, seed))
+    elapsed = time.perf_counter() - start
+    rss_after = memory_rss()
+    traced_after = tracemalloc.get_traced_memory()[0] if trace_memory else 0
+    for session in sessions:
+        session.close()
+    if trace_memory:
+        tracemalloc.stop()
+    if pack is not None:
+        pack.close()
+    timings = {name: [value for session in sessions for value in session.timings[name]] for name in OPERATIONS}
+    return {'players': len(sessions), 'elapsed_s': elapsed, 'timings': timings,
+            'fixes': sum(session.fixes for session in sessions),
+            'check_ins': sum(session.check_ins for session in sessions),
+            'rewards': sum(session.rewards for session in sessions),
+            'rss_bytes': None if rss_before is None or rss_after is None else rss_after - rss_before,
+            'traced_bytes': traced_after - traced_before if trace_memory else None}
+
+
+def simulate(players, traces=(), goals=None, speed=0.0, processes=1, goals_path=GOALS_FILE, pack_path=None,
+             trace_memory=False, seed=1, directory=None):
+    # Simulate `players` players, split over `processes` processes; returns report(...).
+    if pack_path:
+        with ContentPack(pack_path) as pack:
+            goal_store = load_goal_store(goals_path, pack)
+    else:
+        goal_store = load_goal_store(goals_path)
+    walks = make_walks(goal_store, players, traces, goals, seed)
+    processes = max(1, min(processes, players))
+    with tempfile.TemporaryDirectory(dir=directory) as root:
+        shards = [(list(range(i, players, processes)), walks[i::processes]) for i in range(processes)]
+        if processes == 1:
+            results = [run_shard(shards[0][0], shards[0][1], root, speed, goals_path, pack_path, trace_memory, seed)]
+        else:
+            with ProcessPoolExecutor(processes) as pool:
+                futures = [pool.submit(run_shard, ids, shard_walks, root, speed, goals_path, pack_path,
+                                       trace_memory, seed + i) for i, (ids, shard_walks) in enumerate(shards)]
+                results = [future.result() for future in futures]
+    return report(results)
+
+
+def report(results):
+    # Merge the results of the shards: percentiles per operation and memory per session.
+    players = sum(result['players'] for result in results)
+    operations = {}
+    for name in OPERATIONS:
+        values = sorted(value for result in results for value in result['timings'][name])
+        if values:
+            operations[name] = dict({f'p{q}': percentile(values, q) for q in PERCENTILES},
+                                    count=len(values), mean=sum(values) / len(values), max=values[-1])
+    rss = [result['rss_bytes'] for result in results if result['rss_bytes'] is not None]
+    traced = [result['traced_bytes'] for result in results if result['traced_bytes'] is not None]
+    elapsed = max(result['elapsed_s'] for result in results)
+    fixes = sum(result['fixes'] for result in results)
+    return {'players': players, 'processes': len(results), 'elapsed_s': elapsed, 'fixes': fixes,
+            'fixes_per_s': fixes / elapsed if elapsed else 0.0,
+            'check_ins': sum(result['check_ins'] for result in results),
+            'rewards': sum(result['rewards'] for result in results),
+            'operations': operations,
+            'rss_per_session': sum(rss) / players if rss else None,
+            'traced_per_session': sum(traced) / players if traced else None}
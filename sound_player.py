@@ -0,0 +1,64 @@
+from kivy.clock import Clock
+from kivy.core.audio import SoundLoader
+
+from profiling import log
+
+# TEXT_TO_SPEECH: Sentence Audio Playback
+# The player narration.Narrator speaks through: plays one audio file at a time and calls
+# back when it has played to the end. Kivy sounds cannot pause, so pause() remembers the
+# position and stops, and resume() plays again from there.
+
+
+class SoundPlayer(object):
+    def __init__(self, volume=1.0):
+        self.volume = volume
+        self._sound = None
+        self._on_finished = None
+        self._position = 0.0
+        self._stopping = False # Our own stop() calls also dispatch on_stop
+
+    def play(self, path, on_finished):
+        self.stop()
+        sound = SoundLoader.load(path)
+        if sound is None:
+            log.error("Cannot play %s", path)
+            Clock.schedule_once(lambda dt: on_finished()) # Skip it rather than stall
+            return
+        sound.volume = self.volume
+        sound.bind(on_stop=self._on_stop)
+        self._sound = sound
+        self._on_finished = on_finished
+        self._position = 0.0
+        sound.play()
+
+    def _on_stop(self, sound):
+        if self._stopping or sound is not self._sound:
+            return
+        on_finished = self._on_finished
+        self._sound = self._on_finished = None
+        sound.unload()
+        on_finished()
+
+    def _halt(self):
+        self._stopping = True
+        try:
+            self._sound.stop()
+        finally:
+            self._stopping = False
+
+    def pause(self):
+        if self._sound is not None and self._sound.state == 'play':
+            self._position = self._sound.get_pos()
+            self._halt()
+
+    def resume(self):
+        if self._sound is not None and self._sound.state != 'play':
+            self._sound.play()
+            if self._position:
+                self._sound.seek(self._position)
+
+    def stop(self):
+        if self._sound is not None:
+            self._halt()
+            self._sound.unload()
+            self._sound = self._on_finished = None
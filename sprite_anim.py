@@ -0,0 +1,244 @@
+from collections import namedtuple
+
+from kivy.clock import Clock
+from kivy.graphics import Color, Rectangle
+from kivy.properties import OptionProperty, StringProperty
+from kivy.uix.widget import Widget
+
+import assets
+
+# CHARACTER_DIALOGUE_SYSTEM: Sprite-Sheet Character Animation
+# A character is one Rectangle whose texture never changes: playing a clip only swaps the
+# rectangle's texture coordinates to the next frame of a sprite sheet. Nothing is loaded,
+# decoded or uploaded per frame, and no objects are created per frame (the UV tuples of
+# every frame are computed once per sheet).
+# - Sheets come from assets.texture(), so a sheet packed into the sprite atlas shares the
+#   atlas texture with every other sprite, and all characters using a sheet share it too.
+# - One Clock callback advances every playing sprite, however many there are.
+# - CharacterSprite adds an idle/talk/wave state machine on top of the clips.
+# Sheets are laid out as a grid of equally sized frames, one clip per row, left to right.
+
+Clip = namedtuple('Clip', 'name frames fps loop next') # frames: tex_coords per frame; next: clip after a one-shot
+
+SHEETS = {
+    'character': {
+        'image': 'character_sheet.png',
+        'fallback': 'character_placeholder.png', # Single frame, used until the sheet is drawn
+        'frame_size': (128, 170),
+        'clips': {
+            'idle': {'row': 0, 'frames': 4, 'fps': 4},
+            'talk': {'row': 1, 'frames': 6, 'fps': 10},
+            'wave': {'row': 2, 'frames': 8, 'fps': 12, 'loop': False, 'next': 'idle'},
+        },
+    },
+}
+
+
+class SpriteSheet(object):
+    def __init__(self, texture, frame_size, clips):
+        self.texture = texture
+        self.frame_size = frame_size
+        width, height = frame_size
+        columns = max(1, texture.width // width)
+        self.clips = {}
+        for name, spec in clips.items():
+            frames = []
+            for i in range(spec.get('frames', 1)):
+                column = i % columns
+                row = spec.get('row', 0) + i // columns
+                # Texture y grows upwards; sheet rows are counted from the top
+                region = texture.get_region(column * width, texture.height - (row + 1) * height, width, height)
+                frames.append(tuple(region.tex_coords))
+            self.clips[name] = Clip(name, tuple(frames), spec.get('fps', 8), spec.get('loop', True),
+                                    spec.get('next'))
+
+    @classmethod
+    def single_frame(cls, texture, clips):
+        # Every clip shows the whole texture (a static fallback with the same clip names).
+        sheet = cls.__new__(cls)
+        sheet.texture = texture
+        sheet.frame_size = texture.size
+        frame = (tuple(texture.tex_coords),)
+        sheet.clips = {name: Clip(name, frame, 1, spec.get('loop', True), spec.get('next'))
+                       for name, spec in clips.items()}
+        return sheet
+
+
+_sheets = {}
+
+
+def register_sheet(name, sheet):
+    _sheets[name] = sheet
+
+
+def load_sheet(name):
+    # Shared SpriteSheet for a SHEETS entry (None if neither the sheet nor its fallback loads).
+    sheet = _sheets.get(name)
+    if sheet is None:
+        spec = SHEETS[name]
+        texture = assets.texture(spec['image'])
+        if texture is not None:
+            sheet = SpriteSheet(texture, spec['frame_size'], spec['clips'])
+        else:
+            texture = assets.texture(spec['fallback'])
+            if texture is None:
+                return None
+            sheet = SpriteSheet.single_frame(texture, spec['clips'])
+        _sheets[name] = sheet
+    return sheet
+
+
+class _AnimationDriver(object):
+    # The single Clock callback that advances all playing sprites.
+
+    def __init__(self):
+        self.sprites = set()
+        self._event = None
+
+    def add(self, sprite):
+        self.sprites.add(sprite)
+        if self._event is None:
+            self._event = Clock.schedule_interval(self._tick, 0)
+
+    def discard(self, sprite):
+        self.sprites.discard(sprite)
+        if not self.sprites and self._event is not None:
+            self._event.cancel()
+            self._event = None
+
+    def _tick(self, dt):
+        for sprite in list(self.sprites):
+            sprite.advance(dt)
+
+
+animation_driver = _AnimationDriver()
+
+
+class AnimatedSprite(Widget):
+    sheet = StringProperty('')
+    clip = StringProperty('')
+
+    def __init__(self, **kwargs):
+        self._sheet = None
+        self._clip = None
+        self._frame = 0
+        self._elapsed = 0.0
+        self.playing = False
+        sheet, clip = kwargs.pop('sheet', ''), kwargs.pop('clip', '')
+        super(AnimatedSprite, self).__init__(**kwargs)
+        with self.canvas:
+            self._color = Color(1, 1, 1, 0) # Hidden until a sheet is loaded
+            self._rect = Rectangle()
+        self.bind(pos=self._update_rect, size=self._update_rect)
+        self._update_rect()
+        self.sheet = sheet # Applied once the rectangle exists
+        self.clip = clip
+
+    def on_sheet(self, instance, name):
+        self._sheet = load_sheet(name) if name else None
+        self._rect.texture = self._sheet.texture if self._sheet is not None else None
+        self._color.a = 1 if self._sheet is not None else 0
+        self._clip = None
+        if self.clip:
+            self.play(self.clip)
+
+    def on_clip(self, instance, name):
+        self.play(name)
+
+    def play(self, name):
+        if self._sheet is None or name not in self._sheet.clips:
+            return
+        self._clip = self._sheet.clips[name]
+        if self.clip != name:
+            self.clip = name # Re-enters play() through on_clip with the same clip
+            return
+        self._frame = 0
+        self._elapsed = 0.0
+        self._rect.tex_coords = self._clip.frames[0]
+        self.resume()
+
+    def resume(self):
+        if self._clip is not None and len(self._clip.frames) > 1:
+            self.playing = True
+            animation_driver.add(self)
+
+    def pause(self):
+        self.playing = False
+        animation_driver.discard(self)
+
+    def advance(self, dt):
+        clip = self._clip
+        self._elapsed += dt
+        frame_time = 1.0 / clip.fps
+        if self._elapsed < frame_time:
+            return
+        steps = int(self._elapsed / frame_time)
+        self._elapsed -= steps * frame_time
+        frame = self._frame + steps
+        if frame >= len(clip.frames):
+            if not clip.loop:
+                self._rect.tex_coords = clip.frames[-1]
+                self.pause()
+                self.on_clip_finished(clip)
+                return
+            frame %= len(clip.frames)
+        self._frame = frame
+        self._rect.tex_coords = clip.frames[frame] # Only the UVs change
+
+    def on_clip_finished(self, clip):
+        if clip.next:
+            self.play(clip.next)
+
+    def _update_rect(self, *args):
+        self._rect.pos = self.pos
+        self._rect.size = self.size
+
+
+class CharacterSprite(AnimatedSprite):
+    # idle (default, loops) -> talk (loops, optionally for a while) / wave (once, then back).
+    state = OptionProperty('idle', options=('idle', 'talk', 'wave'))
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('sheet', 'character')
+        self._talk_left = None # Seconds of talking left, None: until idle() is called
+        self._resume_state = 'idle' # Looping state to return to after a wave
+        super(CharacterSprite, self).__init__(**kwargs)
+        self.play(self.state)
+
+    def on_state(self, instance, state):
+        if state != 'wave':
+            self._resume_state = state
+        self.play(state)
+
+    def idle(self):
+        self._talk_left = None
+        self.state = 'idle'
+
+    def talk(self, duration=None):
+        self._talk_left = duration
+        self.state = 'talk'
+
+    def wave(self):
+        if self.state == 'wave':
+            self.play('wave') # Start the wave again
+        self.state = 'wave'
+
+    def advance(self, dt):
+        if self._talk_left is not None and self.state == 'talk':
+            self._talk_left -= dt
+            if self._talk_left <= 0:
+                self.idle()
+                return
+        super(CharacterSprite, self).advance(dt)
+
+    def on_clip_finished(self, clip):
+        if clip.name == 'wave':
+            self.state = self._resume_state
+        else:
+            super(CharacterSprite, self).on_clip_finished(clip)
+
+    def on_touch_down(self, touch):
+        if self.collide_point(*touch.pos):
+            self.wave()
+            return True
+        return super(CharacterSprite, self).on_touch_down(touch)
@@ -0,0 +1,133 @@
+import hashlib
+import os
+import re
+from collections import OrderedDict, namedtuple
+
+# STORY_ENGINE: Data-Driven Story Content
+# Stories live in a content pack on disk, one UTF-8 text file per goal:
+#     stories/<goal_id>.txt   (stories/intro.txt when no goal has been checked in yet)
+# An optional first line "# Title" names the story; paragraphs are separated by blank
+# lines, and single line breaks inside a paragraph are joined into one line so the text
+# wraps to the screen width. Long paragraphs are split at sentence boundaries into chunks
+# of at most MAX_CHUNK_CHARS, so no chunk renders into an oversized text texture.
+# Every chunk has a content-based key; the story view caches rendered textures by it, so
+# revisiting a story (or a paragraph shared between stories) does not rasterise it again.
+# With a content_pack.ContentPack the same files are read from the pack instead
+# (entries "stories/<goal_id>.txt").
+# This module has no Kivy dependency; see story_view.py for the rendering side.
+
+STORY_DIR = 'stories'
+DEFAULT_STORY = 'intro'
+MAX_CHUNK_CHARS = 800 # ~10-15 wrapped lines on a phone
+MAX_CACHED_STORIES = 8
+
+StoryChunk = namedtuple('StoryChunk', 'key index text')
+
+_SENTENCE_END = re.compile(r'(?<=[.!?…])\s+')
+
+
+def chunk_key(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+
+def split_paragraph(paragraph, max_chars=MAX_CHUNK_CHARS):
+    # Paragraph -> list of chunks, each at most max_chars unless a single sentence is longer.
+    if len(paragraph) <= max_chars:
+        return [paragraph]
+    chunks = []
+    current = ''
+    for sentence in _SENTENCE_END.split(paragraph):
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            chunks.append(current)
+            current = sentence
+        else:
+            current = f'{current} {sentence}' if current else sentence
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def parse_story(text, max_chars=MAX_CHUNK_CHARS):
+    # Story file contents -> (title, [paragraph chunk text, ...])
+    lines = text.splitlines()
+    title = ''
+    if lines and lines[0].startswith('#'):
+        title = lines.pop(0).lstrip('#').strip()
+    chunks = []
+    paragraph = []
+    for line in lines + ['']:
+        line = line.strip()
+        if line:
+            paragraph.append(line)
+        elif paragraph:
+            chunks.extend(split_paragraph(' '.join(paragraph), max_chars))
+            paragraph = []
+    return title, chunks
+
+
+class Story(object):
+    def __init__(self, story_id, title, texts):
+        self.id = story_id
+        self.title = title
+        self.chunks = [StoryChunk(chunk_key(text), i, text) for i, text in enumerate(texts)]
+
+    def __len__(self):
+        return len(self.chunks)
+
+    @property
+    def text(self):
+        return '\n\n'.join(chunk.text for chunk in self.chunks)
+
+
+class StoryPack(object):
+    # Loads stories from `root` on demand and keeps the most recently used ones parsed.
+
+    def __init__(self, root=STORY_DIR, default=DEFAULT_STORY, max_chars=MAX_CHUNK_CHARS,
+                 max_cached=MAX_CACHED_STORIES, pack=None):
+        self.root = root
+        self.pack = pack # ContentPack to read from instead of the `root` directory
+        self.default = default
+        self.max_chars = max_chars
+        self.max_cached = max_cached
+        self._stories = OrderedDict() # story id -> Story, oldest first
+        self.loads = 0 # Story files read and parsed
+
+    def path(self, story_id):
+        if self.pack is not None:
+            return f'{self.root}/{story_id}.txt' # Entry names always use forward slashes
+        return os.path.join(self.root, f'{story_id}.txt')
+
+    def has_story(self, story_id):
+        if story_id in self._stories:
+            return True
+        if self.pack is not None:
+            return self.path(story_id) in self.pack
+        return os.path.isfile(self.path(story_id))
+
+    def _read(self, story_id):
+        if self.pack is not None:
+            try:
+                return self.pack.read_text(self.path(story_id))
+            except KeyError:
+                raise FileNotFoundError(f'No story {self.path(story_id)} in {self.pack.path}')
+        with open(self.path(story_id), 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def story(self, story_id):
+        # The story for `story_id`; raises OSError if there is no such story.
+        story = self._stories.get(story_id)
+        if story is not None:
+            self._stories.move_to_end(story_id)
+            return story
+        title, texts = parse_story(self._read(story_id), self.max_chars)
+        self.loads += 1
+        story = self._stories[story_id] = Story(story_id, title, texts)
+        while len(self._stories) > self.max_cached:
+            self._stories.popitem(last=False)
+        return story
+
+    def story_for(self, goal_id):
+        # The goal's story, or the default story if there is none (or no goal yet).
+        if goal_id and self.has_story(goal_id):
+            return self.story(goal_id)
+        return self.story(self.default)
@@ -0,0 +1,142 @@
+import math
+from weakref import WeakSet
+
+from kivy.clock import Clock
+from kivy.graphics import Color, Rectangle
+from kivy.metrics import dp, sp
+from kivy.properties import StringProperty
+from kivy.uix.recycleboxlayout import RecycleBoxLayout
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+from kivy.uix.widget import Widget
+
+from text_cache import Debouncer, shared_text_cache
+
+# STORY_ENGINE: Paginated Story Rendering
+# A story is shown as a RecycleView with one row per paragraph chunk (story_engine.py),
+# instead of one Label holding the whole text:
+# - Only rows inside (or near) the viewport exist, so only visible paragraphs are rasterised.
+# - Each chunk is rendered into its own texture, well below GPU texture size limits.
+# - Rendering goes through the shared text_cache.TextLayoutCache, keyed by chunk key, font,
+#   size and wrap width, so going back to a story (or rotating back) reuses the textures.
+# Row heights come from the cached text layouts of paragraphs rendered at that width before,
+# otherwise from an estimate corrected once the row has been rendered. A width change is
+# reflowed once the size has settled (text_cache.Debouncer); until then rows keep the text
+# rendered at the previous width.
+
+STORY_FONT_SIZE = '16sp'
+ROW_PADDING = '6dp' # Above and below every paragraph
+AVERAGE_CHAR_WIDTH = 0.5 # In font sizes, used to estimate heights before rendering
+
+
+class StoryParagraphView(RecycleDataViewBehavior, Widget):
+    key = StringProperty('')
+    text = StringProperty('')
+
+    def __init__(self, **kwargs):
+        super(StoryParagraphView, self).__init__(**kwargs)
+        self.index = None
+        self.story_view = None
+        with self.canvas:
+            Color(1, 1, 1, 1)
+            self._rect = Rectangle()
+        self._trigger_render = Clock.create_trigger(self._render)
+        self.bind(key=self._trigger_render, pos=self._update_rect) # Width changes wait for the view's reflow
+
+    def refresh_view_attrs(self, rv, index, data):
+        self.index = index
+        self.story_view = rv
+        rv.rows.add(self)
+        self._rect.texture = None # Do not flash the previous paragraph while rebinding
+        super(StoryParagraphView, self).refresh_view_attrs(rv, index, data)
+        self._trigger_render()
+
+    def _render(self, *args):
+        story_view = self.story_view
+        if not self.key or story_view is None or not story_view.wrap_width:
+            return
+        texture = story_view.text_cache.render(self.text, story_view.wrap_width, story_view.font_size,
+                                               key=self.key, owner=story_view.owner)
+        self._rect.texture = texture
+        self._rect.size = texture.size
+        self._update_rect()
+        story_view.measured(self.index, self.key, texture.height + 2 * dp(ROW_PADDING))
+
+    def _update_rect(self, *args):
+        self._rect.pos = (self.x, self.top - dp(ROW_PADDING) - self._rect.size[1])
+
+    def release(self):
+        self._trigger_render.cancel()
+        self._rect.texture = None
+        self._rect.size = (0, 0) # Not a blank box until rendered again
+
+
+class StoryView(RecycleView):
+    def __init__(self, owner='story', text_cache=shared_text_cache, **kwargs):
+        kwargs.setdefault('viewclass', StoryParagraphView)
+        super(StoryView, self).__init__(**kwargs)
+        self.font_size = sp(STORY_FONT_SIZE)
+        self.owner = owner # Name the renders are counted under in the text cache stats
+        self.text_cache = text_cache
+        self.story = None
+        self.wrap_width = 0 # Width the rows are rendered at; follows the view width after a reflow
+        self.rows = WeakSet() # Row widgets created by the RecycleView, shown or kept for reuse
+        layout = RecycleBoxLayout(orientation='vertical',
+                                  default_size=(None, dp(120)),
+                                  default_size_hint=(1, None),
+                                  size_hint_y=None,
+                                  padding=(dp(10), 0))
+        layout.bind(minimum_height=layout.setter('height'))
+        self.add_widget(layout)
+        self._trigger_relayout = Clock.create_trigger(lambda dt: self.refresh_from_data())
+        self._reflow = Debouncer(self._rebuild_data)
+        self.bind(width=self._on_width)
+
+    def show_story(self, story):
+        if story is not self.story:
+            self.story = story
+            self.scroll_y = 1
+        self._rebuild_data()
+
+    def _row_width(self):
+        return self.width - 2 * dp(10)
+
+    def _on_width(self, *args):
+        if self.wrap_width:
+            self._reflow.trigger()
+        else:
+            self._rebuild_data() # Nothing shown yet: lay out at once
+
+    def _estimated_height(self, text, width):
+        chars_per_line = max(1, int(width / (self.font_size * AVERAGE_CHAR_WIDTH)))
+        lines = math.ceil(len(text) / chars_per_line)
+        return lines * self.font_size * 1.2 + 2 * dp(ROW_PADDING)
+
+    def _rebuild_data(self, *args):
+        self._reflow.cancel()
+        if self.story is None:
+            self.data = []
+            return
+        width = self.wrap_width = max(1, int(self._row_width()))
+        padding = 2 * dp(ROW_PADDING)
+        data = []
+        for chunk in self.story.chunks:
+            layout = self.text_cache.layout(chunk.text, width, self.font_size, key=chunk.key)
+            height = layout.height + padding if layout is not None else self._estimated_height(chunk.text, width)
+            data.append({'key': chunk.key, 'text': chunk.text, 'height': height})
+        self.data = data
+
+    def release(self):
+        # Drop every row's texture (e.g. while the app is paused); restore() renders the shown rows again.
+        for row in self.rows:
+            row.release()
+
+    def restore(self):
+        self.refresh_from_data()
+
+    def measured(self, index, key, height):
+        # Called by a row once rendered; corrects the estimated height of that row.
+        if index is not None and index < len(self.data) and self.data[index]['key'] == key \
+                and self.data[index]['height'] != height:
+            self.data[index]['height'] = height
+            self._trigger_relayout()
@@ -0,0 +1,131 @@
+import time
+from collections import OrderedDict, namedtuple
+
+from kivy.clock import Clock
+from kivy.core.text.markup import MarkupLabel
+
+from profiling import span
+from story_engine import chunk_key
+
+# TEXT_RENDERING: Text Layout Cache
+# Rendering wrapped text (font shaping, line breaking, rasterising, uploading) is the costly
+# part of a text screen, so it is done once per (text hash, font, font size, wrap width,
+# alignment) and shared by every screen:
+# - the texture, in an LRU bounded by the bytes it occupies on the GPU;
+# - the text layout, i.e. the text of every wrapped line and the rendered size, kept much
+#   longer (it is small), so a view knows a paragraph's exact height at a width seen
+#   before without rendering it, even after its texture was evicted or released.
+# Rotating the device or resizing the window changes the width many times in a row; views
+# reflow through a Debouncer, once the size has held still for REFLOW_DELAY, so only the
+# final width is rendered. Every render is counted against an `owner` (the screen), so
+# stats(owner) gives each screen's cache hits, renders and render time.
+
+DEFAULT_TEXT_CACHE_BYTES = 16 * 1024 * 1024
+MAX_LAYOUTS = 5000 # Text layouts kept (line breaks and sizes, no pixels)
+REFLOW_DELAY = 0.25 # Seconds a new size must hold before text is reflowed
+DEFAULT_FONT = 'Roboto' # Kivy's default font
+
+TextLayout = namedtuple('TextLayout', 'lines width height') # lines: the text of each wrapped line
+
+
+class TextLayoutCache(object):
+    def __init__(self, max_bytes=DEFAULT_TEXT_CACHE_BYTES, max_layouts=MAX_LAYOUTS):
+        self.max_bytes = max_bytes
+        self.max_layouts = max_layouts
+        self.resident_bytes = 0
+        self._textures = OrderedDict() # cache key -> (texture, nbytes), oldest first
+        self._layouts = OrderedDict() # cache key -> TextLayout, oldest first
+        self._owners = {} # owner -> {'hits', 'misses', 'render_ms'}
+
+    def cache_key(self, text, width, font_size, font_name=DEFAULT_FONT, halign='left', key=None):
+        # `key`: a hash of `text` the caller already has (e.g. StoryChunk.key).
+        return (key or chunk_key(text), font_name, round(font_size, 2), int(width), halign)
+
+    def _owner(self, owner):
+        stats = self._owners.get(owner)
+        if stats is None:
+            stats = self._owners[owner] = {'hits': 0, 'misses': 0, 'render_ms': 0.0}
+        return stats
+
+    def render(self, text, width, font_size, font_name=DEFAULT_FONT, halign='left', key=None, owner=''):
+        # Texture of (markup) `text` wrapped to `width`.
+        cache_key = self.cache_key(text, width, font_size, font_name, halign, key)
+        stats = self._owner(owner)
+        entry = self._textures.get(cache_key)
+        if entry is not None:
+            stats['hits'] += 1
+            self._textures.move_to_end(cache_key)
+            return entry[0]
+        stats['misses'] += 1
+        start = time.perf_counter()
+        with span('render_text', 'text', owner=owner, chars=len(text)):
+            label = MarkupLabel(text=text, font_size=font_size, font_name=font_name, halign=halign,
+                                text_size=(int(width), None))
+            label.refresh()
+        texture = label.texture
+        stats['render_ms'] += (time.perf_counter() - start) * 1000
+        lines = tuple(''.join(word.text for word in line.words) for line in getattr(label, '_cached_lines', ()))
+        self._remember(cache_key, TextLayout(lines, texture.width, texture.height))
+        self._put(cache_key, texture)
+        return texture
+
+    def layout(self, text, width, font_size, font_name=DEFAULT_FONT, halign='left', key=None):
+        # The TextLayout of a text rendered before at this width and font, else None (never renders).
+        cache_key = self.cache_key(text, width, font_size, font_name, halign, key)
+        layout = self._layouts.get(cache_key)
+        if layout is not None:
+            self._layouts.move_to_end(cache_key)
+        return layout
+
+    def _remember(self, cache_key, layout):
+        self._layouts[cache_key] = layout
+        self._layouts.move_to_end(cache_key)
+        while len(self._layouts) > self.max_layouts:
+            self._layouts.popitem(last=False)
+
+    def _put(self, cache_key, texture):
+        nbytes = texture.width * texture.height * 4
+        if cache_key in self._textures:
+            self.resident_bytes -= self._textures.pop(cache_key)[1]
+        self._textures[cache_key] = (texture, nbytes)
+        self.resident_bytes += nbytes
+        while self.resident_bytes > self.max_bytes and len(self._textures) > 1:
+            _, (_, evicted_bytes) = self._textures.popitem(last=False)
+            self.resident_bytes -= evicted_bytes
+
+    def clear(self, layouts=False):
+        # Drop the textures (e.g. while the app is paused); layouts too if `layouts`.
+        self._textures.clear()
+        self.resident_bytes = 0
+        if layouts:
+            self._layouts.clear()
+
+    def reset_stats(self):
+        self._owners.clear()
+
+    def stats(self, owner=None):
+        # Hits, misses (renders) and render time of one owner, or of all of them.
+        owners = [self._owners.get(owner, {})] if owner is not None else list(self._owners.values())
+        hits = sum(stats.get('hits', 0) for stats in owners)
+        misses = sum(stats.get('misses', 0) for stats in owners)
+        lookups = hits + misses
+        return {'textures': len(self._textures), 'layouts': len(self._layouts),
+                'resident_bytes': self.resident_bytes, 'hits': hits, 'misses': misses,
+                'hit_rate': hits / lookups if lookups else 0.0,
+                'render_ms': sum(stats.get('render_ms', 0.0) for stats in owners)}
+
+
+shared_text_cache = TextLayoutCache() # Process-wide, survives leaving a screen
+
+
+class Debouncer(object):
+    # Calls `callback()` once `delay` seconds after the last call to trigger().
+    def __init__(self, callback, delay=REFLOW_DELAY):
+        self._event = Clock.create_trigger(lambda dt: callback(), delay)
+
+    def trigger(self, *args):
+        self._event.cancel()
+        self._event()
+
+    def cancel(self):
+        self._event.cancel()
@@ -0,0 +1,387 @@
+import math
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from kivy.clock import Clock
+from kivy.graphics import Color, Rectangle
+from kivy.properties import NumericProperty, ObjectProperty
+from kivy.uix.widget import Widget
+
+from async_image import decode_image
+from geo import TILE_SIZE, MapBounds, latlon_to_normalized, normalized_to_latlon
+from profiling import log, traced
+
+# MAP_RENDERING: Tiled, Zoomable Map
+# Large park/city rasters are cut into 256px XYZ ("slippy map") tiles, either as a
+# directory tree (<root>/<z>/<x>/<y>.png) or as an MBTiles SQLite file; see
+# tools/make_tiles.py. TiledMapLayer only draws the tiles under the viewport:
+# - Tile bytes are read and decoded on worker threads; only the GPU upload happens
+#   on the main thread, one Clock callback per decoded tile.
+# - Uploaded textures live in a TileTextureCache that evicts the least recently
+#   used tiles once the resident texture bytes exceed its budget.
+# - While a tile is loading its parent tile (if cached) is drawn scaled up instead.
+
+DEFAULT_CACHE_BYTES = 48 * 1024 * 1024 # ~190 RGBA 256px tiles
+DECODE_WORKERS = 2
+
+
+# --- Tile Sources ---
+class DirectoryTileSource(object):
+    def __init__(self, root, ext='png', min_zoom=0, max_zoom=19):
+        self.root = root
+        self.ext = ext
+        self.min_zoom = min_zoom
+        self.max_zoom = max_zoom
+        zooms = sorted(int(d) for d in os.listdir(root) if d.isdigit())
+        if zooms:
+            self.min_zoom, self.max_zoom = zooms[0], zooms[-1]
+
+    def read(self, z, x, y):
+        try:
+            with open(os.path.join(self.root, str(z), str(x), f'{y}.{self.ext}'), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def close(self):
+        pass
+
+
+class MBTilesTileSource(object):
+    # MBTiles stores rows in TMS order (0 at the south edge); XYZ rows are flipped on read.
+    # Reads happen on decode workers, so every thread gets its own read-only connection.
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        metadata = dict(self._connection().execute('SELECT name, value FROM metadata'))
+        self.ext = metadata.get('format', 'png')
+        self.min_zoom = int(metadata.get('minzoom', 0))
+        self.max_zoom = int(metadata.get('maxzoom', 19))
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(f'file:{self.path}?mode=ro', uri=True, check_same_thread=False)
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def read(self, z, x, y):
+        row = self._connection().execute(
+            'SELECT tile_data FROM tiles WHERE zoom_level=? AND tile_column=? AND tile_row=?',
+            (z, x, (1 << z) - 1 - y)).fetchone()
+        return row[0] if row else None
+
+    def close(self):
+        with self._lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections = []
+
+
+def open_tile_source(paths):
+    # First usable tile source among `paths` (MBTiles files or tile directories), or None.
+    for path in paths:
+        if os.path.isdir(path):
+            return DirectoryTileSource(path)
+        if os.path.isfile(path):
+            return MBTilesTileSource(path)
+    return None
+
+
+# --- Texture Cache ---
+class TileTextureCache(object):
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.resident_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._textures = OrderedDict() # key -> (texture, nbytes), oldest first
+
+    def __contains__(self, key):
+        return key in self._textures
+
+    def __len__(self):
+        return len(self._textures)
+
+    def get(self, key):
+        entry = self._textures.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._textures.move_to_end(key)
+        return entry[0]
+
+    def peek(self, key, touch=False):
+        # Lookup that does not count towards the hit rate (fallback tiles, tiles already on
+        # screen); `touch` still marks the tile as recently used.
+        entry = self._textures.get(key)
+        if entry is None:
+            return None
+        if touch:
+            self._textures.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, texture):
+        nbytes = texture.width * texture.height * len(texture.colorfmt)
+        if key in self._textures:
+            self.resident_bytes -= self._textures.pop(key)[1]
+        self._textures[key] = (texture, nbytes)
+        self.resident_bytes += nbytes
+        while self.resident_bytes > self.max_bytes and len(self._textures) > 1:
+            _, (_, evicted_bytes) = self._textures.popitem(last=False)
+            self.resident_bytes -= evicted_bytes
+            self.evictions += 1
+
+    def clear(self):
+        self._textures.clear()
+        self.resident_bytes = 0
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        return {'tiles': len(self._textures), 'resident_bytes': self.resident_bytes,
+                'max_bytes': self.max_bytes, 'hits': self.hits, 'misses': self.misses,
+                'hit_rate': self.hit_rate, 'evictions': self.evictions}
+
+
+class TileLoader(object):
+    # Reads and decodes tiles on a small thread pool and uploads them on the main thread.
+
+    def __init__(self, source, cache, on_tile_loaded, workers=DECODE_WORKERS):
+        self.source = source
+        self.cache = cache
+        self.on_tile_loaded = on_tile_loaded
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='tile-decode')
+        self._pending = {} # key -> Future
+        self._missing = set() # Tiles the source does not have
+        self.generation = 0 # Bumped by trim(); decodes of an older generation are not uploaded
+
+    def request(self, key):
+        if key in self._pending or key in self._missing or key in self.cache:
+            return
+        self._pending[key] = self._executor.submit(self._decode, key, self.generation)
+
+    def cancel_except(self, wanted):
+        # Drop queued requests for tiles that scrolled out of view before a worker got to them.
+        for key in list(self._pending):
+            if key not in wanted and self._pending[key].cancel():
+                del self._pending[key]
+
+    def trim(self):
+        # Forget every request; tiles still being decoded are dropped when they finish.
+        for future in self._pending.values():
+            future.cancel()
+        self._pending.clear()
+        self.generation += 1
+
+    @traced('decode_tile', 'map')
+    def _decode(self, key, generation):
+        try:
+            data = self.source.read(*key)
+            image = decode_image(data, self.source.ext) if data else None
+        except Exception as e:
+            log.error("Error decoding map tile %s: %s", key, e)
+            image = None
+        Clock.schedule_once(lambda dt: self._upload(key, image, generation))
+
+    def _upload(self, key, image, generation):
+        if generation != self.generation:
+            return # Decoded before a trim()
+        self._pending.pop(key, None)
+        if image is None:
+            self._missing.add(key)
+            return
+        self.cache.put(key, image.texture)
+        self.on_tile_loaded(key)
+
+    def shutdown(self):
+        for future in self._pending.values():
+            future.cancel()
+        self._pending.clear()
+        self._executor.shutdown(wait=False)
+
+
+# --- Map Layer ---
+class TiledMapLayer(Widget):
+    zoom = NumericProperty(0.0) # Fractional zoom level; tiles come from the nearest integer level
+    bounds = ObjectProperty(None, allownone=True) # MapBounds of the visible area, updated on redraw
+
+    def __init__(self, source, center=(0.0, 0.0), zoom=None, cache_bytes=DEFAULT_CACHE_BYTES, **kwargs):
+        super(TiledMapLayer, self).__init__(**kwargs)
+        self.source = source
+        self.cache = TileTextureCache(cache_bytes)
+        self.loader = TileLoader(source, self.cache, self._on_tile_loaded)
+        self.center_n = latlon_to_normalized(*center) # Map centre in normalized coordinates
+        self.zoom = source.min_zoom if zoom is None else zoom
+        self.tiles_drawn = 0
+        self._wanted = set() # Tiles of the previous redraw; looked up again without counting
+        self._fit_bounds = None
+        self._touches = []
+        self._redraw_trigger = Clock.create_trigger(self.redraw)
+        self.bind(pos=self._redraw_trigger, size=self._size_changed, zoom=self._redraw_trigger)
+
+    # --- View control ---
+    def fit_bounds(self, bounds):
+        # Zoom and centre so `bounds` fills the layer; applied again once the layer has a size.
+        self._fit_bounds = bounds
+        self.center_n = latlon_to_normalized(*bounds.center)
+        if self.width > 1 and self.height > 1:
+            west, north = latlon_to_normalized(bounds.north, bounds.west)
+            east, south = latlon_to_normalized(bounds.south, bounds.east)
+            world_px = min(self.width / max(east - west, 1e-12), self.height / max(south - north, 1e-12))
+            self.zoom = self._clamp_zoom(math.log2(world_px / TILE_SIZE))
+        self._redraw_trigger()
+
+    def pan_by(self, dx, dy):
+        world_px = self._world_px()
+        self.center_n = (self.center_n[0] - dx / world_px, self.center_n[1] + dy / world_px)
+        self._redraw_trigger()
+
+    def zoom_by(self, delta, anchor=None):
+        # Zoom keeping the point under `anchor` (window coordinates) fixed.
+        new_zoom = self._clamp_zoom(self.zoom + delta)
+        if anchor is not None:
+            ax, ay = anchor[0] - self.center_x, anchor[1] - self.center_y
+            before = self._world_px()
+            after = TILE_SIZE * 2 ** new_zoom
+            self.center_n = (self.center_n[0] + ax / before - ax / after,
+                             self.center_n[1] - ay / before + ay / after)
+        self.zoom = new_zoom
+        self._redraw_trigger()
+
+    def _clamp_zoom(self, zoom):
+        return max(self.source.min_zoom, min(self.source.max_zoom + 1.0, zoom))
+
+    def _size_changed(self, *args):
+        if self._fit_bounds is not None:
+            self.fit_bounds(self._fit_bounds)
+        self._redraw_trigger()
+
+    # --- Touch: drag to pan, pinch or mouse wheel to zoom ---
+    def on_touch_down(self, touch):
+        if not self.collide_point(*touch.pos):
+            return super(TiledMapLayer, self).on_touch_down(touch)
+        if touch.is_mouse_scrolling:
+            if touch.button == 'scrolldown':
+                self.zoom_by(0.25, touch.pos)
+            elif touch.button == 'scrollup':
+                self.zoom_by(-0.25, touch.pos)
+            return True
+        self._fit_bounds = None # The player took over the view
+        touch.grab(self)
+        self._touches.append(touch)
+        return True
+
+    def on_touch_move(self, touch):
+        if touch.grab_current is not self:
+            return super(TiledMapLayer, self).on_touch_move(touch)
+        if len(self._touches) == 1:
+            self.pan_by(touch.dx, touch.dy)
+        elif len(self._touches) >= 2 and touch in self._touches[:2]:
+            a, b = self._touches[:2]
+            other = b if touch is a else a
+            before = math.hypot(touch.px - other.x, touch.py - other.y)
+            after = math.hypot(touch.x - other.x, touch.y - other.y)
+            if before > 0 and after > 0:
+                self.zoom_by(math.log2(after / before), ((touch.x + other.x) / 2, (touch.y + other.y) / 2))
+            self.pan_by(touch.dx / 2, touch.dy / 2)
+        return True
+
+    def on_touch_up(self, touch):
+        if touch.grab_current is not self:
+            return super(TiledMapLayer, self).on_touch_up(touch)
+        touch.ungrab(self)
+        if touch in self._touches:
+            self._touches.remove(touch)
+        return True
+
+    # --- Drawing ---
+    def _world_px(self):
+        return TILE_SIZE * 2 ** self.zoom
+
+    def to_window(self, lat, lon):
+        nx, ny = latlon_to_normalized(lat, lon)
+        world_px = self._world_px()
+        return (self.center_x + (nx - self.center_n[0]) * world_px,
+                self.center_y - (ny - self.center_n[1]) * world_px)
+
+    def _on_tile_loaded(self, key):
+        self._redraw_trigger()
+
+    def redraw(self, *args):
+        world_px = self._world_px()
+        cx, cy = self.center_n
+        left, right = cx - self.width / 2 / world_px, cx + self.width / 2 / world_px
+        top, bottom = cy - self.height / 2 / world_px, cy + self.height / 2 / world_px
+        north, west = normalized_to_latlon(left, max(top, 0.0))
+        south, east = normalized_to_latlon(right, min(bottom, 1.0))
+        self.bounds = MapBounds(south, west, north, east)
+
+        z = int(max(self.source.min_zoom, min(self.source.max_zoom, math.floor(self.zoom + 0.5))))
+        n = 1 << z
+        tile_px = world_px / n
+        wanted = set()
+        self.canvas.clear()
+        self.tiles_drawn = 0
+        with self.canvas:
+            Color(1, 1, 1, 1)
+            for ty in range(max(0, int(math.floor(top * n))), min(n, int(math.floor(bottom * n)) + 1)):
+                for tx in range(int(math.floor(left * n)), int(math.floor(right * n)) + 1):
+                    key = (z, tx % n, ty)
+                    wanted.add(key)
+                    # Only the first request of a tile after a viewport change counts towards
+                    # the hit rate, not every repaint of (or waiting for) the tiles on screen.
+                    texture = self.cache.peek(key, touch=True) if key in self._wanted else self.cache.get(key)
+                    if texture is None:
+                        self.loader.request(key)
+                        texture = self._parent_region(z, tx % n, ty)
+                    if texture is None:
+                        continue
+                    x = self.center_x + (tx / n - cx) * world_px
+                    y_top = self.center_y - (ty / n - cy) * world_px
+                    Rectangle(texture=texture, pos=(x, y_top - tile_px), size=(tile_px, tile_px))
+                    self.tiles_drawn += 1
+        self.loader.cancel_except(wanted)
+        self._wanted = wanted
+
+    def _parent_region(self, z, x, y):
+        if z == 0:
+            return None
+        parent = self.cache.peek((z - 1, x // 2, y // 2))
+        if parent is None:
+            return None
+        half_w, half_h = parent.width / 2, parent.height / 2
+        # Texture rows run bottom-up, tile rows top-down.
+        return parent.get_region((x % 2) * half_w, (1 - y % 2) * half_h, half_w, half_h)
+
+    def stats(self):
+        stats = self.cache.stats()
+        stats['tiles_drawn'] = self.tiles_drawn
+        return stats
+
+    def trim(self):
+        # Free the decoded tiles while the map is not needed (e.g. the app is paused); the
+        # layer stays usable and reloads what it shows on the next redraw().
+        self.loader.trim()
+        self.cache.clear()
+        self.canvas.clear()
+        self.tiles_drawn = 0
+        self._wanted = set()
+
+    def release(self):
+        self.loader.shutdown()
+        self.cache.clear()
+        self.source.close()
@@ -0,0 +1,2 @@
+# Offline build tools for game content. Run from the repository root, e.g.:
+#     python -m tools.make_tiles big_map.png --bounds 51.5 -0.13 51.506 -0.12 --out map.mbtiles
@@ -0,0 +1,104 @@
+# Build the packed assets used by assets.py:
+# - assets/sprites.atlas (+ png pages): every sprite in assets.SPRITES in one texture atlas.
+# - assets/<background>_<size>.jpg: pre-scaled, JPEG-compressed variants of large
+#   backgrounds, so a phone decodes and uploads one that matches its screen instead of
+#   the full-size PNG.
+# - assets/<image>_preview.jpg: ~32px previews shown blurred while large images load.
+# - assets/manifest.json: which background variants and previews exist.
+# Needs Pillow (kivy.atlas uses it too); the app itself only reads the results.
+#     python -m tools.build_assets
+import argparse
+import json
+import os
+import sys
+
+os.environ.setdefault('KIVY_NO_ARGS', '1')
+
+import assets
+
+try:
+    from PIL import Image as PILImage
+except ImportError:
+    PILImage = None
+
+BACKGROUNDS = (assets.FOREST_BACKGROUND,)
+BACKGROUND_SIZES = (640, 960, 1280, 1920) # Longest side; larger than the source is skipped
+JPEG_QUALITY = 85
+PREVIEW_SIZE = 32
+PREVIEWS = BACKGROUNDS + ('camera_feed_placeholder.png', 'map_placeholder.png', 'placeholder_background.png')
+
+
+def usable_images(names):
+    # Sprites that Pillow can actually open (placeholders may be missing or not real PNGs).
+    for name in names:
+        try:
+            with PILImage.open(name) as image:
+                image.verify()
+        except Exception as e:
+            print(f"Skipping {name}: {e}")
+            continue
+        yield name
+
+
+def build_atlas(atlas_size):
+    from kivy.atlas import Atlas
+    sprites = list(usable_images(assets.SPRITES))
+    if not sprites:
+        print("No usable sprites, atlas not built.")
+        return
+    os.makedirs(assets.ASSET_DIR, exist_ok=True)
+    Atlas.create(os.path.splitext(assets.ATLAS_FILE)[0], sprites, atlas_size)
+    print(f"{assets.ATLAS_FILE}: {len(sprites)} sprites")
+
+
+def build_backgrounds(manifest):
+    manifest['backgrounds'] = {}
+    for name in usable_images(BACKGROUNDS):
+        variants = []
+        with PILImage.open(name) as original:
+            original = original.convert('RGB')
+            longest = max(original.size)
+            for size in BACKGROUND_SIZES:
+                if size > longest:
+                    break
+                scale = size / longest
+                variant = original.resize((round(original.width * scale), round(original.height * scale)),
+                                          PILImage.LANCZOS)
+                path = os.path.join(assets.ASSET_DIR, f'{assets.sprite_id(name)}_{size}.jpg')
+                variant.save(path, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+                variants.append({'size': size, 'path': path.replace(os.sep, '/')})
+                print(f"{path}: {variant.size[0]}x{variant.size[1]}, {os.path.getsize(path) // 1024} KB")
+        manifest['backgrounds'][name] = variants
+
+
+def build_previews(manifest):
+    manifest['previews'] = {}
+    for name in usable_images(PREVIEWS):
+        with PILImage.open(name) as original:
+            preview = original.convert('RGB')
+            preview.thumbnail((PREVIEW_SIZE, PREVIEW_SIZE))
+            path = os.path.join(assets.ASSET_DIR, f'{assets.sprite_id(name)}_preview.jpg')
+            preview.save(path, 'JPEG', quality=70)
+        manifest['previews'][name] = path.replace(os.sep, '/')
+        # Variants of a background share the original's preview
+        for variant in manifest.get('backgrounds', {}).get(name, ()):
+            manifest['previews'][variant['path']] = manifest['previews'][name]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pack sprites into an atlas and pre-scale backgrounds.')
+    parser.add_argument('--atlas-size', type=int, default=1024, help='atlas page size in pixels')
+    args = parser.parse_args()
+    if PILImage is None:
+        sys.exit('build_assets needs Pillow: pip install pillow')
+    os.makedirs(assets.ASSET_DIR, exist_ok=True)
+    build_atlas(args.atlas_size)
+    manifest = {}
+    build_backgrounds(manifest)
+    build_previews(manifest)
+    with open(assets.ASSET_MANIFEST, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+# Compile dialogue scripts (dialogue/<site>.json) into the binary .dlg files the app
+# memory-maps at runtime; see dialogue.py for both formats.
+#     python -m tools.compile_dialogue              (every script in dialogue/)
+#     python -m tools.compile_dialogue dialogue/intro.json
+import argparse
+import glob
+import os
+import sys
+
+from dialogue import DIALOGUE_DIR, DialogueScript, compile_script
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compile dialogue scripts to the binary .dlg format.')
+    parser.add_argument('sources', nargs='*', help=f'JSON scripts (default: {DIALOGUE_DIR}/*.json)')
+    args = parser.parse_args()
+    sources = args.sources or sorted(glob.glob(os.path.join(DIALOGUE_DIR, '*.json')))
+    failed = False
+    for source in sources:
+        try:
+            target = compile_script(source)
+        except (OSError, ValueError) as e: # DialogueError and JSON syntax errors are ValueErrors
+            print(f"{source}: {e}")
+            failed = True
+            continue
+        script = DialogueScript(target)
+        print(f"{target}: {script.node_count} nodes, {script.choice_count} choices, "
+              f"{script.string_count} strings, {os.path.getsize(target)} bytes "
+              f"(JSON {os.path.getsize(source)} bytes)")
+        script.close()
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
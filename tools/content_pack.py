@@ -0,0 +1,94 @@
+# Build content packs and the deltas that update installed packs; see content_pack.py.
+#     python -m tools.content_pack build --version 2024.06.1             (writes content.pack)
+#     python -m tools.content_pack delta old.pack new.pack --out 2024.06.1.delta
+#     python -m tools.content_pack apply content.pack 2024.06.1.delta    (what the app does)
+#     python -m tools.content_pack info content.pack
+# `build` packs goals.json, the stories, the compiled dialogue (compiling it first) and the
+# images in the repository root.
+import argparse
+import glob
+import os
+import sys
+
+from content_pack import PACK_FILE, ContentPack, apply_delta, build_pack, make_delta
+from dialogue import DIALOGUE_DIR, compile_script
+
+CONTENT = ('goals.json', 'stories/*.txt', f'{DIALOGUE_DIR}/*.dlg', '*.png', 'assets/*')
+
+
+def collect(root):
+    # {entry name: path} of the content files under `root`.
+    for source in glob.glob(os.path.join(root, DIALOGUE_DIR, '*.json')):
+        compile_script(source)
+    files = {}
+    for pattern in CONTENT:
+        for path in glob.glob(os.path.join(root, pattern)):
+            if os.path.isfile(path):
+                files[os.path.relpath(path, root).replace(os.sep, '/')] = path
+    return files
+
+
+def build(args):
+    files = collect(args.root)
+    manifest = build_pack(args.out, args.version, files)
+    loose = sum(entry['size'] for entry in manifest['files'].values())
+    print(f"{args.out}: version {args.version}, {len(files)} entries, "
+          f"{os.path.getsize(args.out)} bytes ({loose} bytes loose)")
+
+
+def delta(args):
+    index = make_delta(args.old, args.new, args.out)
+    kinds = list(index['entries'].values())
+    unchanged = len(index['manifest']['files']) - len(kinds)
+    print(f"{args.out}: {index['from_version']} -> {index['to_version']}, {kinds.count('patch')} patched, "
+          f"{kinds.count('full')} new or replaced, {unchanged} unchanged; {os.path.getsize(args.out)} bytes "
+          f"(full pack {os.path.getsize(args.new)} bytes)")
+
+
+def apply(args):
+    version = apply_delta(args.pack, args.delta, args.out)
+    print(f"{args.out or args.pack}: version {version}")
+
+
+def info(args):
+    with ContentPack(args.pack) as pack:
+        print(f"{args.pack}: version {pack.version}, {len(pack)} entries, id {pack.id[:16]}")
+        for name in pack.names():
+            print(f"  {name:<48}{pack.files[name]['size']:>10}  {pack.hash(name)[:16]}")
+        bad = pack.verify()
+        if bad:
+            print(f"Corrupt entries: {', '.join(bad)}")
+            sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build, diff and apply content packs.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    command = commands.add_parser('build', help='pack the repository content')
+    command.add_argument('--version', required=True)
+    command.add_argument('--root', default='.')
+    command.add_argument('--out', default=PACK_FILE)
+    command.set_defaults(run=build)
+    command = commands.add_parser('delta', help='write the update from one pack to another')
+    command.add_argument('old')
+    command.add_argument('new')
+    command.add_argument('--out', required=True)
+    command.set_defaults(run=delta)
+    command = commands.add_parser('apply', help='update a pack with a delta')
+    command.add_argument('pack')
+    command.add_argument('delta')
+    command.add_argument('--out', help='write the updated pack here instead of in place')
+    command.set_defaults(run=apply)
+    command = commands.add_parser('info', help='list and verify the entries of a pack')
+    command.add_argument('pack')
+    command.set_defaults(run=info)
+    args = parser.parse_args()
+    try:
+        args.run(args)
+    except (OSError, ValueError) as e: # ContentPackError and DialogueError are ValueErrors
+        print(e)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+# Cut a large map raster into 256px XYZ tiles for TiledMapLayer.
+# The raster is assumed to be in Web Mercator and to cover exactly the given lat/lon
+# bounds (south west north east). Output is either a tile directory
+# (<out>/<z>/<x>/<y>.png) or, when <out> ends in .mbtiles, an MBTiles SQLite file.
+# Needs Pillow (only this build step does; the app decodes tiles with Kivy).
+#     python -m tools.make_tiles park.png --bounds 51.5 -0.13 51.506 -0.12 \
+#         --min-zoom 14 --max-zoom 19 --out map.mbtiles
+import argparse
+import io
+import math
+import os
+import sqlite3
+import sys
+
+from geo import TILE_SIZE, latlon_to_normalized
+
+try:
+    from PIL import Image as PILImage
+except ImportError:
+    PILImage = None
+
+
+def tiles_for_zoom(raster, bounds, z):
+    south, west, north, east = bounds
+    left, top = latlon_to_normalized(north, west)
+    right, bottom = latlon_to_normalized(south, east)
+    n = 1 << z
+    # Raster pixels per unit of normalized coordinates
+    scale_x = raster.width / (right - left)
+    scale_y = raster.height / (bottom - top)
+    for ty in range(int(math.floor(top * n)), int(math.floor(bottom * n)) + 1):
+        for tx in range(int(math.floor(left * n)), int(math.floor(right * n)) + 1):
+            # Tile extent in raster pixels (may reach past the raster edges)
+            box = ((tx / n - left) * scale_x, (ty / n - top) * scale_y,
+                   ((tx + 1) / n - left) * scale_x, ((ty + 1) / n - top) * scale_y)
+            crop = (max(0, int(box[0])), max(0, int(box[1])),
+                    min(raster.width, int(math.ceil(box[2]))), min(raster.height, int(math.ceil(box[3]))))
+            if crop[2] <= crop[0] or crop[3] <= crop[1]:
+                continue
+            fx = TILE_SIZE / (box[2] - box[0])
+            fy = TILE_SIZE / (box[3] - box[1])
+            part = raster.crop(crop).resize(
+                (max(1, round((crop[2] - crop[0]) * fx)), max(1, round((crop[3] - crop[1]) * fy))),
+                PILImage.LANCZOS)
+            tile = PILImage.new('RGBA', (TILE_SIZE, TILE_SIZE), (0, 0, 0, 0))
+            tile.paste(part, (round((crop[0] - box[0]) * fx), round((crop[1] - box[1]) * fy)))
+            yield tx, ty, tile
+
+
+def encode_png(tile):
+    buffer = io.BytesIO()
+    tile.save(buffer, format='PNG', optimize=True)
+    return buffer.getvalue()
+
+
+def write_directory(out, z, x, y, data):
+    folder = os.path.join(out, str(z), str(x))
+    os.makedirs(folder, exist_ok=True)
+    with open(os.path.join(folder, f'{y}.png'), 'wb') as f:
+        f.write(data)
+
+
+def open_mbtiles(path, args):
+    if os.path.exists(path):
+        os.remove(path)
+    db = sqlite3.connect(path)
+    db.execute('CREATE TABLE metadata (name TEXT, value TEXT)')
+    db.execute('CREATE TABLE tiles (zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_data BLOB)')
+    db.execute('CREATE UNIQUE INDEX tile_index ON tiles (zoom_level, tile_column, tile_row)')
+    south, west, north, east = args.bounds
+    db.executemany('INSERT INTO metadata VALUES (?, ?)', [
+        ('name', os.path.splitext(os.path.basename(args.image))[0]),
+        ('format', 'png'),
+        ('minzoom', str(args.min_zoom)),
+        ('maxzoom', str(args.max_zoom)),
+        ('bounds', f'{west},{south},{east},{north}'),
+    ])
+    return db
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cut a map raster into XYZ tiles.')
+    parser.add_argument('image')
+    parser.add_argument('--bounds', type=float, nargs=4, required=True, metavar=('SOUTH', 'WEST', 'NORTH', 'EAST'))
+    parser.add_argument('--min-zoom', type=int, default=14)
+    parser.add_argument('--max-zoom', type=int, default=18)
+    parser.add_argument('--out', default='map_tiles')
+    args = parser.parse_args()
+
+    if PILImage is None:
+        sys.exit('make_tiles needs Pillow: pip install pillow')
+    PILImage.MAX_IMAGE_PIXELS = None # Park/city rasters are legitimately huge
+    raster = PILImage.open(args.image).convert('RGBA')
+
+    db = open_mbtiles(args.out, args) if args.out.endswith('.mbtiles') else None
+    count = 0
+    for z in range(args.min_zoom, args.max_zoom + 1):
+        for x, y, tile in tiles_for_zoom(raster, args.bounds, z):
+            data = encode_png(tile)
+            if db is not None:
+                db.execute('INSERT INTO tiles VALUES (?, ?, ?, ?)', (z, x, (1 << z) - 1 - y, data))
+            else:
+                write_directory(args.out, z, x, y, data)
+            count += 1
+        print(f"zoom {z}: {count} tiles so far")
+    if db is not None:
+        db.commit()
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+# Simulate a class or an event's worth of players without a window; see simulator.py.
+#     python -m tools.simulate --players 30 100 200
+#     python -m tools.simulate --players 200 --trace traces/demo_walk.csv --processes 4
+#     python -m tools.simulate --players 50 --speed 10 --json report.json   (paced, 10x real time)
+# Prints per-operation latency percentiles (ms) and memory per session for every player count.
+import argparse
+import json
+import sys
+
+from simulator import GOALS_FILE, PERCENTILES, simulate
+
+
+def _kilobytes(value):
+    return 'n/a' if value is None else f'{value / 1024:.0f} KB'
+
+
+def print_report(report):
+    print(f"{report['players']} players in {report['processes']} process(es): {report['elapsed_s']:.2f} s, "
+          f"{report['fixes']} fixes ({report['fixes_per_s']:.0f}/s), {report['check_ins']} check-ins, "
+          f"{report['rewards']} rewards")
+    print(f"  memory per session: {_kilobytes(report['rss_per_session'])} resident, "
+          f"{_kilobytes(report['traced_per_session'])} Python allocations")
+    print(f"  {'operation':<13}{'count':>9}" + ''.join(f"{f'p{q}':>9}" for q in PERCENTILES) + f"{'max':>9}")
+    for name, stats in report['operations'].items():
+        print(f"  {name:<13}{stats['count']:>9}" + ''.join(f"{stats[f'p{q}']:>9.3f}" for q in PERCENTILES)
+              + f"{stats['max']:>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the game logic for many simulated players at once.')
+    parser.add_argument('--players', type=int, nargs='+', default=[30, 100, 200])
+    parser.add_argument('--trace', nargs='*', default=[], help='GPX or CSV walks (default: synthetic walks)')
+    parser.add_argument('--goals', type=int, help='goals visited by each synthetic walk (default: all)')
+    parser.add_argument('--speed', type=float, default=0.0, help='times real time (0: as fast as possible)')
+    parser.add_argument('--processes', type=int, default=1)
+    parser.add_argument('--goals-file', default=GOALS_FILE)
+    parser.add_argument('--pack', help='read goals and stories from this content pack')
+    parser.add_argument('--trace-memory', action='store_true', help='also count Python allocations (slower)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help='write the reports to this file')
+    args = parser.parse_args()
+
+    reports = []
+    for players in args.players:
+        try:
+            report = simulate(players, args.trace, args.goals, args.speed, args.processes, args.goals_file,
+                              args.pack, args.trace_memory, args.seed)
+        except (OSError, ValueError) as e: # ContentPackError is a ValueError
+            print(e)
+            sys.exit(1)
+        print_report(report)
+        reports.append(report)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(reports, f, indent=1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+import os
+import time
+from collections import deque, namedtuple
+
+from kivy.animation import AnimationTransition
+from kivy.graphics import ClearBuffers, ClearColor, Color, Fbo, InstructionGroup, Rectangle, Translate
+from kivy.properties import OptionProperty
+from kivy.uix.layout import Layout
+from kivy.uix.screenmanager import NoTransition, SlideTransition, TransitionBase
+
+from profiling import log
+
+# SCREEN_TRANSITIONS: Snapshot Transitions & Dropped-Frame Accounting
+# A SlideTransition lays out and draws both complete screens every frame of the animation;
+# for the AR and map screens that is the live camera texture and every marker, twice.
+# SnapshotTransition renders the outgoing screen once into an Fbo, takes the live screen
+# out of the widget tree and slides the snapshot instead. The incoming screen is laid out
+# before the first animation frame, so only its position changes while it slides in.
+# Every transition counts the frames it took and how many were dropped (frame intervals
+# longer than FRAME_INTERVAL), logs them and keeps them in `recent_transitions`.
+# create_transition() picks the mode: 'snapshot', 'slide' or 'none' (instant); without a
+# mode, low-end devices (little memory or few cores) get 'none' and everything else 'snapshot'.
+
+FRAME_INTERVAL = 1.0 / 60 # Expected time between frames
+LOW_END_MEMORY = 2 * 1024 * 1024 * 1024 # Devices with less RAM than this count as low-end
+LOW_END_CPUS = 2 # ... as do devices with this many cores or fewer
+TRANSITION_MODES = ('snapshot', 'slide', 'none')
+
+TransitionRecord = namedtuple('TransitionRecord', 'mode screen_out screen_in frames dropped duration worst_frame')
+recent_transitions = deque(maxlen=100) # TransitionRecord of the most recent transitions
+
+
+def total_memory():
+    # Physical memory of the device in bytes, or None where it cannot be read.
+    try:
+        with open('/proc/meminfo', 'r') as f:
+            for line in f:
+                if line.startswith('MemTotal:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def is_low_end_device():
+    memory = total_memory()
+    return (memory is not None and memory < LOW_END_MEMORY) or (os.cpu_count() or 1) <= LOW_END_CPUS
+
+
+def create_transition(mode=None, direction='left'):
+    if not mode:
+        mode = 'none' if is_low_end_device() else 'snapshot'
+    if mode not in TRANSITION_MODES:
+        log.warning("Unknown transition mode '%s', using 'snapshot'.", mode)
+        mode = 'snapshot'
+    if mode == 'none':
+        return NoTransition()
+    if mode == 'slide':
+        return MeasuredSlideTransition(direction=direction)
+    return SnapshotTransition(direction=direction)
+
+
+def layout_now(widget):
+    # Run the layouts of a widget tree top-down now instead of in the coming frames.
+    if isinstance(widget, Layout):
+        widget.do_layout()
+    for child in widget.children:
+        layout_now(child)
+
+
+class FrameDropMixin(object):
+    # Mixed into a transition: times the frames between start() and on_complete().
+    mode = ''
+
+    def start(self, manager):
+        self._frame_intervals = []
+        self._started = self._last_frame = time.perf_counter()
+        super(FrameDropMixin, self).start(manager)
+
+    def on_progress(self, progression):
+        now = time.perf_counter()
+        if progression > 0: # Progress 0 is dispatched from start(), not from a frame
+            self._frame_intervals.append(now - self._last_frame)
+        self._last_frame = now
+        super(FrameDropMixin, self).on_progress(progression)
+
+    def on_complete(self):
+        super(FrameDropMixin, self).on_complete()
+        intervals = self._frame_intervals
+        dropped = sum(max(0, int(round(interval / FRAME_INTERVAL)) - 1) for interval in intervals)
+        record = TransitionRecord(self.mode, self.screen_out.name if self.screen_out else '',
+                                  self.screen_in.name if self.screen_in else '', len(intervals), dropped,
+                                  time.perf_counter() - self._started, max(intervals) if intervals else 0.0)
+        recent_transitions.append(record)
+        log.info("Transition %s -> %s (%s): %d frames, %d dropped, worst %.1f ms.", record.screen_out,
+                 record.screen_in, self.mode, record.frames, record.dropped, record.worst_frame * 1000)
+
+
+class MeasuredSlideTransition(FrameDropMixin, SlideTransition):
+    mode = 'slide'
+
+
+class SnapshotTransition(FrameDropMixin, TransitionBase):
+    mode = 'snapshot'
+    direction = OptionProperty('left', options=('left', 'right', 'up', 'down'))
+
+    def __init__(self, **kwargs):
+        super(SnapshotTransition, self).__init__(**kwargs)
+        self._fbo = None
+        self._translate = None
+        self._group = None
+        self._rect = None
+
+    def _snapshot(self, screen):
+        # Render `screen` (not in any widget tree) into the reused Fbo; returns its texture.
+        size = (max(1, int(screen.width)), max(1, int(screen.height)))
+        if self._fbo is None or tuple(self._fbo.size) != size:
+            self._fbo = Fbo(size=size, with_stencilbuffer=True)
+            with self._fbo:
+                ClearColor(0, 0, 0, 0)
+                ClearBuffers()
+                self._translate = Translate()
+        self._translate.xy = (-screen.x, -screen.y)
+        self._fbo.add(screen.canvas)
+        self._fbo.draw()
+        self._fbo.remove(screen.canvas)
+        return self._fbo.texture
+
+    def start(self, manager):
+        screen_out, screen_in = self.screen_out, self.screen_in
+        manager.real_remove_widget(screen_out) # Its canvas can only be drawn in one place
+        self._group = InstructionGroup()
+        self._group.add(Color(1, 1, 1, 1))
+        self._rect = Rectangle(texture=self._snapshot(screen_out), pos=manager.pos, size=manager.size)
+        self._group.add(self._rect)
+        manager.canvas.before.add(self._group)
+        screen_in.size = manager.size
+        super(SnapshotTransition, self).start(manager) # Adds screen_in and places it (progress 0)
+        layout_now(screen_in) # After on_pre_enter, which may change its content
+
+    def on_progress(self, progression):
+        super(SnapshotTransition, self).on_progress(progression)
+        manager = self.manager
+        x, y = manager.pos
+        width, height = manager.size
+        progression = AnimationTransition.out_quad(progression)
+        screen_in = self.screen_in
+        if self.direction == 'left':
+            screen_in.pos = (x + width * (1 - progression), y)
+            self._rect.pos = (x - width * progression, y)
+        elif self.direction == 'right':
+            screen_in.pos = (x - width * (1 - progression), y)
+            self._rect.pos = (x + width * progression, y)
+        elif self.direction == 'down':
+            screen_in.pos = (x, y + height * (1 - progression))
+            self._rect.pos = (x, y - height * progression)
+        else:
+            screen_in.pos = (x, y - height * (1 - progression))
+            self._rect.pos = (x, y + height * progression)
+
+    def on_complete(self):
+        self.screen_in.pos = self.manager.pos
+        if self._group is not None:
+            self.manager.canvas.before.remove(self._group)
+            self._group = self._rect = None
+        super(SnapshotTransition, self).on_complete()
+
+    def release(self):
+        # Free the snapshot Fbo (e.g. the app is paused); the next transition creates it again.
+        if not self.is_active:
+            self._fbo = self._translate = None
@@ -0,0 +1,282 @@
+import itertools
+import math
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+from frame_source import FRAME_CHANNELS
+from profiling import log
+
+# AR_RENDERING_POINT: Marker Detection & Anchor Tracking
+# Detection never runs on the Kivy main thread:
+# 1. VisionStage taps a frame_source.FrameSource. At most `rate` times per second it takes a
+#    downscaled greyscale copy of the frame on the source thread (strided slicing, cheap).
+# 2. A worker pool runs the detector on the small frame. Frames arriving while every worker
+#    is busy are skipped rather than queued.
+# 3. Results are published through a LatestValue slot, which the UI polls once per frame
+#    without taking a lock.
+# 4. AnchorFollower eases the displayed pose from its current value to each new detection
+#    over one detection interval, so 10 Hz detections still move overlays smoothly at 60 Hz.
+# Detectors: ArucoDetector (OpenCV ArUco fiducials) when OpenCV is installed, otherwise
+# BrightMarkerDetector, which tracks a bright patch (a white card or a torch) using NumPy if
+# available and plain Python otherwise. Poses are 2D (position, size and rotation in the
+# frame), which is what the overlay needs; no camera calibration is involved.
+
+DETECTION_RATE = 10 # Detections per second
+DETECTION_WORKERS = 1
+DETECTION_WIDTH = 160 # Frames are downscaled to about this width before detection
+BRIGHT_THRESHOLD = 220
+MIN_MARKER_PIXELS = 6 # In the downscaled frame
+LOST_AFTER = 0.5 # Seconds without a detection before an anchor is considered lost
+
+# x, y: centre in the frame, 0..1 with y growing downwards (image convention);
+# size: marker width as a fraction of the frame width; angle: radians.
+Anchor = namedtuple('Anchor', 'id x y size angle')
+Detection = namedtuple('Detection', 'seq timestamp anchors latency') # timestamp: frame capture time
+
+
+class LatestValue(object):
+    # Slot holding only the newest value. Publishing replaces one reference (atomic in
+    # CPython), so readers and writers never wait on each other.
+
+    def __init__(self):
+        self._counter = itertools.count(1)
+        self._entry = (0, None)
+
+    def publish(self, value):
+        self._entry = (next(self._counter), value)
+
+    def get(self):
+        # (sequence number, value); the sequence number grows with every publish.
+        return self._entry
+
+    def get_if_newer(self, seq):
+        entry = self._entry
+        return entry if entry[0] > seq else None
+
+
+def downscale_gray(buffer, width, height, step):
+    # (pixels, small_width, small_height): every `step`-th pixel's green channel (a fair
+    # luminance proxy), as a NumPy array when available, otherwise bytes.
+    if numpy is not None:
+        frame = numpy.frombuffer(buffer, dtype=numpy.uint8).reshape(height, width, FRAME_CHANNELS)
+        small = frame[::step, ::step, 1].copy()
+        return small, small.shape[1], small.shape[0]
+    row_bytes = width * FRAME_CHANNELS
+    small_width = len(range(0, width, step))
+    rows = []
+    for y in range(0, height, step):
+        offset = y * row_bytes + 1
+        rows.append(bytes(buffer[offset:offset + row_bytes - 1:FRAME_CHANNELS * step]))
+    return b''.join(rows), small_width, len(rows)
+
+
+class BrightMarkerDetector(object):
+    # One anchor at the centroid of the pixels at or above `threshold`.
+
+    def __init__(self, threshold=BRIGHT_THRESHOLD, min_pixels=MIN_MARKER_PIXELS):
+        self.threshold = threshold
+        self.min_pixels = min_pixels
+
+    def detect(self, pixels, width, height):
+        if numpy is not None and not isinstance(pixels, bytes):
+            ys, xs = numpy.nonzero(pixels >= self.threshold)
+            count = len(xs)
+            if count < self.min_pixels:
+                return []
+            sum_x, sum_y = float(xs.sum()), float(ys.sum())
+            min_x, max_x = int(xs.min()), int(xs.max())
+        else:
+            count = sum_x = sum_y = 0
+            min_x, max_x = width, -1
+            threshold = self.threshold
+            for y in range(height):
+                row = pixels[y * width:(y + 1) * width]
+                if max(row) < threshold:
+                    continue # Most rows have no marker; max() runs in C
+                for x, value in enumerate(row):
+                    if value >= threshold:
+                        count += 1
+                        sum_x += x
+                        sum_y += y
+                        min_x = min(min_x, x)
+                        max_x = max(max_x, x)
+            if count < self.min_pixels:
+                return []
+        return [Anchor(0, (sum_x / count + 0.5) / width, (sum_y / count + 0.5) / height,
+                       (max_x - min_x + 1) / width, 0.0)]
+
+
+class ArucoDetector(object):
+    # ArUco fiducial markers (print them from the chosen dictionary); one anchor per marker id.
+
+    def __init__(self, dictionary='DICT_4X4_50'):
+        if cv2 is None or not hasattr(cv2, 'aruco'):
+            raise ImportError('ArUco detection needs OpenCV with the aruco module: pip install opencv-contrib-python')
+        aruco = cv2.aruco
+        self._detector = aruco.ArucoDetector(aruco.getPredefinedDictionary(getattr(aruco, dictionary)),
+                                             aruco.DetectorParameters())
+
+    def detect(self, pixels, width, height):
+        if isinstance(pixels, bytes):
+            pixels = numpy.frombuffer(pixels, dtype=numpy.uint8).reshape(height, width)
+        corners, ids, _ = self._detector.detectMarkers(pixels)
+        anchors = []
+        for quad, marker_id in zip(corners, ids.flatten() if ids is not None else ()):
+            quad = quad.reshape(4, 2)
+            cx, cy = quad.mean(axis=0)
+            dx, dy = quad[1] - quad[0] # Top edge
+            anchors.append(Anchor(int(marker_id), cx / width, cy / height,
+                                  math.hypot(dx, dy) / width, math.atan2(dy, dx)))
+        return anchors
+
+
+def create_detector():
+    # The best detector available on this install.
+    try:
+        return ArucoDetector()
+    except (ImportError, AttributeError):
+        return BrightMarkerDetector()
+
+
+class VisionStage(object):
+    def __init__(self, detector=None, rate=DETECTION_RATE, workers=DETECTION_WORKERS,
+                 detection_width=DETECTION_WIDTH):
+        self.detector = detector or create_detector()
+        self.interval = 1.0 / rate
+        self.workers = workers
+        self.detection_width = detection_width
+        self.anchors = LatestValue() # Holds the newest Detection
+        self.source = None
+        self._executor = None
+        self._idle_workers = threading.Semaphore(workers)
+        self._last_submit = 0.0
+        self._seq = 0
+        self._newest_seq = 0 # Newest frame whose detection was published
+        self.submitted = 0
+        self.skipped = 0 # Frames due for detection that found every worker busy
+        self.detect_times = [] # Seconds per detection (worker side)
+
+    def attach(self, source):
+        self.detach()
+        self.source = source
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='vision')
+        source.add_tap(self.on_frame)
+
+    def detach(self):
+        if self.source is not None:
+            self.source.remove_tap(self.on_frame)
+            self.source = None
+
+    def shutdown(self):
+        self.detach()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def on_frame(self, buffer, width, height, timestamp):
+        # Called on the source thread for every frame.
+        # 10% slack so a 30 fps source yields 10 Hz rather than every fourth frame
+        if timestamp - self._last_submit < self.interval * 0.9 or self._executor is None:
+            return
+        if not self._idle_workers.acquire(blocking=False):
+            self.skipped += 1
+            return
+        self._last_submit = timestamp
+        step = max(1, width // self.detection_width)
+        small = downscale_gray(buffer, width, height, step) # Copy: the buffer is reused after this call
+        self._seq += 1
+        self.submitted += 1
+        self._executor.submit(self._detect, self._seq, small, timestamp)
+
+    def _detect(self, seq, small, timestamp):
+        start = time.perf_counter()
+        try:
+            anchors = self.detector.detect(*small)
+        except Exception as e:
+            log.error("Error in marker detection: %s", e)
+            anchors = []
+        finally:
+            self._idle_workers.release()
+        now = time.perf_counter()
+        self.detect_times.append(now - start)
+        if len(self.detect_times) > 300:
+            del self.detect_times[0]
+        if seq < self._newest_seq:
+            return # A later frame finished first (several workers): keep the newer result
+        self._newest_seq = seq
+        self.anchors.publish(Detection(seq, timestamp, anchors, now - timestamp))
+
+    def stats(self):
+        return {'submitted': self.submitted, 'skipped': self.skipped,
+                'published': self.anchors.get()[0]}
+
+
+def _lerp_angle(a, b, t):
+    delta = (b - a + math.pi) % (2 * math.pi) - math.pi
+    return a + delta * t
+
+
+class AnchorFollower(object):
+    # Smoothly displayed pose of one anchor id, updated from the detections in a LatestValue.
+
+    def __init__(self, anchor_id=None, duration=1.0 / DETECTION_RATE, lost_after=LOST_AFTER,
+                 clock=time.perf_counter):
+        self.anchor_id = anchor_id # None: follow the first anchor of each detection
+        self.duration = duration
+        self.lost_after = lost_after
+        self.clock = clock
+        self._seq = 0
+        self._from = None
+        self._to = None
+        self._started = 0.0
+        self._last_seen = None
+
+    def reset(self):
+        # Keeps the last seen sequence number: a detection already in the slot is stale.
+        self._from = self._to = self._last_seen = None
+
+    def _pick(self, anchors):
+        for anchor in anchors:
+            if self.anchor_id is None or anchor.id == self.anchor_id:
+                return anchor
+        return None
+
+    def update(self, slot):
+        # Take a newer detection from `slot` if there is one; returns pose() afterwards.
+        now = self.clock()
+        entry = slot.get_if_newer(self._seq)
+        if entry is not None:
+            self._seq, detection = entry
+            anchor = self._pick(detection.anchors) if detection is not None else None
+            if anchor is not None:
+                current = self.pose(now)
+                self._from = current if current is not None else anchor
+                self._to = anchor
+                self._started = now
+                self._last_seen = now
+        return self.pose(now)
+
+    def pose(self, now=None):
+        # Interpolated Anchor, or None if the anchor has not been seen or is lost.
+        if self._to is None:
+            return None
+        now = self.clock() if now is None else now
+        if now - self._last_seen > self.lost_after:
+            return None
+        t = min(1.0, (now - self._started) / self.duration) if self.duration > 0 else 1.0
+        t = t * t * (3 - 2 * t) # Ease in and out
+        a, b = self._from, self._to
+        return Anchor(b.id, a.x + (b.x - a.x) * t, a.y + (b.y - a.y) * t,
+                      a.size + (b.size - a.size) * t, _lerp_angle(a.angle, b.angle, t))